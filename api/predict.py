@@ -1,10 +1,40 @@
+import base64
 import json
 import sys
 import os
 
 # Add parent directory to path to import app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app import predict_stock
+# Only light modules at import time: a cold start that can be answered from
+# the precomputed store or the response cache never loads pandas, numpy,
+# yfinance or feedparser. app (and with it the data stack) is imported by
+# the branches that compute.
+from encoding import encode_columnar, encode_response, stream_framer
+from lookup import cached_result, model_options, result_events
+from metrics import inc, record_size, stage
+
+def _header(request, name):
+    """Case-insensitive request header lookup ('' if absent)"""
+    raw = request.get('headers') if isinstance(request, dict) else getattr(request, 'headers', None)
+    for key, value in dict(raw or {}).items():
+        if key.lower() == name:
+            return value
+    return ''
+
+def _encoded(status, headers, result, fmt, delta, accept_encoding):
+    """Response dict for a result in the requested format/encoding"""
+    with stage('encode'):
+        payload, content_encoding = encode_response(result, fmt, delta, accept_encoding)
+    record_size('response', len(payload))
+    if content_encoding == 'identity':
+        return {'statusCode': status, 'headers': headers, 'body': payload.decode()}
+    headers = dict(headers, **{'Content-Encoding': content_encoding, 'Vary': 'Accept-Encoding'})
+    return {
+        'statusCode': status,
+        'headers': headers,
+        'body': base64.b64encode(payload).decode('ascii'),
+        'isBase64Encoded': True
+    }
 
 def handler(request):
     """Vercel serverless function handler"""
@@ -51,6 +81,40 @@ def handler(request):
                 'body': json.dumps({'error': 'Invalid JSON in request body', 'details': str(e)})
             }
         
+        # Response format: "default" (unchanged shape) or "columnar"
+        fmt = body.get('format', 'default') if isinstance(body, dict) else 'default'
+        if fmt not in ('default', 'columnar'):
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'format must be "default" or "columnar"'})
+            }
+        delta = bool(body.get('delta')) if isinstance(body, dict) else False
+        try:
+            model, horizons = model_options(body if isinstance(body, dict) else {})
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': str(e)})
+            }
+        accept_encoding = _header(request, 'accept-encoding')
+        
+        # Batch form: {"stocks": ["TCS", "INFY", ...]} -> per-ticker results
+        stocks = body.get('stocks') if isinstance(body, dict) else None
+        if stocks is not None:
+            if not isinstance(stocks, list) or not stocks:
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({'error': 'stocks must be a non-empty list'})
+                }
+            from app import predict_many
+            results = predict_many([s.upper() if isinstance(s, str) else s for s in stocks])
+            if fmt == 'columnar':
+                results = {t: encode_columnar(r, delta) for t, r in results.items()}
+            return _encoded(200, headers, {'results': results}, 'default', False, accept_encoding)
+        
         stock = body.get('stock', '').upper() if isinstance(body, dict) else ''
         
         if not stock:
@@ -60,21 +124,42 @@ def handler(request):
                 'body': json.dumps({'error': 'Stock symbol is required'})
             }
         
-        # Call the prediction function
-        result = predict_stock(stock)
-        
-        if 'error' in result:
+        # Streaming form: this handler returns whole bodies, so the events are
+        # buffered; asgi.py sends them as they are produced
+        stream = body.get('stream')
+        if stream:
+            content_type, frame = stream_framer('sse' if stream == 'sse' else 'ndjson')
+            inc('stock_requests_total', route='api')
+            cached = cached_result(stock, model, horizons)
+            if cached is not None:
+                events = result_events(cached)
+            else:
+                # Both stores were just read; go straight to the computation
+                from app import stream_and_cache
+                events = stream_and_cache(stock, model=model, horizons=horizons)
+            events = [frame(event, data) for event, data in events]
+            events.append(frame('done', {}))
             return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps(result)
+                'statusCode': 200,
+                'headers': dict(headers, **{'Content-Type': content_type}),
+                'body': b''.join(events).decode()
             }
         
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps(result)
-        }
+        # Call the prediction function; debug/profile requests bypass the
+        # cache so their timings describe a real computation
+        inc('stock_requests_total', route='api')
+        debug = bool(body.get('debug'))
+        profile = bool(body.get('profile'))
+        if debug or profile:
+            from app import predict_stock
+            result = predict_stock(stock, debug=debug, profile=profile, model=model, horizons=horizons)
+        else:
+            result = cached_result(stock, model, horizons)
+            if result is None:
+                from app import compute_and_cache
+                result = compute_and_cache(stock, model=model, horizons=horizons)
+        
+        return _encoded(400 if 'error' in result else 200, headers, result, fmt, delta, accept_encoding)
         
     except Exception as e:
         import traceback
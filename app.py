@@ -1,300 +1,584 @@
 # app.py
-import yfinance as yf
+import asyncio
+import os
 import pandas as pd
 import numpy as np
+from contextlib import nullcontext
 from datetime import datetime
-import feedparser
-
-# Lightweight sentiment analyzer (replaces NLTK)
-def simple_sentiment(text):
-    """Simple rule-based sentiment analyzer - returns score between -1 and 1"""
-    if not text:
-        return 0.0
-    
-    text_lower = text.lower()
-    
-    # Positive words
-    positive_words = ['bullish', 'rise', 'up', 'gain', 'profit', 'growth', 'strong', 
-                     'buy', 'positive', 'surge', 'rally', 'boom', 'success', 'win',
-                     'beat', 'outperform', 'soar', 'jump', 'climb', 'advance']
-    
-    # Negative words
-    negative_words = ['bearish', 'fall', 'down', 'loss', 'decline', 'weak', 'sell',
-                     'negative', 'drop', 'crash', 'bust', 'fail', 'lose', 'miss',
-                     'underperform', 'plunge', 'slide', 'dip', 'retreat', 'worry']
-    
-    pos_count = sum(1 for word in positive_words if word in text_lower)
-    neg_count = sum(1 for word in negative_words if word in text_lower)
-    
-    # Normalize to -1 to 1 range
-    total = pos_count + neg_count
-    if total == 0:
-        return 0.0
-    return (pos_count - neg_count) / max(total, 1)
-
-# Simple linear regression using numpy (replaces scikit-learn)
-class SimpleLinearRegression:
-    def __init__(self):
-        self.coef_ = None
-        self.intercept_ = None
-    
-    def fit(self, X, y):
-        """Fit linear regression model using least squares"""
-        # Add intercept term
-        X_with_intercept = np.column_stack([np.ones(X.shape[0]), X])
-        
-        # Solve using numpy's least squares
-        try:
-            coefs, residuals, rank, s = np.linalg.lstsq(X_with_intercept, y, rcond=None)
-        except np.linalg.LinAlgError:
-            # Fallback to pseudo-inverse if lstsq fails
-            coefs = np.linalg.pinv(X_with_intercept) @ y
-        
-        # Handle case where coefs might be 1D or 2D
-        if coefs.ndim > 1:
-            coefs = coefs.flatten()
-        
-        self.intercept_ = float(coefs[0])
-        self.coef_ = coefs[1:].astype(float)
-        return self
-    
-    def predict(self, X):
-        """Make predictions"""
-        if self.coef_ is None:
-            raise ValueError("Model must be fitted before prediction")
-        return self.intercept_ + np.dot(X, self.coef_)
-
-def mean_squared_error(y_true, y_pred):
-    """Calculate MSE"""
-    return np.mean((y_true - y_pred) ** 2)
-
-def r2_score(y_true, y_pred):
-    """Calculate R² score"""
-    ss_res = np.sum((y_true - y_pred) ** 2)
-    ss_tot = np.sum((y_true - np.mean(y_true)) ** 2)
-    if ss_tot == 0:
-        return 0.0
-    return 1 - (ss_res / ss_tot)
-
-def predict_stock(user_input):
+
+from features import get_default_pipeline
+from lookup import get_result_cache, normalize_ticker, prediction_partial, result_cache_key, result_events
+from metrics import inc, profiled, record_size, request_trace, stage
+from models import (DEFAULT_ALPHAS, MultiHorizonRegression, ResidualBootstrap, fit_batched, make_model,
+                    mean_squared_error, r2_score)
+from news import SHARED_RSS_URLS, ticker_rss_url, get_default_news_service
+from price_store import PRICE_COLUMNS, get_default_store
+from registry import data_fingerprint, get_default_registry
+from scheduler import get_prediction_store
+
+# Re-exported: app has always been the import point for these
+from lookup import MAX_HORIZONS, PREDICTION_KEYS, PRICE_KEYS, model_options
+from models import SimpleLinearRegression
+from sentiment import simple_sentiment
+
+__all__ = [
+    "START_DATE", "TRAIN_CUTOFF", "FORECAST_END", "BOOTSTRAP_RESAMPLES", "BOOTSTRAP_BUDGET", "INTERVAL_LEVEL",
+    "FEATURES", "walk_forward_rows", "walk_forward", "build_features", "price_nbytes", "news_window",
+    "predict_stock", "predict_stock_async", "cached_predict_stock", "compute_and_cache",
+    "predict_stock_events", "stream_predict_stock", "stream_and_cache", "predict_many",
+    # re-exports
+    "MAX_HORIZONS", "PREDICTION_KEYS", "PRICE_KEYS", "model_options", "normalize_ticker", "get_result_cache",
+    "result_cache_key", "prediction_partial", "result_events", "SHARED_RSS_URLS", "ticker_rss_url",
+    "SimpleLinearRegression", "simple_sentiment",
+]
+
+
+START_DATE = "2025-03-01"
+# Train up to Oct 10, 2025; fetch data up to Nov 09, 2025 for backtesting/forecast window
+TRAIN_CUTOFF = "2025-10-10"
+FORECAST_END = "2025-11-09"
+
+# Residual-bootstrap prediction intervals for the default (OLS) model;
+# STOCK_BOOTSTRAP_RESAMPLES=0 turns them off
+BOOTSTRAP_RESAMPLES = int(os.environ.get('STOCK_BOOTSTRAP_RESAMPLES', 1000))
+BOOTSTRAP_BUDGET = float(os.environ.get('STOCK_BOOTSTRAP_BUDGET_MS', 5)) / 1000
+INTERVAL_LEVEL = 0.9
+
+def walk_forward_rows(fs, features, train_cutoff_str, forecast_end_str):
+    """Rows behind walk_forward: (target dates, feature rows of the
+    previous calendar day, actual closes) over (train_cutoff, forecast_end]"""
+    dates = fs.dates
+    # pd.Timestamp: same result as pd.to_datetime for one string, without
+    # its format inference (most of this function's time otherwise)
+    forecast_start = np.datetime64(pd.Timestamp(train_cutoff_str) + pd.Timedelta(days=1))
+    forecast_end = np.datetime64(pd.Timestamp(forecast_end_str))
+    # Align to available trading days present in the feature rows
+    target_dates = np.sort(dates[(dates >= forecast_start) & (dates <= forecast_end)])
+
+    order = np.argsort(dates, kind='stable')
+    sorted_dates = dates[order]
+
+    def positions(wanted):
+        pos = np.minimum(np.searchsorted(sorted_dates, wanted), max(len(dates) - 1, 0))
+        found = sorted_dates[pos] == wanted if len(dates) else np.zeros(len(wanted), bool)
+        return order[pos], found
+
+    prev_pos, has_prev = positions(target_dates - np.timedelta64(1, 'D'))
+    target_dates = target_dates[has_prev]
+    rows = fs.matrix(features)[prev_pos[has_prev]]
+    actuals = fs['Close'][positions(target_dates)[0]].astype(float)
+    return target_dates, rows, actuals
+
+def walk_forward(fs, model, features, train_cutoff_str, forecast_end_str):
+    """Backtest the model over (train_cutoff, forecast_end].
+
+    Close_t is predicted from the features of calendar day t-1, consistent
+    with y = Close.shift(-1); target days whose previous calendar day is not
+    in the FeatureSet are skipped. Returns (target dates, predictions,
+    actual closes, directional flags), where flag i says whether the
+    predicted and actual moves from point i to i+1 had the same sign.
+    """
+    target_dates, rows, actuals = walk_forward_rows(fs, features, train_cutoff_str, forecast_end_str)
+    preds = np.asarray(model.predict(rows), dtype=float)
+
+    # Flat-vs-flat counts as a match, flat-vs-move as a miss
+    dir_ok = np.sign(np.diff(preds)) == np.sign(np.diff(actuals))
+    return pd.DatetimeIndex(target_dates), preds, actuals, dir_ok
+
+# Remove raw Sentiment as standalone feature; keep interactions only
+FEATURES = [
+    'Open','High','Low','Close','Volume','Return%',
+    'Sent_x_Return','Sent_x_PosRet','Sent_x_Volume'
+]
+
+def build_features(price, news_daily):
+    """Join daily sentiment onto prices and add the model features.
+
+    pandas reference for features.FeaturePipeline, which is what the
+    prediction path uses."""
+    if hasattr(news_daily, 'to_frame'):
+        news_daily = news_daily.to_frame()
+    price = price.copy()
+    price['DateOnly'] = price['Date'].dt.date
+    df = price.merge(news_daily,on="DateOnly",how="left")
+    df['Sentiment'] = df['Sentiment'].fillna(0)
+
+    df['PrevClose'] = df['Close'].shift(1)
+    df['Return%'] = ((df['Close'] - df['PrevClose'])/df['PrevClose'])*100
+    df = df.dropna()
+
+    # Domain-informed interaction features:
+    # - Positive sentiment with rising price => strong bullish
+    # - Positive sentiment with falling price => weak
+    # Implement by interacting sentiment with returns (and volume)
+    df['Sent_x_Return'] = df['Sentiment'] * df['Return%']
+    df['Sent_x_PosRet'] = df['Sentiment'] * df['Return%'].clip(lower=0)
+    df['Sent_x_Volume'] = df['Sentiment'] * df['Volume']
+    return df
+
+def _split(fs, features, train_cutoff_str):
+    """(X_all, close, cutoff, train, test) for a FeatureSet: rows pair the
+    features of day t with Close of the next row, split at the cutoff"""
+    X_all = fs.matrix(features)
+    close = fs['Close']
+    X = X_all[:-1]
+    y = close[1:]
+
+    # Train strictly up to the cutoff date
+    train_cutoff = np.datetime64(pd.to_datetime(train_cutoff_str))
+    train_idx = fs.dates[:-1] <= train_cutoff
+    # Hold out the remainder (after cutoff) for evaluation/backtest alignment
+    return X_all, close, train_cutoff, (X[train_idx], y[train_idx]), (X[~train_idx], y[~train_idx])
+
+def _prefit(feature_sets, train_cutoff_str, registry=None):
+    """Fit every ticker the registry has no current model for in one
+    models.fit_batched call and store the results, so the per-ticker
+    predictions that follow only load coefficients. Returns {ticker: model}
+    for every ticker with training rows."""
+    registry = registry or get_default_registry()
+    models = {}
+    pending = []
+    for TICKER, fs in feature_sets.items():
+        _, _, _, (X_train, y_train), _ = _split(fs, FEATURES, train_cutoff_str)
+        fingerprint = data_fingerprint(X_train, y_train, FEATURES, train_cutoff_str)
+        if not len(X_train):
+            continue
+        models[TICKER] = registry.load(TICKER, fingerprint)
+        if models[TICKER] is None:
+            pending.append((TICKER, X_train, y_train, fingerprint))
+    if not pending:
+        return models
+    fitted = fit_batched([p[1] for p in pending], [p[2] for p in pending])
+    for (TICKER, _, _, fingerprint), model in zip(pending, fitted):
+        registry.save(TICKER, model, FEATURES, train_cutoff_str, fingerprint)
+        models[TICKER] = model
+    return models
+
+def _predict_from_prices(TICKER, price, news_daily, train_cutoff_str=TRAIN_CUTOFF, forecast_end_str=FORECAST_END, registry=None,
+                         model="ols", horizons=None):
+    """Build features, fit the model and assemble the response dict"""
+    result = {}
+    for _, partial in _prediction_events(TICKER, price, news_daily, train_cutoff_str, forecast_end_str, registry,
+                                         model, horizons):
+        result.update(partial)
+    return result
+
+def _prediction_events(TICKER, price, news_daily, train_cutoff_str=TRAIN_CUTOFF, forecast_end_str=FORECAST_END, registry=None,
+                       model="ols", horizons=None):
+    """Generator behind _predict_from_prices: yields ("prediction", ...) once
+    the model is fitted and ("backtest", ...) after the walk-forward; the two
+    partials together are the response dict.
+
+    `model` names a models.MODELS entry; with `horizons` a direct
+    multi-horizon model also forecasts the next 1..horizons trading days.
+    """
+    model_name = model
+    with stage("features"):
+        fs = get_default_pipeline().build(TICKER, price, news_daily)
+        features = FEATURES
+        X_all, close, train_cutoff, (X_train, y_train), (X_test, y_test) = _split(fs, features, train_cutoff_str)
+
+    with stage("fit"):
+        # Reuse stored coefficients when the training data is unchanged
+        registry = registry or get_default_registry()
+        registry_key = TICKER if model_name == "ols" else f"{TICKER}@{model_name}"
+        fingerprint = data_fingerprint(X_train, y_train, features, train_cutoff_str)
+        model = registry.load(registry_key, fingerprint)
+        if model is None:
+            model = make_model(model_name)
+            model.fit(X_train, y_train)
+            registry.save(registry_key, model, features, train_cutoff_str, fingerprint)
+
+        pred_test = model.predict(X_test)
+        mse = mean_squared_error(y_test, pred_test)
+        rmse = mse**0.5
+        confidence = r2_score(y_test, pred_test)*100
+
+    bootstrap = None
+    if model_name == "ols" and BOOTSTRAP_RESAMPLES > 0 and len(X_train) > X_train.shape[1] + 1:
+        with stage("intervals"):
+            bootstrap = ResidualBootstrap(BOOTSTRAP_RESAMPLES, budget=BOOTSTRAP_BUDGET).fit(model, X_train, y_train)
+            # Next day and the backtest rows in one pass
+            _, rows, _ = walk_forward_rows(fs, features, train_cutoff_str, forecast_end_str)
+            lower, upper = bootstrap.interval(np.vstack([X_all[-1:], rows]), INTERVAL_LEVEL)
+
+    curr = close[-1]
+    latest_time = pd.Timestamp(fs.dates[-1])
+
+    pred_next = model.predict(X_all[-1:])[0]
+
+    with stage("serialize"):
+        # -------- CHART DATA FOR CLIENT-SIDE RENDERING (Plotly.js) --------
+        hist_dates = pd.Series(fs.dates).astype(str).tolist()
+        hist_close = close.astype(float).tolist()
+        pred_point_date = (latest_time + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        # ----------------------------------------------------------------
+
+    prediction = {
+        "ticker":TICKER,
+        "current_price":float(curr),
+        "current_time": latest_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "predicted_next":float(pred_next),
+        "accuracy":float(confidence),
+        "rmse":float(rmse),
+
+        # Chart data for client-side rendering (Plotly.js):
+        "hist_dates": hist_dates,
+        "hist_close": hist_close,
+        "pred_date": pred_point_date,
+        "pred_value": float(pred_next),
+    }
+    if bootstrap is not None:
+        prediction.update(pred_lower=float(lower[0]), pred_upper=float(upper[0]), interval_level=INTERVAL_LEVEL,
+                          interval_resamples=bootstrap.resamples_)
+    if model_name != "ols":
+        prediction["model"] = model_name
+    if horizons:
+        with stage("horizons"):
+            prediction.update(_horizon_forecast(fs, X_all, close, train_cutoff, latest_time, horizons, model_name))
+    # Split on the shared key list, like result_events does for a replay;
+    # fields outside it go out with the backtest
+    partial = prediction_partial(prediction)
+    yield "prediction", partial
+
+    # ===== Task 1: Generate daily predictions from Oct 11 to Nov 09 (walk-forward using previous-day features) =====
+    with stage("backtest"):
+        pred_dates, pred_values, actual_values, dir_ok = walk_forward(
+            fs, model, features, train_cutoff_str, forecast_end_str)
+
+        pred_series_dates = [d.strftime("%Y-%m-%d") for d in pred_dates]
+        pred_series_values = pred_values.tolist()
+        actual_series_values = actual_values.tolist()
+        # For index 0, we cannot compute a direction (needs previous day in series)
+        directional_flags = ([None] + dir_ok.tolist()) if len(pred_values) else []
+
+        # Compute comparison metrics over the points that carry a direction flag
+        if len(dir_ok):
+            err = pred_values[1:] - actual_values[1:]
+            comp_rmse = float(np.sqrt(np.mean(err**2)))
+            comp_mape = float(np.mean(np.abs(err / actual_values[1:])) * 100.0)
+            dir_accuracy = float(100.0 * np.mean(dir_ok))
+        else:
+            comp_rmse = None
+            comp_mape = None
+            dir_accuracy = None
+
+    # Comparison chart data is sent as JSON, rendered client-side with Plotly.js
+    # ===== End Task 1/2/3 =====
+
+    bands = {}
+    if bootstrap is not None:
+        bands = {"month_pred_lower": lower[1:].tolist(), "month_pred_upper": upper[1:].tolist()}
+
+    yield "backtest", {
+        **{k: v for k, v in prediction.items() if k not in partial},
+
+        # Task 1 outputs: one-month daily predictions up to Nov 09, 2025
+        "month_pred_dates": pred_series_dates,
+        "month_pred_values": pred_series_values,
+
+        # Task 2 outputs: backtesting for provided period (for generic ticker; user requested TCS.NS)
+        "backtest_dates": pred_series_dates,   # same target dates
+        "backtest_actuals": actual_series_values,
+
+        # Task 3: comparison + metrics (charts rendered client-side)
+        "comparison_rmse": comp_rmse,
+        "comparison_mape": comp_mape,
+
+        # Directional accuracy over the backtest window
+        "directional_accuracy": dir_accuracy,
+        "directional_flags": [bool(x) if x is not None else None for x in directional_flags],
+        **bands,
+    }
+
+def _horizon_forecast(fs, X_all, close, train_cutoff, latest_time, horizons, model_name):
+    """Direct 1..horizons-day forecasts from the latest feature row"""
+    multi = MultiHorizonRegression(horizons, alphas=DEFAULT_ALPHAS if model_name == "ridge" else None)
+    # Train on feature rows up to the cutoff, like the one-step model
+    n_train = int(np.searchsorted(fs.dates, train_cutoff, side="right"))
+    multi.fit(X_all[:n_train + horizons], close[:n_train + horizons])
+    values = multi.predict(X_all[-1:])[0]
+    dates = pd.bdate_range(latest_time + pd.Timedelta(days=1), periods=horizons)
+    return {
+        "horizon_dates": [d.strftime("%Y-%m-%d") for d in dates],
+        "horizon_values": [float(v) for v in values],
+    }
+
+def price_nbytes(price):
+    """Bytes held by the OHLCV columns of a price frame (or panel.PanelFrame)"""
+    return int(sum(np.asarray(price[c]).nbytes for c in PRICE_COLUMNS))
+
+def news_window(start, end):
+    """Headline dates kept for a price window (end inclusive)"""
+    return datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d")
+
+def predict_stock(user_input, store=None, news=None, registry=None,
+                  start=START_DATE, train_cutoff=TRAIN_CUTOFF, forecast_end=FORECAST_END,
+                  debug=False, profile=None, model="ols", horizons=None):
+    """Predict one symbol. Prices cover [start, forecast_end); the model is
+    trained on rows up to train_cutoff and backtested on the rest.
+
+    model="ridge" swaps the least-squares fit for GCV-tuned ridge;
+    horizons=k adds direct forecasts for the next k trading days.
+
+    debug=True attaches per-stage timings and sizes under "debug";
+    profile=True (or STOCK_PROFILE=1) adds a profiler report there too.
+    """
+    if profile is None:
+        profile = os.environ.get('STOCK_PROFILE') == '1'
+    inc("stock_predictions_total")
+    debug_info = {}
+    with request_trace() as trace:
+        with (profiled(debug_info) if profile else nullcontext()):
+            result = _predict_stock(user_input, store, news, registry, start, train_cutoff, forecast_end,
+                                    model, horizons)
+    if "error" in result:
+        inc("stock_prediction_errors_total")
+    if debug or profile:
+        debug_info.update(trace.as_dict())
+        result["debug"] = debug_info
+    return result
+
+def _predict_stock(user_input, store, news, registry, start, train_cutoff, forecast_end, model="ols", horizons=None):
     try:
         if not user_input or not isinstance(user_input, str):
             return {"error": "Invalid input"}
-        
-        if "." not in user_input:
-            TICKER = user_input.upper() + ".NS"
-        else:
-            TICKER = user_input.upper()
 
-        start = "2025-03-01"
-        # Train up to Oct 10, 2025; fetch data up to Nov 09, 2025 for backtesting/forecast window
-        train_cutoff_str = "2025-10-10"
-        forecast_end_str = "2025-11-09"
-        end   = forecast_end_str
+        TICKER = normalize_ticker(user_input)
 
+        # Read through the local price store; only dates it has not seen yet
+        # are downloaded from the provider.
+        store = store or get_default_store()
         try:
-            price = yf.download(TICKER, start=start, end=end, progress=False, auto_adjust=False)
+            with stage("download"):
+                price = store.get(TICKER, start, forecast_end)
         except Exception as e:
             return {"error": f"Failed to download data: {str(e)}"}
         
         if price is None or len(price)==0:
             return {"error":"no data"}
+        record_size("prices", price_nbytes(price))
 
-        if isinstance(price.columns, pd.MultiIndex):
-            price.columns = price.columns.droplevel(1)
-
-        price = price.reset_index()
-        price['Date'] = pd.to_datetime(price['Date'])
-        price = price[['Date','Open','High','Low','Close','Volume']]
-
-        rss_urls = [
-            f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={TICKER}&region=IN&lang=en-IN",
-            "https://www.thehindu.com/business/feeder/default.rss",
-            "https://feeds.feedburner.com/NDTV-Business",
-            "https://www.moneycontrol.com/rss/latestnews.xml"
-        ]
-
-        news_list=[]
-        start_date = datetime(2025,3,1)
-        end_date   = datetime(2025,11,9)
-
-        for url in rss_urls:
-            try:
-                rss = feedparser.parse(url)
-                for entry in rss.entries:
-                    if hasattr(entry,"published_parsed") and entry.published_parsed:
-                        try:
-                            dt = datetime(*entry.published_parsed[:6])
-                            if start_date.date() <= dt.date() <= end_date.date():
-                                sentiment = simple_sentiment(entry.title)
-                                news_list.append([dt.date(),sentiment])
-                        except (ValueError, TypeError, IndexError):
-                            continue
-            except Exception:
-                # Continue if RSS feed fails
-                continue
-
-        news_daily = pd.DataFrame(news_list, columns=['DateOnly','Sentiment'])
-        news_daily = news_daily.groupby("DateOnly")['Sentiment'].mean().reset_index()
-
-        price['DateOnly'] = price['Date'].dt.date
-        df = price.merge(news_daily,on="DateOnly",how="left")
-        df['Sentiment'] = df['Sentiment'].fillna(0)
-
-        df['PrevClose'] = df['Close'].shift(1)
-        df['Return%'] = ((df['Close'] - df['PrevClose'])/df['PrevClose'])*100
-        df = df.dropna()
-
-        # Domain-informed interaction features:
-        # - Positive sentiment with rising price => strong bullish
-        # - Positive sentiment with falling price => weak
-        # Implement by interacting sentiment with returns (and volume)
-        df['Sent_x_Return'] = df['Sentiment'] * df['Return%']
-        df['Sent_x_PosRet'] = df['Sentiment'] * df['Return%'].clip(lower=0)
-        df['Sent_x_Volume'] = df['Sentiment'] * df['Volume']
-
-        # Remove raw Sentiment as standalone feature; keep interactions only
-        features = [
-            'Open','High','Low','Close','Volume','Return%',
-            'Sent_x_Return','Sent_x_PosRet','Sent_x_Volume'
-        ]
-        X = df[features]
-        y = df['Close'].shift(-1).dropna()
-        X = X.iloc[:-1]
-
-        # Train strictly up to the cutoff date
-        train_cutoff = pd.to_datetime(train_cutoff_str)
-        train_idx = df['Date'].iloc[:-1] <= train_cutoff
-        X_train = X[train_idx]
-        y_train = y[train_idx.values]
-        # Hold out the remainder (after cutoff) for evaluation/backtest alignment
-        X_test = X[~train_idx]
-        y_test = y[~train_idx.values]
-
-        model = SimpleLinearRegression()
-        model.fit(X_train.values, y_train.values)
-
-        pred_test = model.predict(X_test.values)
-        mse = mean_squared_error(y_test.values, pred_test)
-        rmse = mse**0.5
-        confidence = r2_score(y_test.values, pred_test)*100
+        news = news or get_default_news_service()
+        with stage("news"):
+            news_daily = news.daily_sentiment([ticker_rss_url(TICKER)] + SHARED_RSS_URLS, *news_window(start, forecast_end))
+        return _predict_from_prices(TICKER, price, news_daily, train_cutoff, forecast_end, registry=registry,
+                                    model=model, horizons=horizons)
+    except Exception as e:
+        import traceback
+        return {"error": f"Prediction failed: {str(e)}", "traceback": traceback.format_exc()}
 
-        curr = df.iloc[-1]['Close']
-        latest_time = df.iloc[-1]['Date']
+async def predict_stock_async(user_input, store=None, news=None, registry=None, executor=None,
+                              start=START_DATE, train_cutoff=TRAIN_CUTOFF, forecast_end=FORECAST_END,
+                              model="ols", horizons=None):
+    """Async predict_stock: the price and news fetches are awaited
+    concurrently on worker threads, then the CPU-bound feature/fit/backtest
+    work runs on `executor` (the loop's default executor if None)."""
+    try:
+        if not user_input or not isinstance(user_input, str):
+            return {"error": "Invalid input"}
 
-        pred_next = model.predict(df.iloc[-1:][features].values)[0]
+        TICKER = normalize_ticker(user_input)
+        store = store or get_default_store()
+        news = news or get_default_news_service()
+        price, news_daily = await asyncio.gather(
+            asyncio.to_thread(store.get, TICKER, start, forecast_end),
+            asyncio.to_thread(news.daily_sentiment, [ticker_rss_url(TICKER)] + SHARED_RSS_URLS,
+                              *news_window(start, forecast_end)),
+            return_exceptions=True)
+        if isinstance(price, Exception):
+            return {"error": f"Failed to download data: {str(price)}"}
+        if price is None or len(price)==0:
+            return {"error":"no data"}
+        if isinstance(news_daily, Exception):
+            raise news_daily
 
-        # -------- CHART DATA FOR CLIENT-SIDE RENDERING (Plotly.js) --------
-        hist_dates = df['Date'].astype(str).tolist()
-        hist_close = df['Close'].astype(float).tolist()
-        pred_point_date = (df['Date'].iloc[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
-        # ----------------------------------------------------------------
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, _predict_from_prices, TICKER, price, news_daily, train_cutoff, forecast_end, registry,
+            model, horizons)
+    except Exception as e:
+        import traceback
+        return {"error": f"Prediction failed: {str(e)}", "traceback": traceback.format_exc()}
 
-        # ===== Task 1: Generate daily predictions from Oct 11 to Nov 09 (walk-forward using previous-day features) =====
-        forecast_start = pd.to_datetime(train_cutoff_str) + pd.Timedelta(days=1)
-        forecast_end = pd.to_datetime(forecast_end_str)
-        # Align to available trading days present in df
-        available_dates = df['Date']
-        target_dates = available_dates[(available_dates >= forecast_start) & (available_dates <= forecast_end)].sort_values()
-
-        pred_series_dates = []
-        pred_series_values = []
-        actual_series_values = []
-        directional_flags = []  # Will be computed after sequences are built (within-series day-over-day moves)
-
-        # Our model predicts Close_t using features from day t-1, consistent with y = Close.shift(-1)
-        for target_date in target_dates:
-            prev_day_mask = df['Date'] == (target_date - pd.Timedelta(days=1))
-            if not prev_day_mask.any():
-                # If previous trading day not found, skip
-                continue
-            prev_features = df.loc[prev_day_mask, features].values
-            pred_val = float(model.predict(prev_features)[0])
-            pred_series_dates.append(target_date.strftime("%Y-%m-%d"))
-            pred_series_values.append(pred_val)
-            # Actual close for target day (for backtest/comparison)
-            act_mask = df['Date'] == target_date
-            if act_mask.any():
-                act_val = float(df.loc[act_mask, 'Close'].values[0])
-                actual_series_values.append(act_val)
-            else:
-                actual_series_values.append(None)
-
-        # Compute directional flags based on within-series day-over-day movement
-        # For index 0, we cannot compute a direction (needs previous day in series)
-        for i in range(len(pred_series_values)):
-            if i == 0:
-                directional_flags.append(None)
-                continue
-            prev_pred = pred_series_values[i-1]
-            curr_pred = pred_series_values[i]
-            prev_act  = actual_series_values[i-1]
-            curr_act  = actual_series_values[i]
-            # Need actual values available for both consecutive days
-            if prev_act is None or curr_act is None:
-                directional_flags.append(None)
-                continue
-            pred_dir = np.sign(curr_pred - prev_pred)
-            act_dir  = np.sign(curr_act - prev_act)
-            if pred_dir == 0 and act_dir == 0:
-                directional_flags.append(True)
-            elif pred_dir == 0 or act_dir == 0:
-                directional_flags.append(False)
-            else:
-                directional_flags.append(bool(pred_dir == act_dir))
-
-        # Compute comparison metrics over overlapping non-null pairs
-        comp_df = pd.DataFrame({
-            'date': pred_series_dates,
-            'pred': pred_series_values,
-            'act': actual_series_values,
-            'dir_ok': directional_flags
-        })
-        comp_df = comp_df.dropna()
-        if not comp_df.empty:
-            comp_rmse = float(np.sqrt(np.mean((comp_df['pred'] - comp_df['act'])**2)))
-            comp_mape = float(np.mean(np.abs((comp_df['act'] - comp_df['pred']) / comp_df['act'])) * 100.0)
-            # Directional accuracy based on within-series flags (exclude None)
-            valid_flags = [flag for flag in directional_flags if flag is not None]
-            dir_accuracy = float(100.0 * np.mean(valid_flags)) if len(valid_flags) > 0 else None
-        else:
-            comp_rmse = None
-            comp_mape = None
-            dir_accuracy = None
+def cached_predict_stock(user_input, cache=None, model="ols", horizons=None, predictions=None):
+    """predict_stock behind the precomputed store and the response cache;
+    concurrent requests for the same ticker share one computation. Errors
+    are returned but not cached."""
+    if not user_input or not isinstance(user_input, str):
+        return predict_stock(user_input)
+    cache = cache or get_result_cache()
+    TICKER = normalize_ticker(user_input)
+    key = result_cache_key(TICKER, model, horizons)
+    # Watchlist tickers precomputed after the close are served as stored
+    precomputed = (predictions or get_prediction_store()).get(key)
+    if precomputed is not None:
+        return precomputed
+    return cache.get_or_compute(key, lambda: predict_stock(TICKER, model=model, horizons=horizons))
+
+def compute_and_cache(user_input, cache=None, model="ols", horizons=None):
+    """The miss path of cached_predict_stock, for callers that have already
+    tried lookup.cached_result: compute and cache without reading the
+    stores again"""
+    if not user_input or not isinstance(user_input, str):
+        return predict_stock(user_input)
+    cache = cache or get_result_cache()
+    TICKER = normalize_ticker(user_input)
+    return cache.compute(result_cache_key(TICKER, model, horizons),
+                         lambda: predict_stock(TICKER, model=model, horizons=horizons))
+
+def predict_stock_events(user_input, store=None, news=None, registry=None,
+                         start=START_DATE, train_cutoff=TRAIN_CUTOFF, forecast_end=FORECAST_END,
+                         model="ols", horizons=None):
+    """predict_stock as a generator of (event, partial result) pairs:
+
+        ("price", {ticker, current_price, current_time})   as soon as prices are read
+        ("prediction", {... predicted_next, accuracy, hist_*, pred_*})
+        ("backtest", {month_pred_*, backtest_*, comparison_*, directional_*})
+
+    Merging the partials in order gives the predict_stock response. A
+    failure at any point is yielded as ("failed", {"error": ...}) and ends
+    the stream. (Not "error": EventSource reserves that name for
+    transport errors.)
+    """
+    inc("stock_predictions_total")
+    for event, partial in _stock_events(user_input, store, news, registry, start, train_cutoff, forecast_end,
+                                        model, horizons):
+        if event == "failed":
+            inc("stock_prediction_errors_total")
+        yield event, partial
+
+def _stock_events(user_input, store, news, registry, start, train_cutoff, forecast_end, model, horizons):
+    try:
+        if not user_input or not isinstance(user_input, str):
+            yield "failed", {"error": "Invalid input"}
+            return
 
-        # Comparison chart data is sent as JSON, rendered client-side with Plotly.js
-        # ===== End Task 1/2/3 =====
-
-        return {
-            "ticker":TICKER,
-            "current_price":float(curr),
-            "current_time": latest_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "predicted_next":float(pred_next),
-            "accuracy":float(confidence),
-            "rmse":float(rmse),
-
-            # Chart data for client-side rendering (Plotly.js):
-            "hist_dates": hist_dates,
-            "hist_close": hist_close,
-            "pred_date": pred_point_date,
-            "pred_value": float(pred_next),
-
-            # Task 1 outputs: one-month daily predictions up to Nov 09, 2025
-            "month_pred_dates": pred_series_dates,
-            "month_pred_values": pred_series_values,
-
-            # Task 2 outputs: backtesting for provided period (for generic ticker; user requested TCS.NS)
-            "backtest_dates": pred_series_dates,   # same target dates
-            "backtest_actuals": actual_series_values,
-
-            # Task 3: comparison + metrics (charts rendered client-side)
-            "comparison_rmse": comp_rmse,
-            "comparison_mape": comp_mape,
-
-            # Directional accuracy over the backtest window
-            "directional_accuracy": dir_accuracy,
-            "directional_flags": [bool(x) if x is not None else None for x in directional_flags]
+        TICKER = normalize_ticker(user_input)
+        store = store or get_default_store()
+        try:
+            with stage("download"):
+                price = store.get(TICKER, start, forecast_end)
+        except Exception as e:
+            yield "failed", {"error": f"Failed to download data: {str(e)}"}
+            return
+        if price is None or len(price)==0:
+            yield "failed", {"error":"no data"}
+            return
+        record_size("prices", price_nbytes(price))
+        yield "price", {
+            "ticker": TICKER,
+            "current_price": float(np.asarray(price['Close'])[-1]),
+            "current_time": pd.Timestamp(np.asarray(price['Date'])[-1]).strftime("%Y-%m-%d %H:%M:%S"),
         }
+
+        news = news or get_default_news_service()
+        with stage("news"):
+            news_daily = news.daily_sentiment([ticker_rss_url(TICKER)] + SHARED_RSS_URLS, *news_window(start, forecast_end))
+        yield from _prediction_events(TICKER, price, news_daily, train_cutoff, forecast_end, registry,
+                                      model, horizons)
     except Exception as e:
         import traceback
-        return {"error": f"Prediction failed: {str(e)}", "traceback": traceback.format_exc()}
+        yield "failed", {"error": f"Prediction failed: {str(e)}", "traceback": traceback.format_exc()}
+
+def stream_predict_stock(user_input, cache=None, model="ols", horizons=None, predictions=None):
+    """predict_stock_events behind the precomputed store and the response
+    cache: a stored response is replayed immediately, a fresh one is
+    streamed and then cached."""
+    if not user_input or not isinstance(user_input, str):
+        yield from predict_stock_events(user_input)
+        return
+    cache = cache or get_result_cache()
+    TICKER = normalize_ticker(user_input)
+    key = result_cache_key(TICKER, model, horizons)
+    precomputed = (predictions or get_prediction_store()).get(key)
+    if precomputed is not None:
+        yield from result_events(precomputed)
+        return
+    cached = cache.backend.get(key)
+    if cached is not None:
+        cache.hits += 1
+        yield from result_events(cached)
+        return
+    yield from stream_and_cache(TICKER, cache, model, horizons)
+
+def stream_and_cache(user_input, cache=None, model="ols", horizons=None):
+    """The miss path of stream_predict_stock, for callers that have already
+    tried lookup.cached_result: stream a fresh prediction, then cache it"""
+    if not user_input or not isinstance(user_input, str):
+        yield from predict_stock_events(user_input)
+        return
+    cache = cache or get_result_cache()
+    TICKER = normalize_ticker(user_input)
+    cache.misses += 1
+    result = {}
+    for event, partial in predict_stock_events(TICKER, model=model, horizons=horizons):
+        result.update(partial)
+        yield event, partial
+    if cache.cacheable(result):
+        cache.backend.set(result_cache_key(TICKER, model, horizons), result, cache.ttl)
+
+def predict_many(tickers, store=None, news=None, registry=None,
+                 start=START_DATE, train_cutoff=TRAIN_CUTOFF, forecast_end=FORECAST_END):
+    """Predict a batch of symbols with one grouped download and one pass over
+    the shared feeds. Returns {ticker: result}; failures are reported per
+    ticker as {"error": ...} instead of aborting the batch."""
+    results = {}
+    symbols = []
+    for user_input in tickers:
+        if not user_input or not isinstance(user_input, str):
+            results[str(user_input)] = {"error": "Invalid input"}
+            continue
+        TICKER = normalize_ticker(user_input)
+        if TICKER not in symbols:
+            symbols.append(TICKER)
+    if not symbols:
+        return results
+
+    store = store or get_default_store()
+    with stage("download"):
+        prices = store.get_many(symbols, start, forecast_end)
+    # Warm every feed of the batch in one concurrent sweep
+    news = news or get_default_news_service()
+    with stage("news"):
+        news.refresh([ticker_rss_url(t) for t in symbols] + SHARED_RSS_URLS)
+
+    inputs = {}
+    for TICKER in symbols:
+        price = prices.get(TICKER)
+        if isinstance(price, Exception):
+            results[TICKER] = {"error": f"Failed to download data: {str(price)}"}
+        elif price is None or len(price)==0:
+            results[TICKER] = {"error":"no data"}
+        else:
+            inputs[TICKER] = price
+
+    # Fit all tickers without a stored model in one batched solve; a ticker
+    # that fails here is left to the per-ticker path to report
+    news_daily = {}
+    feature_sets = {}
+    for TICKER, price in inputs.items():
+        try:
+            news_daily[TICKER] = news.daily_sentiment([ticker_rss_url(TICKER)] + SHARED_RSS_URLS, *news_window(start, forecast_end))
+            with stage("features"):
+                feature_sets[TICKER] = get_default_pipeline().build(TICKER, price, news_daily[TICKER])
+        except Exception:
+            pass
+    try:
+        with stage("fit"):
+            _prefit(feature_sets, train_cutoff, registry)
+    except Exception:
+        pass
+
+    for TICKER, price in inputs.items():
+        try:
+            if TICKER not in news_daily:
+                news_daily[TICKER] = news.daily_sentiment([ticker_rss_url(TICKER)] + SHARED_RSS_URLS, *news_window(start, forecast_end))
+            results[TICKER] = _predict_from_prices(TICKER, price, news_daily[TICKER], train_cutoff, forecast_end, registry=registry)
+        except Exception as e:
+            import traceback
+            results[TICKER] = {"error": f"Prediction failed: {str(e)}", "traceback": traceback.format_exc()}
+    # Invalid inputs first, then tickers in request order
+    ordered = {k: v for k, v in results.items() if k not in symbols}
+    ordered.update((t, results[t]) for t in symbols)
+    return ordered
@@ -0,0 +1,220 @@
+# asgi.py
+"""Async serving mode.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Same JSON contract as api/predict.py, served by a dependency-free ASGI app.
+Price and news fetches are awaited concurrently, fitting runs on a thread
+pool, and at most STOCK_MAX_CONCURRENCY predictions run at once with up to
+STOCK_MAX_QUEUE more waiting; anything beyond that is answered immediately
+with 503 and a Retry-After header instead of piling up.
+
+Prediction responses honour {"format": "columnar", "delta": true} in the
+request body and are gzip/brotli compressed per Accept-Encoding.
+{"stream": "ndjson"} (or true) and {"stream": "sse"} - or an
+"Accept: text/event-stream" header - stream the current price, the
+prediction and the backtest as separate events as soon as each is ready.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app import (get_result_cache, model_options, normalize_ticker, predict_many, predict_stock_async,
+                 result_cache_key, stream_predict_stock)
+from encoding import encode_columnar, encode_response, stream_framer
+from metrics import inc, prometheus_text, record_size, stage
+from scheduler import get_prediction_store, start_from_env
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type"),
+]
+
+
+class PredictApp:
+    def __init__(self, max_concurrency=None, max_queue=None, retry_after=5, workers=None, cache=None):
+        self.max_concurrency = int(max_concurrency or os.environ.get('STOCK_MAX_CONCURRENCY', 8))
+        self.max_queue = int(max_queue if max_queue is not None else os.environ.get('STOCK_MAX_QUEUE', 16))
+        self.retry_after = retry_after
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                           thread_name_prefix="predict")
+        self.cache = cache
+        self.active = 0
+        self.rejected = 0
+        self._semaphore = None
+        self._inflight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        method, path = scope["method"], scope["path"]
+        if path == "/metrics" and method == "GET":
+            await self._send(send, 200, prometheus_text().encode(), b"text/plain; version=0.0.4")
+        elif path == "/healthz":
+            await self._json(send, 200, {"ok": True, "active": self.active})
+        elif path in ("/", "/api/predict"):
+            if method == "OPTIONS":
+                await self._send(send, 200, b"", b"application/json")
+            elif method == "POST":
+                headers = {k.lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+                await self._predict(await self._read_body(receive), send, headers)
+            else:
+                await self._json(send, 405, {"error": "Method not allowed"})
+        else:
+            await self._json(send, 404, {"error": "Not found"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                start_from_env()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _send(self, send, status, body, content_type, extra_headers=()):
+        headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+        headers += CORS_HEADERS + list(extra_headers)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _json(self, send, status, payload, extra_headers=(), fmt="default", delta=False,
+                    accept_encoding=None):
+        with stage("encode"):
+            body, content_encoding = encode_response(payload, fmt, delta, accept_encoding)
+        record_size("response", len(body))
+        extra_headers = list(extra_headers)
+        if content_encoding != "identity":
+            extra_headers += [(b"content-encoding", content_encoding.encode()),
+                              (b"vary", b"Accept-Encoding")]
+        await self._send(send, status, body, b"application/json", extra_headers)
+
+    async def _predict(self, raw, send, headers=None):
+        inc("stock_requests_total", route="asgi")
+        headers = headers or {}
+        accept_encoding = headers.get(b"accept-encoding", "")
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError as e:
+            await self._json(send, 400, {"error": "Invalid JSON in request body", "details": str(e)})
+            return
+        if not isinstance(body, dict):
+            body = {}
+        fmt = body.get("format", "default")
+        if fmt not in ("default", "columnar"):
+            await self._json(send, 400, {"error": 'format must be "default" or "columnar"'})
+            return
+        delta = bool(body.get("delta"))
+        try:
+            model, horizons = model_options(body)
+        except ValueError as e:
+            await self._json(send, 400, {"error": str(e)})
+            return
+        stream = body.get("stream")
+        if stream is None and "text/event-stream" in headers.get(b"accept", ""):
+            stream = "sse"
+        if stream not in (None, False, True, "ndjson", "sse"):
+            await self._json(send, 400, {"error": 'stream must be true, "ndjson" or "sse"'})
+            return
+        stocks = body.get("stocks")
+        stock = body.get("stock", "")
+        if stocks is None and (not isinstance(stock, str) or not stock):
+            await self._json(send, 400, {"error": "Stock symbol is required"})
+            return
+        if stocks is not None and (not isinstance(stocks, list) or not stocks):
+            await self._json(send, 400, {"error": "stocks must be a non-empty list"})
+            return
+        if stocks is not None and stream:
+            await self._json(send, 400, {"error": "stream is only supported for a single stock"})
+            return
+
+        # Backpressure: refuse rather than queue without bound
+        if self.active >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            inc("stock_rejected_total", route="asgi")
+            await self._json(send, 503, {"error": "Server busy, retry later"},
+                             [(b"retry-after", str(self.retry_after).encode())])
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.active += 1
+        try:
+            async with self._semaphore:
+                if stocks is not None:
+                    loop = asyncio.get_running_loop()
+                    symbols = [s.upper() if isinstance(s, str) else s for s in stocks]
+                    results = await loop.run_in_executor(self.executor, predict_many, symbols)
+                    if fmt == "columnar":
+                        results = {t: encode_columnar(r, delta) for t, r in results.items()}
+                    await self._json(send, 200, {"results": results}, accept_encoding=accept_encoding)
+                    return
+                if stream:
+                    await self._stream(send, stock.upper(), "sse" if stream == "sse" else "ndjson", model, horizons)
+                    return
+                result = await self._cached_predict(stock.upper(), model, horizons)
+        finally:
+            self.active -= 1
+        await self._json(send, 400 if "error" in result else 200, result, fmt=fmt, delta=delta,
+                         accept_encoding=accept_encoding)
+
+    async def _stream(self, send, stock, mode, model="ols", horizons=None):
+        """Send each stream_predict_stock event as its own body chunk"""
+        content_type, frame = stream_framer(mode)
+        headers = [(b"content-type", content_type.encode()), (b"cache-control", b"no-cache")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers + CORS_HEADERS})
+        loop = asyncio.get_running_loop()
+        events = stream_predict_stock(stock, self.cache, model, horizons)
+        end = object()
+        while True:
+            item = await loop.run_in_executor(self.executor, next, events, end)
+            if item is end:
+                break
+            await send({"type": "http.response.body", "body": frame(*item), "more_body": True})
+        await send({"type": "http.response.body", "body": frame("done", {})})
+
+    async def _cached_predict(self, stock, model="ols", horizons=None):
+        """Precomputed store and response cache lookups plus in-loop
+        coalescing of identical misses"""
+        cache = self.cache or get_result_cache()
+        key = result_cache_key(normalize_ticker(stock), model, horizons)
+        precomputed = get_prediction_store().get(key)
+        if precomputed is not None:
+            return precomputed
+        cached = cache.backend.get(key)
+        if cached is not None:
+            cache.hits += 1
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            cache.coalesced += 1
+            return await asyncio.shield(pending)
+        cache.misses += 1
+        future = asyncio.ensure_future(predict_stock_async(stock, executor=self.executor, model=model,
+                                                           horizons=horizons))
+        self._inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(key, None)
+        if cache.cacheable(result):
+            cache.backend.set(key, result, cache.ttl)
+        return result
+
+
+app = PredictApp()
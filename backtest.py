@@ -0,0 +1,141 @@
+# backtest.py
+"""Rolling-origin evaluation over many train cutoffs.
+
+Feature matrices are built once per ticker; each worker walks its share of
+the cutoffs in date order and only feeds the rows added since the previous
+cutoff into an IncrementalLinearRegression, so a fold costs one small
+solve instead of a full refit.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models import IncrementalLinearRegression
+
+
+def make_cutoffs(first_cutoff, last_cutoff, step_days=21):
+    """Evenly spaced cutoff dates, both ends inclusive"""
+    return list(pd.date_range(first_cutoff, last_cutoff, freq=f"{int(step_days)}D"))
+
+
+def design_matrix(fs, features):
+    """(X, y, dates) for one ticker's FeatureSet: features of day t against
+    Close of the next row"""
+    X = fs.matrix(features)[:-1]
+    y = fs['Close'][1:].astype(float)
+    dates = fs.dates[:-1].astype('datetime64[D]')
+    return X, y, dates
+
+
+def fold_metrics(pred, act):
+    """RMSE, MAPE (%) and directional accuracy (%) of one test block"""
+    if len(pred) == 0:
+        return None, None, None
+    err = pred - act
+    rmse = float(np.sqrt(np.mean(err ** 2)))
+    mape = float(np.mean(np.abs(err / act)) * 100.0)
+    dir_ok = np.sign(np.diff(pred)) == np.sign(np.diff(act))
+    dir_acc = float(100.0 * np.mean(dir_ok)) if len(dir_ok) else None
+    return rmse, mape, dir_acc
+
+
+def run_folds(X, y, dates, cutoffs, horizon_days=30, mode="expanding", window=None):
+    """Evaluate every cutoff in order on one ticker's design matrix.
+
+    mode="expanding" trains on all rows up to the cutoff; mode="sliding"
+    trains on the last `window` rows only. The test block of a fold is the
+    rows dated (cutoff, cutoff + horizon_days].
+    """
+    if mode not in ("expanding", "sliding"):
+        raise ValueError(f"Unknown mode: {mode}")
+    if mode == "sliding" and not window:
+        raise ValueError("sliding mode needs a window (rows)")
+    model = IncrementalLinearRegression(window=window if mode == "sliding" else None)
+    horizon = np.timedelta64(int(horizon_days), 'D')
+    folds = []
+    fed = 0
+    for cutoff in sorted(np.datetime64(pd.Timestamp(c), 'D') for c in cutoffs):
+        upto = int(np.searchsorted(dates, cutoff, side="right"))
+        if upto > fed:
+            model.partial_fit(X[fed:upto], y[fed:upto])
+            fed = upto
+        test_end = int(np.searchsorted(dates, cutoff + horizon, side="right"))
+        fold = {
+            "cutoff": str(cutoff),
+            "train_rows": min(fed, window) if mode == "sliding" else fed,
+            "test_rows": test_end - upto,
+            "rmse": None, "mape": None, "directional_accuracy": None,
+        }
+        if model.coef_ is not None and test_end > upto:
+            pred = model.predict(X[upto:test_end])
+            fold["rmse"], fold["mape"], fold["directional_accuracy"] = fold_metrics(pred, y[upto:test_end])
+        folds.append(fold)
+    return folds
+
+
+def _run_task(task):
+    ticker, X, y, dates, cutoffs, horizon_days, mode, window = task
+    return ticker, run_folds(X, y, dates, cutoffs, horizon_days, mode, window)
+
+
+def run_backtest(matrices, cutoffs, horizon_days=30, mode="expanding", window=None, workers=None):
+    """Rolling-origin backtest for many tickers.
+
+    `matrices` maps ticker -> (X, y, dates) from design_matrix(). Cutoffs
+    are split into contiguous chunks so folds of the same ticker can run on
+    different cores; each chunk still walks forward incrementally. Returns
+    {ticker: [fold, ...]} with folds in cutoff order.
+    """
+    workers = workers or os.cpu_count() or 1
+    cutoffs = sorted(pd.Timestamp(c) for c in cutoffs)
+    chunks = max(1, min(len(cutoffs), math.ceil(workers / max(len(matrices), 1))))
+    size = math.ceil(len(cutoffs) / chunks) if cutoffs else 0
+    tasks = [
+        (ticker, X, y, dates, cutoffs[i:i + size], horizon_days, mode, window)
+        for ticker, (X, y, dates) in matrices.items()
+        for i in range(0, len(cutoffs), size or 1)
+    ]
+    if workers == 1 or len(tasks) <= 1:
+        outputs = list(map(_run_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    results = {ticker: [] for ticker in matrices}
+    for ticker, folds in outputs:
+        results[ticker].extend(folds)
+    return results
+
+
+def backtest_tickers(tickers, start, end, cutoffs, horizon_days=30, mode="expanding",
+                     window=None, workers=None, store=None, news=None):
+    """Load prices and news once, build each design matrix once, then run
+    run_backtest(). Tickers that fail to load map to {"error": ...}."""
+    from app import FEATURES, SHARED_RSS_URLS, news_window, normalize_ticker, ticker_rss_url
+    from features import get_default_pipeline
+    from news import get_default_news_service
+    from price_store import get_default_store
+
+    store = store or get_default_store()
+    news = news or get_default_news_service()
+    symbols = list(dict.fromkeys(normalize_ticker(t) for t in tickers))
+    prices = store.get_many(symbols, start, end)
+    news.refresh([ticker_rss_url(t) for t in symbols] + SHARED_RSS_URLS)
+
+    matrices, errors = {}, {}
+    for ticker in symbols:
+        price = prices.get(ticker)
+        if isinstance(price, Exception):
+            errors[ticker] = {"error": f"Failed to download data: {str(price)}"}
+            continue
+        if price is None or len(price) < 3:
+            errors[ticker] = {"error": "no data"}
+            continue
+        news_daily = news.daily_sentiment([ticker_rss_url(ticker)] + SHARED_RSS_URLS, *news_window(start, end))
+        matrices[ticker] = design_matrix(get_default_pipeline().build(ticker, price, news_daily), FEATURES)
+
+    results = run_backtest(matrices, cutoffs, horizon_days, mode, window, workers)
+    results.update(errors)
+    return results
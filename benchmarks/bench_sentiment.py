@@ -0,0 +1,47 @@
+"""Micro-benchmark: simple_sentiment vs SentimentScorer.score_many.
+
+Run from the repo root:  python -m benchmarks.bench_sentiment [N]
+"""
+import random
+import sys
+import time
+
+from sentiment import NEGATIVE_WORDS, POSITIVE_WORDS, SentimentScorer, simple_sentiment
+
+FILLER = ['shares', 'market', 'sensex', 'nifty', 'quarter', 'results', 'company', 'investors',
+          'bank', 'rbi', 'policy', 'update', 'today', 'stock', 'index', 'rupee', 'oil', 'it']
+
+
+def make_headlines(n, unique=5000, seed=0):
+    """n headlines drawn from `unique` distinct ones, as in real feed overlap"""
+    rng = random.Random(seed)
+    vocab = FILLER * 3 + POSITIVE_WORDS + NEGATIVE_WORDS
+    pool = [" ".join(rng.choice(vocab) for _ in range(rng.randint(6, 12))).capitalize()
+            for _ in range(unique)]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def run(n=100000):
+    headlines = make_headlines(n)
+    results = {}
+    results['simple_sentiment'] = timed(lambda: [simple_sentiment(h) for h in headlines])
+    scorer = SentimentScorer(cache_size=0)
+    results['scorer_uncached'] = timed(lambda: [scorer.score(h) for h in headlines])
+    scorer = SentimentScorer()
+    results['score_many_cold'] = timed(lambda: scorer.score_many(headlines))
+    results['score_many_warm'] = timed(lambda: scorer.score_many(headlines))
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    base = None
+    for name, secs in run(n).items():
+        base = base or secs
+        print(f"{name:<18} {secs * 1000:9.1f} ms  {n / secs:12,.0f} headlines/s  x{base / secs:5.1f}")
@@ -0,0 +1,94 @@
+"""Timing harness shared by the benchmark suites"""
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=20):
+    """Register fn(ctx) -> callable; the callable is what gets timed"""
+    def register(fn):
+        BENCHMARKS[name] = (fn, repeat)
+        return fn
+    return register
+
+
+class Context:
+    """Scratch space for one benchmark; cleaned up afterwards"""
+
+    def __init__(self, quick=False):
+        self.quick = quick
+        self.dir = tempfile.mkdtemp(prefix="stock-bench-")
+        self.extra = {}
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "n": int(len(ms)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "min_ms": float(ms.min()),
+    }
+
+
+def run_one(name, quick=False, repeat=None):
+    setup, default_repeat = BENCHMARKS[name]
+    repeat = repeat or (max(3, default_repeat // 4) if quick else default_repeat)
+    ctx = Context(quick)
+    try:
+        fn = setup(ctx)
+        fn()  # warm-up
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result = _percentiles(samples)
+        result["peak_mem_kb"] = peak / 1024.0
+        result.update(ctx.extra)
+        return result
+    finally:
+        ctx.close()
+
+
+def environment():
+    import pandas
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(current, baseline):
+    lines = [f"{'benchmark':<28} {'base p50':>10} {'new p50':>10} {'change':>8}"]
+    for name, res in current.items():
+        base = baseline.get(name)
+        if not base:
+            lines.append(f"{name:<28} {'-':>10} {res['p50_ms']:10.2f} {'new':>8}")
+            continue
+        change = (res["p50_ms"] / base["p50_ms"] - 1.0) * 100.0 if base["p50_ms"] else 0.0
+        lines.append(f"{name:<28} {base['p50_ms']:10.2f} {res['p50_ms']:10.2f} {change:+7.1f}%")
+    return "\n".join(lines)
@@ -0,0 +1,71 @@
+"""Regenerate the offline fixtures in benchmarks/fixtures/.
+
+    python -m benchmarks.make_fixtures
+
+Prices are a seeded geometric random walk with realistic OHLC spreads and
+volumes; feeds are RSS 2.0 files built from a fixed headline grammar. The
+output is deterministic so committed fixtures and baselines stay comparable.
+"""
+import os
+import random
+from email.utils import format_datetime
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+
+TICKERS = {"TCS.NS": 3400.0, "INFY.NS": 1500.0, "RELIANCE.NS": 1300.0}
+START, END = "2022-01-03", "2025-11-08"
+FEEDS = ["yahoo", "thehindu", "ndtv", "moneycontrol"]
+
+SUBJECTS = ["Sensex", "Nifty", "TCS", "Infosys", "Reliance", "IT stocks", "Bank Nifty", "Rupee",
+            "Auto shares", "Pharma index", "Metal stocks", "FMCG majors"]
+MOVES = ["rise", "gain", "surge", "rally", "climb", "jump", "fall", "drop", "slide", "plunge",
+         "decline", "dip", "trade flat", "hold steady", "see mixed trade"]
+CONTEXT = ["on strong quarterly profit", "as investors book profit", "amid global worry",
+           "after RBI policy", "on FII buying", "as crude oil prices advance", "on weak demand outlook",
+           "ahead of results", "as brokerages upgrade outlook", "after earnings miss", "", ""]
+
+
+def make_prices(ticker, base, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(START, END)
+    rets = rng.normal(0.0004, 0.015, len(dates))
+    close = base * np.exp(np.cumsum(rets))
+    open_ = close * np.exp(rng.normal(0, 0.006, len(dates)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.007, len(dates))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.007, len(dates))))
+    volume = (rng.lognormal(14, 0.4, len(dates))).astype(np.int64)
+    return pd.DataFrame({"Date": dates.strftime("%Y-%m-%d"), "Open": open_.round(2), "High": high.round(2),
+                         "Low": low.round(2), "Close": close.round(2), "Volume": volume})
+
+
+def make_feed(name, seed, items=120):
+    rng = random.Random(seed)
+    start = pd.Timestamp("2025-03-01")
+    out = ['<?xml version="1.0" encoding="UTF-8"?>', '<rss version="2.0"><channel>',
+           f"<title>{name} business (fixture)</title>"]
+    for _ in range(items):
+        when = start + pd.Timedelta(minutes=rng.randrange(0, 253 * 24 * 60))
+        title = f"{rng.choice(SUBJECTS)} {rng.choice(MOVES)} {rng.choice(CONTEXT)}".strip()
+        out.append(f"<item><title>{title}</title>"
+                   f"<pubDate>{format_datetime(when.tz_localize('UTC').to_pydatetime())}</pubDate></item>")
+    out.append("</channel></rss>")
+    return "\n".join(out) + "\n"
+
+
+def main():
+    os.makedirs(os.path.join(FIXTURES, "prices"), exist_ok=True)
+    os.makedirs(os.path.join(FIXTURES, "feeds"), exist_ok=True)
+    for i, (ticker, base) in enumerate(sorted(TICKERS.items())):
+        make_prices(ticker, base, seed=100 + i).to_csv(
+            os.path.join(FIXTURES, "prices", ticker + ".csv"), index=False)
+    for i, name in enumerate(FEEDS):
+        with open(os.path.join(FIXTURES, "feeds", name + ".xml"), "w") as f:
+            f.write(make_feed(name, seed=200 + i))
+
+
+if __name__ == "__main__":
+    main()
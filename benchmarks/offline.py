@@ -0,0 +1,133 @@
+"""Offline data sources for benchmarks: fixture prices and feeds injected
+through the PriceProvider / NewsService interfaces instead of yf.download
+and network feedparser calls, plus a local HTTP stand-in for the feed
+hosts."""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import feedparser
+import numpy as np
+import pandas as pd
+
+from news import SHARED_RSS_URLS, NewsService
+from price_store import FrameProvider
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FEED_FILES = dict(zip(SHARED_RSS_URLS, ["thehindu.xml", "ndtv.xml", "moneycontrol.xml"]))
+
+
+def load_prices():
+    """{ticker: Date/OHLCV frame} from fixtures/prices/*.csv"""
+    frames = {}
+    directory = os.path.join(FIXTURES, "prices")
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".csv"):
+            frame = pd.read_csv(os.path.join(directory, name), parse_dates=["Date"])
+            frames[name[:-4]] = frame
+    return frames
+
+
+def synthetic_universe(n, years=None, seed=0):
+    """n tickers whose returns are resampled from the recorded series.
+
+    With `years`, the history is extended (by resampling) to roughly that
+    many years of business days ending on the last recorded date.
+    """
+    recorded = list(load_prices().values())
+    rng = np.random.default_rng(seed)
+    end = max(f["Date"].max() for f in recorded)
+    frames = {}
+    for i in range(n):
+        src = recorded[i % len(recorded)]
+        dates = src["Date"] if years is None else pd.bdate_range(end=end, periods=int(years * 252))
+        rets = np.log(src["Close"]).diff().dropna().values
+        idx = rng.integers(0, len(rets), len(dates))
+        close = src["Close"].iloc[0] * np.exp(np.cumsum(rets[idx]))
+        spread_hi = (src["High"] / src["Close"]).values[idx]
+        spread_lo = (src["Low"] / src["Close"]).values[idx]
+        spread_op = (src["Open"] / src["Close"]).values[idx]
+        frames[f"SYN{i:04d}.NS"] = pd.DataFrame({
+            "Date": pd.DatetimeIndex(dates), "Open": close * spread_op, "High": close * spread_hi,
+            "Low": close * spread_lo, "Close": close, "Volume": src["Volume"].values[idx],
+        })
+    return frames
+
+
+def feed_path(url):
+    name = FEED_FILES.get(url, "yahoo.xml")
+    return os.path.join(FIXTURES, "feeds", name)
+
+
+def offline_parse(url, etag=None, modified=None, **kwargs):
+    """feedparser.parse replacement that reads the fixture for `url`"""
+    return feedparser.parse(feed_path(url))
+
+
+def offline_provider(frames=None):
+    return FrameProvider(frames if frames is not None else load_prices())
+
+
+def offline_news(ttl=3600):
+    return NewsService(ttl=ttl, parse=offline_parse)
+
+
+class FeedServer:
+    """Serves the fixture feeds over local HTTP (with ETags, so revalidation
+    gets 304s). Every `fail_every`-th request answers `fail_status` (503
+    by default, with Retry-After: `retry_after`), and `down` makes every
+    request fail, to exercise the fetch layer."""
+
+    def __init__(self, fail_every=0, fail_status=503, retry_after="0"):
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.down = False
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._serve(self)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self._httpd.server_port
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def _serve(self, handler):
+        with self._lock:
+            self.requests += 1
+            fail = self.down or (self.fail_every and self.requests % self.fail_every == 0)
+        path = os.path.join(FIXTURES, "feeds", os.path.basename(handler.path.split("?")[0]))
+        if fail:
+            code, body, headers = self.fail_status, b"", {"Retry-After": self.retry_after}
+        elif not os.path.exists(path):
+            code, body, headers = 404, b"", {}
+        else:
+            etag = '"%d"' % os.stat(path).st_mtime_ns
+            if handler.headers.get("If-None-Match") == etag:
+                code, body, headers = 304, b"", {"ETag": etag}
+            else:
+                with open(path, "rb") as f:
+                    body = f.read()
+                code, headers = 200, {"ETag": etag, "Content-Type": "application/rss+xml"}
+        handler.send_response(code)
+        for key, value in headers.items():
+            handler.send_header(key, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def feed_urls(self, copies=1):
+        names = sorted(os.listdir(os.path.join(FIXTURES, "feeds")))
+        return ["%s/%s?copy=%d" % (self.url, n, i) for i in range(copies) for n in names]
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,63 @@
+"""Offline benchmark suite.
+
+    python -m benchmarks.run                      # all benchmarks
+    python -m benchmarks.run --only sentiment_100k,batch_throughput
+    python -m benchmarks.run --save benchmarks/results/base.json
+    python -m benchmarks.run --compare benchmarks/results/base.json
+
+Every benchmark runs on the fixtures in benchmarks/fixtures (or synthetic
+series resampled from them); nothing touches the network. Latencies are
+reported as p50/p95/p99 over the timed repetitions, and peak Python heap
+usage is measured in a separate tracemalloc pass so it does not distort
+the timings.
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.harness import BENCHMARKS, compare, environment, run_one
+
+
+def main(argv=None):
+    # Benchmarks register themselves on import
+    from benchmarks import suites  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, help="timed repetitions per benchmark")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and smaller inputs")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmark(s): " + ", ".join(unknown))
+
+    results = {}
+    for name in names:
+        res = results[name] = run_one(name, args.quick, args.repeat)
+        extra = {k: v for k, v in res.items() if not k.endswith("_ms") and k != "n"}
+        print(f"{name:<28} p50 {res['p50_ms']:9.2f} ms  p95 {res['p95_ms']:9.2f}  "
+              f"p99 {res['p99_ms']:9.2f}  {json.dumps(extra)}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print()
+        print(compare(results, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
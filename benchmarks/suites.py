@@ -0,0 +1,526 @@
+"""Benchmark definitions for benchmarks.run"""
+import os
+import subprocess
+import sys
+
+from app import predict_many, predict_stock, predict_stock_events
+from backtest import backtest_tickers, make_cutoffs
+from benchmarks.bench_sentiment import make_headlines
+from benchmarks.harness import benchmark
+from benchmarks.offline import FeedServer, offline_news, offline_provider, synthetic_universe
+from models import SimpleLinearRegression
+from price_store import PriceStore
+from registry import ModelRegistry
+from sentiment import SentimentScorer, simple_sentiment
+
+
+@benchmark("single_ticker_cold", repeat=20)
+def single_ticker_cold(ctx):
+    """predict_stock with empty price store, registry and news cache"""
+    provider = offline_provider()
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        store = PriceStore(ctx.path(f"cold{counter[0]}.sqlite"), provider)
+        registry = ModelRegistry(ctx.path(f"models{counter[0]}"))
+        result = predict_stock("TCS", store=store, news=offline_news(), registry=registry)
+        assert "error" not in result, result
+    return run
+
+
+@benchmark("single_ticker_warm", repeat=50)
+def single_ticker_warm(ctx):
+    """predict_stock with everything cached except the response itself"""
+    store = PriceStore(ctx.path("warm.sqlite"), offline_provider())
+    registry = ModelRegistry(ctx.path("models"))
+    news = offline_news()
+
+    def run():
+        result = predict_stock("TCS", store=store, news=news, registry=registry)
+        assert "error" not in result, result
+    return run
+
+
+@benchmark("single_ticker_precomputed", repeat=200)
+def single_ticker_precomputed(ctx):
+    """cached_predict_stock for a watchlist ticker precomputed after the close"""
+    from app import cached_predict_stock, result_cache_key
+    from cache import MemoryBackend, ResultCache
+    from scheduler import PredictionStore
+    store = PriceStore(ctx.path("precomputed.sqlite"), offline_provider())
+    result = predict_stock("TCS", store=store, news=offline_news(), registry=ModelRegistry(ctx.path("models")))
+    predictions = PredictionStore(ctx.path("predictions"))
+    predictions.put(result_cache_key("TCS.NS"), result, 3600)
+    # An empty response cache, so every call is answered by the store
+    cache = ResultCache(MemoryBackend(), ttl=0)
+
+    def run():
+        assert "error" not in cached_predict_stock("TCS", cache=cache, predictions=predictions)
+    return run
+
+
+@benchmark("stream_first_event_cold", repeat=20)
+def stream_first_event_cold(ctx):
+    """Time to the first streamed event ("price") with a cold price store"""
+    provider = offline_provider()
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        store = PriceStore(ctx.path(f"stream{counter[0]}.sqlite"), provider)
+        registry = ModelRegistry(ctx.path(f"models{counter[0]}"))
+        events = predict_stock_events("TCS", store=store, news=offline_news(), registry=registry)
+        event, _ = next(events)
+        assert event == "price", event
+        events.close()
+    return run
+
+
+@benchmark("price_read_store", repeat=200)
+def price_read_store(ctx):
+    """One ticker's window from a warm SQLite PriceStore (DataFrame built per call)"""
+    from app import FORECAST_END, START_DATE
+    store = PriceStore(ctx.path("read.sqlite"), offline_provider())
+    store.get("TCS.NS", START_DATE, FORECAST_END)
+
+    def run():
+        store.get("TCS.NS", START_DATE, FORECAST_END)
+    return run
+
+
+@benchmark("price_read_panel", repeat=200)
+def price_read_panel(ctx):
+    """The same window as zero-copy views from the memory-mapped panel"""
+    from app import FORECAST_END, START_DATE
+    from panel import PanelStore, SharedPanel, write_panel
+    write_panel(offline_provider().frames, ctx.path("panel"))
+    store = PanelStore(SharedPanel(ctx.path("panel")))
+
+    def run():
+        store.get("TCS.NS", START_DATE, FORECAST_END)
+    return run
+
+
+@benchmark("batch_throughput", repeat=5)
+def batch_throughput(ctx):
+    """predict_many over a synthetic universe with a cold price store"""
+    n = 20 if ctx.quick else 100
+    provider = offline_provider(synthetic_universe(n))
+    news = offline_news()
+    counter = [0]
+    ctx.extra["tickers"] = n
+
+    def run():
+        counter[0] += 1
+        store = PriceStore(ctx.path(f"batch{counter[0]}.sqlite"), provider)
+        registry = ModelRegistry(ctx.path(f"models{counter[0]}"))
+        results = predict_many(list(provider.frames), store=store, news=news, registry=registry)
+        assert not any("error" in r for r in results.values())
+    return run
+
+
+@benchmark("intraday_ticks", repeat=5)
+def intraday_ticks(ctx):
+    """100k quote ticks over 500 tracked tickers through intraday.run()"""
+    from intraday import IntradayBook, Quote, ReplaySource, run
+    import numpy as np
+    n = 100 if ctx.quick else 500
+    frames = synthetic_universe(n)
+    session = max(f["Date"].max() for f in frames.values()) + np.timedelta64(1, "D")
+    book = IntradayBook()
+    errors = book.track(list(frames), session=session.date(), store=PriceStore(ctx.path("intraday.sqlite"),
+                        offline_provider(frames)), news=offline_news(), registry=ModelRegistry(ctx.path("models")))
+    assert not errors, errors
+    rng = np.random.default_rng(0)
+    ticks = 100000
+    last = np.array([frames[t]["Close"].iloc[-1] for t in book.tickers])
+    which = rng.integers(0, n, ticks)
+    prices = last[which] * (1 + rng.normal(0, 0.002, ticks))
+    source = ReplaySource([Quote(book.tickers[w], p, 1000.0 * i, None)
+                           for i, (w, p) in enumerate(zip(which.tolist(), prices.tolist()))])
+    ctx.extra["tickers"] = n
+    ctx.extra["ticks"] = ticks
+
+    def run_ticks():
+        run(book, source)
+    return run_ticks
+
+
+def _headline_rows(n=200000, feeds=20, seed=0):
+    import numpy as np
+    from datetime import date, timedelta
+    rng = np.random.default_rng(seed)
+    base = date(2020, 1, 1)
+    days = rng.integers(0, 5 * 365, n)
+    return ([f"feed{i}" for i in rng.integers(0, feeds, n)], [base + timedelta(days=int(d)) for d in days],
+            [f"headline {i}" for i in range(n)], rng.normal(0, 0.3, n))
+
+
+@benchmark("news_daily_store", repeat=50)
+def news_daily_store(ctx):
+    """Daily sentiment for 4 of 20 feeds over one year, from 200k stored headlines"""
+    from datetime import datetime
+    from news_store import NewsStore
+    feeds, dates, titles, scores = _headline_rows()
+    store = NewsStore()
+    for feed in sorted(set(feeds)):
+        idx = [i for i, f in enumerate(feeds) if f == feed]
+        store.add(feed, [dates[i] for i in idx], [titles[i] for i in idx], scores[idx])
+
+    def run():
+        store.daily(["feed0", "feed1", "feed2", "feed3"], datetime(2023, 1, 1), datetime(2023, 12, 31))
+    return run
+
+
+@benchmark("news_daily_groupby", repeat=50)
+def news_daily_groupby(ctx):
+    """The same query the old way: filter [date, score] rows, DataFrame, groupby"""
+    import pandas as pd
+    from datetime import date
+    feeds, dates, titles, scores = _headline_rows()
+    rows = {}
+    for f, d, s in zip(feeds, dates, scores.tolist()):
+        rows.setdefault(f, []).append([d, s])
+    start, end = date(2023, 1, 1), date(2023, 12, 31)
+
+    def run():
+        out = []
+        for feed in ["feed0", "feed1", "feed2", "feed3"]:
+            out.extend(r for r in rows[feed] if start <= r[0] <= end)
+        pd.DataFrame(out, columns=["DateOnly", "Sentiment"]).groupby("DateOnly")["Sentiment"].mean().reset_index()
+    return run
+
+
+def _http_news(ctx, fail_every=0):
+    from functools import partial
+    from fetch import Fetcher, HostPolicy, parse_feed
+    from news import NewsService
+    from news_store import NewsStore
+    server = FeedServer(fail_every=fail_every)
+    fetcher = Fetcher(default=HostPolicy(rate=1000, burst=100, backoff=0.001, max_backoff=0.01,
+                                         failure_threshold=3, reset_timeout=3600))
+    urls = server.feed_urls(copies=5)
+    news = NewsService(ttl=0, parse=partial(parse_feed, fetcher=fetcher), store=NewsStore())
+    news.refresh(urls)
+    ctx.extra["feeds"] = len(urls)
+    return server, fetcher, news, urls
+
+
+@benchmark("news_refresh_http", repeat=20)
+def news_refresh_http(ctx):
+    """Revalidate 20 feeds on a local stand-in server that fails every 4th request"""
+    server, fetcher, news, urls = _http_news(ctx, fail_every=4)
+
+    def run():
+        news.refresh(urls)
+        ctx.extra.update(server_requests=server.requests, **fetcher.stats())
+    return run
+
+
+@benchmark("news_refresh_provider_down", repeat=20)
+def news_refresh_provider_down(ctx):
+    """The same refresh with the stand-in down: breaker opens, stored rows are served"""
+    from datetime import date
+    server, fetcher, news, urls = _http_news(ctx)
+    server.down = True
+
+    def run():
+        news.refresh(urls)
+        daily = news.store.daily(urls, date(2000, 1, 1), date(2100, 1, 1))
+        assert len(daily), "stored headlines should survive the outage"
+        ctx.extra.update(server_requests=server.requests, **fetcher.stats())
+    return run
+
+
+@benchmark("sentiment_100k", repeat=5)
+def sentiment_100k(ctx):
+    """SentimentScorer.score_many on 100k headlines, memo cache cold"""
+    headlines = make_headlines(20000 if ctx.quick else 100000)
+
+    def run():
+        SentimentScorer().score_many(headlines)
+    return run
+
+
+@benchmark("sentiment_simple_100k", repeat=3)
+def sentiment_simple_100k(ctx):
+    """Reference: the original per-headline simple_sentiment"""
+    headlines = make_headlines(20000 if ctx.quick else 100000)
+
+    def run():
+        [simple_sentiment(h) for h in headlines]
+    return run
+
+
+@benchmark("fit_single", repeat=200)
+def fit_single(ctx):
+    """SimpleLinearRegression.fit on one ticker's year of features"""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(250, 9))
+    y = X @ rng.normal(size=9) + rng.normal(size=250)
+
+    def run():
+        SimpleLinearRegression().fit(X, y)
+    return run
+
+
+def _cross_section(ctx):
+    """Ragged per-ticker design matrices shaped like one year of features"""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    n = 100 if ctx.quick else 500
+    ctx.extra["tickers"] = n
+    Xs = [rng.normal(size=(int(rng.integers(150, 250)), 9)) * [1, 1, 1, 1, 1e6, 1, 1, 1, 1]
+          for _ in range(n)]
+    ys = [X @ rng.normal(size=9) + rng.normal(size=len(X)) for X in Xs]
+    return Xs, ys
+
+
+@benchmark("fit_batched_500", repeat=20)
+def fit_batched_500(ctx):
+    """models.fit_batched: all tickers in one batched Cholesky/solve"""
+    from models import fit_batched
+    Xs, ys = _cross_section(ctx)
+
+    def run():
+        fit_batched(Xs, ys)
+    return run
+
+
+@benchmark("fit_loop_500", repeat=10)
+def fit_loop_500(ctx):
+    """Reference: one SimpleLinearRegression.fit per ticker"""
+    Xs, ys = _cross_section(ctx)
+
+    def run():
+        for X, y in zip(Xs, ys):
+            SimpleLinearRegression().fit(X, y)
+    return run
+
+
+def _bootstrap_inputs():
+    """One ticker's training year, a fitted model and the backtest rows"""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(250, 9)) * [1, 1, 1, 1, 1e6, 1, 1, 1, 1]
+    y = X @ rng.normal(size=9) + rng.normal(size=250)
+    return SimpleLinearRegression().fit(X, y), X, y, X[-21:]
+
+
+@benchmark("bootstrap_intervals_1000", repeat=100)
+def bootstrap_intervals_1000(ctx):
+    """ResidualBootstrap: 1000 resamples solved together, next-day and backtest bands"""
+    from models import ResidualBootstrap
+    model, X, y, rows = _bootstrap_inputs()
+
+    def run():
+        boot = ResidualBootstrap(1000).fit(model, X, y)
+        boot.interval(rows[-1:])
+        boot.interval(rows)
+        ctx.extra["resamples"] = boot.resamples_
+    return run
+
+
+@benchmark("bootstrap_loop_1000", repeat=5)
+def bootstrap_loop_1000(ctx):
+    """Reference: 1000 SimpleLinearRegression refits on resampled residuals"""
+    import numpy as np
+    model, X, y, rows = _bootstrap_inputs()
+    resid = y - model.predict(X)
+    rng = np.random.default_rng(0)
+
+    def run():
+        preds = [SimpleLinearRegression().fit(X, model.predict(X) + resid[rng.integers(0, len(y), len(y))])
+                 .predict(rows) + resid[rng.integers(0, len(y), len(rows))] for _ in range(1000)]
+        np.quantile(preds, [0.05, 0.95], axis=0)
+    return run
+
+
+def _sweep_inputs():
+    import numpy as np
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, 9))
+    close = 100 + np.cumsum(rng.normal(size=1010))
+    return X, close, np.logspace(-3, 3, 20), 10
+
+
+@benchmark("ridge_sweep_svd", repeat=50)
+def ridge_sweep_svd(ctx):
+    """20 alphas x 10 horizons from one SVD (models.ridge_path)"""
+    from models import horizon_targets, ridge_path
+    X, close, alphas, horizons = _sweep_inputs()
+
+    def run():
+        Xh, Y = horizon_targets(X, close, horizons)
+        ridge_path(Xh, Y, alphas)
+    return run
+
+
+@benchmark("ridge_sweep_loop", repeat=10)
+def ridge_sweep_loop(ctx):
+    """Reference: the same 200 ridge fits as separate solves"""
+    import numpy as np
+    X, close, alphas, horizons = _sweep_inputs()
+
+    def run():
+        for h in range(1, horizons + 1):
+            y = close[h:h + len(X)]
+            xm, xs = X.mean(axis=0), X.std(axis=0)
+            Xs = (X - xm) / xs
+            for alpha in alphas:
+                np.linalg.solve(Xs.T @ Xs + alpha * np.eye(Xs.shape[1]), Xs.T @ (y - y.mean()))
+    return run
+
+
+@benchmark("backtest_long", repeat=3)
+def backtest_long(ctx):
+    """Rolling-origin backtest: 10 tickers x 8 years, monthly cutoffs"""
+    n, years = (3, 4) if ctx.quick else (10, 8)
+    frames = synthetic_universe(n, years=years)
+    start = min(f["Date"].min() for f in frames.values()).strftime("%Y-%m-%d")
+    end = "2025-11-09"
+    store = PriceStore(ctx.path("long.sqlite"), offline_provider(frames))
+    news = offline_news()
+    cutoffs = make_cutoffs(f"{int(start[:4]) + 1}-01-01", "2025-09-30", step_days=30)
+    ctx.extra.update(tickers=n, years=years, folds_per_ticker=len(cutoffs))
+
+    def run():
+        results = backtest_tickers(list(frames), start, end, cutoffs, horizon_days=30,
+                                   workers=1, store=store, news=news)
+        assert all(isinstance(v, list) for v in results.values())
+    return run
+
+
+@benchmark("encode_default", repeat=50)
+def encode_default(ctx):
+    """encode_response on an 8-year result, default JSON shape, no compression"""
+    return _encode_bench(ctx, "default")
+
+
+@benchmark("encode_columnar", repeat=50)
+def encode_columnar_bench(ctx):
+    """encode_response on an 8-year result, columnar + gzip"""
+    return _encode_bench(ctx, "columnar", "gzip")
+
+
+def _encode_bench(ctx, fmt, accept_encoding=None):
+    from encoding import compress, dumps, encode_columnar, encode_response
+    frames = synthetic_universe(1, years=2 if ctx.quick else 8)
+    start = frames["SYN0000.NS"]["Date"].min().strftime("%Y-%m-%d")
+    store = PriceStore(ctx.path("encode.sqlite"), offline_provider(frames))
+    result = predict_stock("SYN0000", store=store, news=offline_news(),
+                           registry=ModelRegistry(ctx.path("models")), start=start)
+    assert "error" not in result, result
+    plain = dumps(result)
+    columnar = dumps(encode_columnar(result))
+    ctx.extra.update(json_bytes=len(plain), columnar_bytes=len(columnar),
+                     json_gzip_bytes=len(compress(plain, "gzip")[0]),
+                     columnar_gzip_bytes=len(compress(columnar, "gzip")[0]))
+
+    def run():
+        encode_response(result, fmt, accept_encoding=accept_encoding)
+    return run
+
+
+def _feature_inputs(ctx):
+    import pandas as pd
+    frame = synthetic_universe(1, years=2 if ctx.quick else 8)["SYN0000.NS"]
+    days = frame["Date"].dt.date
+    news_daily = pd.DataFrame({"DateOnly": days[::3].values, "Sentiment": 0.1})
+    return frame, news_daily
+
+
+@benchmark("features_pandas", repeat=20)
+def features_pandas(ctx):
+    """Reference: app.build_features on 8 years of one ticker"""
+    from app import build_features
+    frame, news_daily = _feature_inputs(ctx)
+
+    def run():
+        build_features(frame, news_daily)
+    return run
+
+
+@benchmark("features_full", repeat=20)
+def features_full(ctx):
+    """FeaturePipeline.build from scratch on 8 years of one ticker"""
+    from app import FEATURES
+    from features import FeaturePipeline
+    frame, news_daily = _feature_inputs(ctx)
+
+    def run():
+        FeaturePipeline(FEATURES).build("SYN", frame, news_daily)
+    return run
+
+
+@benchmark("features_append", repeat=50)
+def features_append(ctx):
+    """One incremental FeaturePipeline.build: the cached history plus one new day"""
+    import itertools
+    from app import FEATURES
+    from features import FeaturePipeline
+    frame, news_daily = _feature_inputs(ctx)
+    pipeline = FeaturePipeline(FEATURES)
+    # Each call appends the next day; wrapping around (once) is a rebuild
+    heads = itertools.cycle([frame.iloc[:len(frame) - 64 + i] for i in range(65)])
+    pipeline.build("SYN", next(heads), news_daily)
+
+    def run():
+        pipeline.build("SYN", next(heads), news_daily)
+    return run
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "yfinance", "feedparser")
+
+
+def _importtime(ctx, code, env=None):
+    """Run `code` in a fresh interpreter under -X importtime; the returned
+    callable records total import time, the slowest top-level imports and
+    which heavy modules got loaded in ctx.extra"""
+    probe = code + "\nimport sys; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+    env = dict(os.environ, **(env or {}))
+
+    def run():
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=ROOT, env=env,
+                              capture_output=True, text=True, check=True)
+        top = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Top-level imports are the unindented names
+            if not name[1:].startswith(" "):
+                top.append((name.strip(), int(cumulative) / 1000.0))
+        ctx.extra["import_ms_total"] = round(sum(ms for _, ms in top), 1)
+        ctx.extra["slowest"] = [[n, round(ms, 1)] for n, ms in sorted(top, key=lambda t: -t[1])[:3]]
+        ctx.extra["heavy_loaded"] = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ""
+    return run
+
+
+@benchmark("import_handler_eager", repeat=5)
+def import_handler_eager(ctx):
+    """Cold start before lazy imports: the handler's old module-level imports"""
+    return _importtime(ctx, "import app, encoding, metrics")
+
+
+@benchmark("import_handler_lazy", repeat=5)
+def import_handler_lazy(ctx):
+    """Cold start of api/predict.py, which defers app until it must compute"""
+    return _importtime(ctx, "import sys; sys.path.insert(0, 'api'); import predict")
+
+
+@benchmark("handler_precomputed_cold", repeat=5)
+def handler_precomputed_cold(ctx):
+    """A fresh process answering a precomputed ticker through the handler"""
+    from app import result_cache_key
+    from scheduler import PredictionStore
+    store = PriceStore(ctx.path("cold.sqlite"), offline_provider())
+    result = predict_stock("TCS", store=store, news=offline_news(), registry=ModelRegistry(ctx.path("models")))
+    PredictionStore(ctx.path("predictions")).put(result_cache_key("TCS.NS"), result, 3600)
+    code = ("import json, sys; sys.path.insert(0, 'api'); import predict\n"
+            "r = predict.handler({'method': 'POST', 'body': json.dumps({'stock': 'TCS'})})\n"
+            "assert r['statusCode'] == 200, r")
+    return _importtime(ctx, code, {"STOCK_PREDICTION_DIR": ctx.path("predictions")})
@@ -0,0 +1,166 @@
+# cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Key/value storage for ResultCache. Values must be JSON-serializable."""
+
+    def get(self, key):
+        """Return the stored value, or None if missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileBackend(CacheBackend):
+    """Shared backend: one JSON file per key in a directory every worker can
+    see. Stands in for an external store such as Redis or memcached."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item["expires_at"] <= time.time():
+            self.delete(key)
+            return None
+        return item["value"]
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump({"key": key, "expires_at": time.time() + ttl, "value": value}, f)
+        os.replace(tmp, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """TTL cache with single-flight coalescing.
+
+    Concurrent misses for the same key wait on one computation instead of
+    each running it. Results for which `cacheable(value)` is false (errors,
+    by default) are handed to the waiting callers but not stored.
+    """
+
+    def __init__(self, backend=None, ttl=300, cacheable=None):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.cacheable = cacheable or (lambda value: not (isinstance(value, dict) and "error" in value))
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        return self.compute(key, compute)
+
+    def compute(self, key, compute):
+        """The miss path of get_or_compute, for callers that have already
+        looked the key up: compute (or wait for a concurrent computation of
+        the same key) and store the result"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self.misses += 1
+        try:
+            flight.value = compute()
+            if self.cacheable(flight.value):
+                self.backend.set(key, flight.value, self.ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+def backend_from_env():
+    """FileBackend under $STOCK_RESULT_CACHE_DIR when set, else in-process"""
+    directory = os.environ.get('STOCK_RESULT_CACHE_DIR')
+    if directory:
+        return FileBackend(directory)
+    return MemoryBackend(int(os.environ.get('STOCK_RESULT_CACHE_SIZE', 256)))
@@ -0,0 +1,185 @@
+# encoding.py
+"""Response encodings.
+
+The default response shape is unchanged. format="columnar" rewrites the
+long per-point series into compact columns:
+
+    dates  -> {"base": "2025-03-03", "offsets": [0, 1, 2, 3, 6, ...]}
+              (with delta=True: {"base": ..., "deltas": [0, 1, 1, 1, 3, ...]})
+    floats -> {"f32": "<base64 little-endian float32>"}
+    duplicate columns -> {"ref": "<other field>"}
+
+Use decode_columnar() (or the equivalent few lines of JS with Float32Array)
+to get the default shape back, at float32 precision.
+
+NumPy is only imported for the columnar format, so plain JSON responses
+stay cheap on a cold start.
+
+Streamed responses (app.stream_predict_stock) are framed one event at a
+time, either as newline-delimited JSON {"event": ..., "data": ...} or as
+Server-Sent Events.
+"""
+import base64
+import gzip
+import json
+from datetime import date, timedelta
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DATE_FIELDS = ["hist_dates", "month_pred_dates", "backtest_dates"]
+FLOAT_FIELDS = ["hist_close", "month_pred_values", "backtest_actuals", "month_pred_lower", "month_pred_upper"]
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+
+def _encode_dates(values, delta):
+    import numpy as np
+    days = np.array([date.fromisoformat(v[:10]).toordinal() for v in values], dtype=np.int64)
+    if len(days) == 0:
+        return {"base": None, "offsets": []}
+    offsets = days - days[0]
+    base = date.fromordinal(int(days[0])).isoformat()
+    if delta:
+        return {"base": base, "deltas": np.diff(offsets, prepend=0).tolist()}
+    return {"base": base, "offsets": offsets.tolist()}
+
+
+def _decode_dates(col):
+    import numpy as np
+    if col["base"] is None:
+        return []
+    offsets = np.cumsum(col["deltas"]) if "deltas" in col else col["offsets"]
+    base = date.fromisoformat(col["base"])
+    return [(base + timedelta(days=int(o))).isoformat() for o in offsets]
+
+
+def _encode_floats(values):
+    import numpy as np
+    arr = np.array([np.nan if v is None else v for v in values], dtype="<f4")
+    return {"f32": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+
+def _decode_floats(col):
+    import numpy as np
+    arr = np.frombuffer(base64.b64decode(col["f32"]), dtype="<f4").astype(float)
+    return [None if np.isnan(v) else float(v) for v in arr]
+
+
+def encode_columnar(result, delta=False):
+    """Columnar copy of a predict_stock result (errors pass through)"""
+    if "error" in result:
+        return result
+    out = dict(result)
+    seen = {}
+    for field in DATE_FIELDS + FLOAT_FIELDS:
+        values = result.get(field)
+        if not isinstance(values, list):
+            continue
+        key = (field in DATE_FIELDS, tuple(values))
+        if key in seen:
+            out[field] = {"ref": seen[key]}
+            continue
+        seen[key] = field
+        out[field] = _encode_dates(values, delta) if field in DATE_FIELDS else _encode_floats(values)
+    out["format"] = "columnar-v1"
+    return out
+
+
+def decode_columnar(payload):
+    """Inverse of encode_columnar()"""
+    if payload.get("format") != "columnar-v1":
+        return payload
+    out = dict(payload)
+    del out["format"]
+    for field in DATE_FIELDS + FLOAT_FIELDS:
+        col = payload.get(field)
+        if isinstance(col, dict) and "ref" not in col:
+            out[field] = _decode_dates(col) if field in DATE_FIELDS else _decode_floats(col)
+    for field in DATE_FIELDS + FLOAT_FIELDS:
+        col = payload.get(field)
+        if isinstance(col, dict) and "ref" in col:
+            out[field] = list(out[col["ref"]])
+    return out
+
+
+def dumps(obj):
+    """Compact JSON as bytes; orjson when installed, stdlib otherwise"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def negotiate(accept_encoding):
+    """Pick br, gzip or identity from an Accept-Encoding header value.
+
+    Codings without their own entry take the q-value of "*"; the highest
+    q > 0 wins, br on a tie.
+    """
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.lower().startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name:
+            offered[name.lower()] = q
+    wildcard = offered.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = "identity", 0.0
+    for name in candidates:
+        q = offered.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body, encoding):
+    """Return (body, content_encoding); small bodies are left alone"""
+    if encoding == "identity" or len(body) < MIN_COMPRESS_BYTES:
+        return body, "identity"
+    if encoding == "br":
+        return brotli.compress(body, quality=5), "br"
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, "identity"
+
+
+def encode_response(result, fmt="default", delta=False, accept_encoding=None):
+    """Serialize (and maybe compress) a result. Returns (body, content_encoding)."""
+    if fmt == "columnar":
+        result = encode_columnar(result, delta=delta)
+    return compress(dumps(result), negotiate(accept_encoding))
+
+
+NDJSON_TYPE = "application/x-ndjson"
+SSE_TYPE = "text/event-stream"
+
+
+def ndjson_event(event, data):
+    """One NDJSON line for a streamed event"""
+    return dumps({"event": event, "data": data}) + b"\n"
+
+
+def sse_event(event, data):
+    """One Server-Sent Events frame for a streamed event"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def stream_framer(mode):
+    """(content type, frame function) for stream mode "ndjson" or "sse" """
+    if mode == "sse":
+        return SSE_TYPE, sse_event
+    return NDJSON_TYPE, ndjson_event
@@ -0,0 +1,276 @@
+# features.py
+"""Declarative feature pipeline.
+
+Every feature is a vectorized transform over NumPy columns, registered
+with @feature(name, deps, lookback) where `lookback` is how many earlier
+rows one output row needs beyond its own inputs (1 for a shift, w-1 for a
+rolling window of w). The base columns are Date, Open, High, Low, Close,
+Volume and the joined daily Sentiment.
+
+FeaturePipeline.build() keeps the last build for each (ticker, first date).
+When a call brings the same rows again plus a few new days (or a revised
+last day, e.g. fresh headlines), only the rows from the first changed one
+onwards - less the lookback - are recomputed and appended to the cached
+columns. Identical input is a pure cache hit.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from metrics import register_collector
+from news_store import DailySentiment
+
+BASE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Sentiment']
+
+# name -> (fn, deps, lookback); registration order is a valid evaluation order
+TRANSFORMS = OrderedDict()
+
+
+def feature(name, deps=(), lookback=0):
+    """Register fn(cols) -> array as feature `name`"""
+    def register(fn):
+        for dep in deps:
+            if dep not in BASE_COLUMNS and dep not in TRANSFORMS:
+                raise ValueError(f"{name}: unknown dependency {dep}")
+        TRANSFORMS[name] = (fn, tuple(deps), int(lookback))
+        return fn
+    return register
+
+
+def _shift(values, periods=1):
+    out = np.empty_like(values)
+    out[:periods] = np.nan
+    out[periods:] = values[:-periods]
+    return out
+
+
+def _rolling(values, window, reduce):
+    # Windows run along axis 0, so 2-D (rows x tickers) columns work too
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reduce(np.lib.stride_tricks.sliding_window_view(values, window, axis=0), axis=-1)
+    return out
+
+
+@feature('PrevClose', deps=['Close'], lookback=1)
+def _prev_close(c):
+    return _shift(c['Close'])
+
+
+@feature('Return%', deps=['Close', 'PrevClose'])
+def _return_pct(c):
+    return ((c['Close'] - c['PrevClose']) / c['PrevClose']) * 100
+
+
+# Domain-informed interaction features:
+# - Positive sentiment with rising price => strong bullish
+# - Positive sentiment with falling price => weak
+@feature('Sent_x_Return', deps=['Sentiment', 'Return%'])
+def _sent_x_return(c):
+    return c['Sentiment'] * c['Return%']
+
+
+@feature('Sent_x_PosRet', deps=['Sentiment', 'Return%'])
+def _sent_x_posret(c):
+    return c['Sentiment'] * np.clip(c['Return%'], 0, None)
+
+
+@feature('Sent_x_Volume', deps=['Sentiment', 'Volume'])
+def _sent_x_volume(c):
+    return c['Sentiment'] * c['Volume']
+
+
+# Lag / rolling features (not in app.FEATURES; opt in per pipeline)
+@feature('MA5', deps=['Close'], lookback=4)
+def _ma5(c):
+    return _rolling(c['Close'], 5, np.mean)
+
+
+@feature('MA20', deps=['Close'], lookback=19)
+def _ma20(c):
+    return _rolling(c['Close'], 20, np.mean)
+
+
+@feature('Volatility20', deps=['Return%'], lookback=19)
+def _volatility20(c):
+    return _rolling(c['Return%'], 20, lambda w, axis: np.std(w, axis=axis, ddof=1))
+
+
+def resolve(names):
+    """Requested features plus their dependencies, in evaluation order"""
+    needed = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in BASE_COLUMNS or name in needed:
+            continue
+        if name not in TRANSFORMS:
+            raise KeyError(f"Unknown feature: {name}")
+        needed.add(name)
+        stack.extend(TRANSFORMS[name][1])
+    return [name for name in TRANSFORMS if name in needed]
+
+
+def total_lookback(name):
+    """Rows of history one output row of `name` depends on, through its deps"""
+    if name in BASE_COLUMNS:
+        return 0
+    _, deps, lookback = TRANSFORMS[name]
+    return lookback + max((total_lookback(d) for d in deps), default=0)
+
+
+_EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+
+def _days(values):
+    """datetime.date objects as datetime64[D] (much faster than np.array(list))"""
+    ordinals = np.fromiter(map(date.toordinal, np.asarray(values, dtype=object)), np.int64, len(values))
+    return (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def _daily_arrays(news_daily):
+    """(sorted datetime64[D] days, sentiment) of a DailySentiment or of a
+    DateOnly/Sentiment frame"""
+    if isinstance(news_daily, DailySentiment):
+        return news_daily.days, news_daily.sentiment
+    news_days = _days(news_daily['DateOnly'])
+    order = np.argsort(news_days)
+    return news_days[order], news_daily['Sentiment'].values.astype(float)[order]
+
+
+def base_columns(price, news_daily):
+    """(dates, {column: float array}) with the day's mean sentiment joined on
+    (0 for days without headlines)"""
+    dates = np.asarray(price['Date'], dtype='datetime64[ns]')
+    cols = {c: np.asarray(price[c], dtype=float) for c in BASE_COLUMNS if c != 'Sentiment'}
+    sentiment = np.zeros(len(dates))
+    if len(news_daily):
+        days = dates.astype('datetime64[D]')
+        news_days, values = _daily_arrays(news_daily)
+        pos = np.minimum(np.searchsorted(news_days, days), len(news_days) - 1)
+        found = news_days[pos] == days
+        sentiment[found] = values[pos[found]]
+        sentiment[np.isnan(sentiment)] = 0
+    cols['Sentiment'] = sentiment
+    return dates, cols
+
+
+class FeatureSet:
+    """Rows with every requested feature (and its inputs) present"""
+
+    def __init__(self, dates, columns):
+        self.dates = dates
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def matrix(self, names):
+        """2-D float array with one column per name"""
+        return np.column_stack([self.columns[n] for n in names]) if len(names) else np.empty((len(self), 0))
+
+    def to_frame(self):
+        return pd.DataFrame({'Date': self.dates, **self.columns})
+
+
+class FeaturePipeline:
+    """Build FeatureSets for a fixed list of features, caching per ticker"""
+
+    def __init__(self, features, max_entries=512):
+        self.features = list(features)
+        self.order = resolve(self.features)
+        self.lookback = max((total_lookback(n) for n in self.order), default=0)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.appends = 0
+        self.rebuilds = 0
+        self.rows_computed = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, ticker, price, news_daily):
+        """FeatureSet for one ticker's Date/OHLCV frame and daily sentiment.
+
+        Rows missing a value in any base column or in a requested feature or
+        one of its dependencies are dropped, exactly like DataFrame.dropna()
+        on the old pandas frame.
+        """
+        dates, cols = base_columns(price, news_daily)
+        n = len(dates)
+        key = (ticker, dates[0] if n else None)
+        with self._lock:
+            cached = self._cache.get(key) if ticker is not None else None
+            if cached is not None:
+                self._cache.move_to_end(key)
+
+        first = _first_change(cached, dates, cols) if cached is not None else 0
+        if cached is not None and first == n == len(cached[0]):
+            self.hits += 1
+            return cached[2]
+        start = max(0, first - self.lookback)
+        window = {c: v[start:] for c, v in cols.items()}
+        for name in self.order:
+            window[name] = TRANSFORMS[name][0](window)
+        computed = {}
+        for name in self.order:
+            fresh = window[name][first - start:]
+            computed[name] = np.concatenate([cached[1][name][:first], fresh]) if first else fresh
+        if first:
+            self.appends += 1
+        else:
+            self.rebuilds += 1
+        self.rows_computed += n - start
+
+        full = dict(cols, **computed)
+        valid = ~np.isnat(dates)
+        for values in full.values():
+            valid &= ~np.isnan(values)
+        result = FeatureSet(dates[valid], {c: v[valid] for c, v in full.items()})
+        if ticker is not None:
+            with self._lock:
+                self._cache[key] = (dates, {**cols, **computed}, result)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return result
+
+    def stats(self):
+        return {"hits": self.hits, "appends": self.appends, "rebuilds": self.rebuilds,
+                "rows_computed": self.rows_computed}
+
+
+def _first_change(cached, dates, cols):
+    """Index of the first row where the new base columns differ from the
+    cached ones (the common length if one is a prefix of the other)"""
+    old_dates, old_cols, _ = cached
+    n = min(len(old_dates), len(dates))
+    # Usually nothing changed: one memcmp per column instead of the
+    # elementwise NaN-aware comparison below
+    if old_dates[:n].tobytes() == dates[:n].tobytes() and all(
+            old_cols[c][:n].tobytes() == cols[c][:n].tobytes() for c in BASE_COLUMNS):
+        return n
+    changed = old_dates[:n] != dates[:n]
+    for c in BASE_COLUMNS:
+        old, new = old_cols[c][:n], cols[c][:n]
+        changed |= ~((old == new) | (np.isnan(old) & np.isnan(new)))
+    idx = np.flatnonzero(changed)
+    return int(idx[0]) if len(idx) else n
+
+
+_default_pipeline = None
+
+
+def get_default_pipeline():
+    """Process-wide pipeline for app.FEATURES"""
+    global _default_pipeline
+    if _default_pipeline is None:
+        from app import FEATURES
+        _default_pipeline = FeaturePipeline(FEATURES)
+        register_collector(lambda: {f"stock_features_{k}": v for k, v in _default_pipeline.stats().items()})
+    return _default_pipeline
@@ -0,0 +1,344 @@
+# fetch.py
+"""Rate-limited, retrying access to the data providers.
+
+Every outbound call goes through one Fetcher, keyed by provider host:
+
+    token bucket     at most `rate` calls/s per host (bursts of `burst`);
+                     with STOCK_FETCH_SHARED_DIR set, the buckets live in
+                     files there and every process on the machine shares
+                     one budget per host
+    timeout          per attempt
+    retries          429, 5xx, timeouts and connection errors are retried
+                     with full-jitter exponential backoff (Retry-After is
+                     honoured)
+    circuit breaker  after `failure_threshold` failed calls in a row the host
+                     is skipped for `reset_timeout` seconds (CircuitOpenError),
+                     then a single trial call decides whether it is back
+
+Callers treat a failure or an open breaker as "provider down" and serve
+what they already have: NewsService keeps the stored headlines and
+PriceStore the stored bars. HTTP feeds share one pooled requests.Session,
+so repeated fetches reuse their keep-alive connections.
+
+Counters: stock_fetch_{requests,retries,throttled,failures,rejected,
+breaker_opened}_total{host}, and the stock_fetch_breakers_open gauge.
+"""
+import os
+import random
+import struct
+import threading
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from metrics import inc, register_collector
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets stay per process
+    fcntl = None
+
+HostPolicy = namedtuple("HostPolicy", "rate burst timeout retries backoff max_backoff "
+                                      "failure_threshold reset_timeout",
+                        defaults=(5.0, 10, 10.0, 3, 0.5, 8.0, 5, 30.0))
+
+# Per-host overrides of the default policy
+HOST_POLICIES = {
+    # yfinance bulk downloads are heavier and Yahoo throttles aggressively
+    "finance.yahoo.com": HostPolicy(rate=2.0, burst=4, timeout=20.0),
+}
+
+
+class FetchError(Exception):
+    """A provider call that failed in a way worth retrying (429, 5xx,
+    throttling reported by a client library)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(FetchError):
+    """The host's breaker is open; the call was not attempted"""
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available; returns the wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Going negative reserves the token, so concurrent callers queue up
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose state is kept in the file at `path` under an
+    exclusive lock, so every process using the same path draws from one
+    budget. Times are wall-clock, since monotonic clocks are per process."""
+
+    def __init__(self, path, rate, burst=1):
+        super().__init__(rate, burst)
+        self.path = path
+
+    def acquire(self):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                now = time.time()
+                raw = os.pread(fd, 16, 0)
+                tokens, last = struct.unpack("dd", raw) if len(raw) == 16 else (float(self.burst), now)
+                tokens = min(self.burst, tokens + max(now - last, 0.0) * self.rate) - 1
+                os.pwrite(fd, struct.pack("dd", tokens, now), 0)
+            finally:
+                # Closing the descriptor releases the lock
+                os.close(fd)
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout`; one trial call then closes or
+    reopens it"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = False
+
+    def failure(self):
+        """Record a failed call; True if this opened the breaker"""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial = False
+                return True
+            return False
+
+
+class _Host:
+    __slots__ = ("policy", "bucket", "breaker")
+
+    def __init__(self, policy, bucket_path=None):
+        self.policy = policy
+        if bucket_path and fcntl is not None:
+            self.bucket = SharedTokenBucket(bucket_path, policy.rate, policy.burst)
+        else:
+            self.bucket = TokenBucket(policy.rate, policy.burst)
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+
+
+def _retry_after(response):
+    """Seconds from a Retry-After header (delta or HTTP date), else None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(exc):
+    if isinstance(exc, (FetchError, TimeoutError, ConnectionError)):
+        return True
+    import requests
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+class Fetcher:
+    """Per-host rate limits, retries and circuit breakers around provider
+    calls, plus a pooled HTTP session for plain GETs. With `shared_dir`
+    (default $STOCK_FETCH_SHARED_DIR) the rate limits are shared with every
+    process using the same directory; breakers stay per process."""
+
+    def __init__(self, policies=None, default=None, pool_size=16, sleep=time.sleep, shared_dir=None):
+        self.policies = dict(HOST_POLICIES if policies is None else policies)
+        self.default = default or HostPolicy(rate=float(os.environ.get('STOCK_FETCH_RATE', 5)),
+                                             timeout=float(os.environ.get('STOCK_FETCH_TIMEOUT', 10)))
+        self.pool_size = pool_size
+        self.sleep = sleep
+        self.shared_dir = shared_dir or os.environ.get('STOCK_FETCH_SHARED_DIR')
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._session = None
+        self.counts = dict.fromkeys(("requests", "retries", "throttled", "failures", "rejected",
+                                     "breaker_opened"), 0)
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                # Retries are ours; the adapter only pools connections
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                                      max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                path = os.path.join(self.shared_dir, host.replace(":", "_") + ".bucket") if self.shared_dir else None
+                state = self._hosts[host] = _Host(self.policies.get(host, self.default), path)
+            return state
+
+    def _count(self, name, host):
+        self.counts[name] += 1
+        inc(f"stock_fetch_{name}_total", host=host)
+
+    def policy(self, host):
+        return self._host(host).policy
+
+    def call(self, host, fn, *args, **kwargs):
+        """fn(*args, **kwargs) under `host`'s rate limit, retries and breaker.
+        Non-transient exceptions propagate at once and do not count against
+        the breaker."""
+        state = self._host(host)
+        policy = state.policy
+        if not state.breaker.allow():
+            self._count("rejected", host)
+            raise CircuitOpenError(f"{host}: circuit open")
+        attempt = 0
+        while True:
+            if state.bucket.acquire():
+                self._count("throttled", host)
+            self._count("requests", host)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                if not _is_transient(exc):
+                    state.breaker.success()
+                    raise
+                if attempt >= policy.retries:
+                    self._count("failures", host)
+                    if state.breaker.failure():
+                        self._count("breaker_opened", host)
+                    raise
+                # Full jitter: spread the retries of concurrent callers
+                delay = random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** attempt))
+                retry_after = getattr(exc, "retry_after", None)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, policy.max_backoff))
+                attempt += 1
+                self._count("retries", host)
+                self.sleep(delay)
+                continue
+            state.breaker.success()
+            return result
+
+    def get(self, url, headers=None):
+        """GET through the pooled session; 429 and 5xx raise FetchError
+        (after retries), other statuses are returned to the caller"""
+        host = urlparse(url).netloc
+        timeout = self.policy(host).timeout
+
+        def attempt():
+            response = self.session.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise FetchError(f"{host}: HTTP {response.status_code}", _retry_after(response))
+            return response
+
+        return self.call(host, attempt)
+
+    def breaker_states(self):
+        with self._lock:
+            return {host: state.breaker.state for host, state in self._hosts.items()}
+
+    def stats(self):
+        states = self.breaker_states().values()
+        return dict(self.counts, hosts=len(states), breakers_open=sum(s != "closed" for s in states))
+
+
+def parse_feed(url, etag=None, modified=None, fetcher=None):
+    """feedparser.parse with the HTTP request made by the Fetcher. Sends the
+    conditional headers; a 304 comes back as a result with status 304.
+    Raises on a failed fetch or an open breaker."""
+    import feedparser
+
+    if not url.startswith(("http://", "https://")):
+        # Local files (recorded feeds) need no fetch layer
+        return feedparser.parse(url, etag=etag, modified=modified)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    response = (fetcher or get_default_fetcher()).get(url, headers=headers)
+    if response.status_code == 304:
+        result = feedparser.FeedParserDict(entries=[], bozo=False)
+    else:
+        response.raise_for_status()
+        result = feedparser.parse(response.content, response_headers={
+            k.lower(): v for k, v in response.headers.items()})
+    result["status"] = response.status_code
+    result["etag"] = response.headers.get("ETag", etag)
+    result["modified"] = response.headers.get("Last-Modified", modified)
+    return result
+
+
+_default_fetcher = None
+
+
+def get_default_fetcher():
+    """Process-wide fetcher shared by the news and price providers"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = Fetcher()
+        # The totals are exported as labeled counters already
+        register_collector(lambda: {"stock_fetch_breakers_open": _default_fetcher.stats()["breakers_open"]})
+    return _default_fetcher
@@ -0,0 +1,373 @@
+# intraday.py
+"""Intraday mode: live next-close predictions from quote ticks.
+
+    python intraday.py watchlist.txt --poll 15
+    python intraday.py watchlist.txt --replay ticks.csv --session 2025-11-10
+
+IntradayBook.track() loads each ticker's daily history once. It fits or
+loads the model through the registry, like predict_many, and keeps only
+what the features need: the last `lookback` daily rows of the base
+columns, the model coefficients and today's sentiment. Quote ticks then
+update a live row for today's session (open, running high/low, last price,
+cumulative volume). The next-close prediction is that row's features times
+the coefficients.
+
+Ticks are only recorded as they arrive. flush() evaluates the feature
+transforms once for all tickers that changed since the last flush, as
+(lookback + 1) x tickers NumPy arrays. The work per flush is a fixed number
+of array operations, O(features) for each ticker. No pandas and no refits
+happen in the tick loop.
+
+Quote sources yield Quote(ticker, price, volume, time) tuples; a None
+marks the end of a burst (e.g. one poll) and makes run() flush right away.
+ReplaySource plays back recorded ticks from a CSV/JSONL file or a list.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+
+from features import BASE_COLUMNS, TRANSFORMS, base_columns, resolve, total_lookback
+from scheduler import NSE_TZ
+
+# volume is the session's cumulative volume (None if the source has none);
+# time is epoch seconds (None for "now")
+Quote = namedtuple("Quote", "ticker price volume time")
+
+LIVE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class QuoteSource:
+    """Produces quote ticks. Implement quotes()."""
+
+    def quotes(self):
+        """Iterate Quote tuples (or None at the end of a burst)"""
+        raise NotImplementedError
+
+
+def _epoch(value):
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        dt = datetime.fromisoformat(str(value))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=NSE_TZ)
+        return dt.timestamp()
+
+
+class ReplaySource(QuoteSource):
+    """Recorded ticks from a CSV (time,ticker,price,volume) or JSONL file,
+    or from a list of Quotes. speed=None replays as fast as possible,
+    speed=1 in real time, speed=60 a minute per second."""
+
+    def __init__(self, ticks, speed=None):
+        self.speed = speed
+        self.ticks = list(ticks) if not isinstance(ticks, str) else self._read(ticks)
+
+    @staticmethod
+    def _read(path):
+        with open(path) as f:
+            if path.endswith((".jsonl", ".ndjson")):
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = list(csv.DictReader(f))
+        return [Quote(row["ticker"], float(row["price"]),
+                      float(row["volume"]) if row.get("volume") not in (None, "") else None,
+                      _epoch(row.get("time"))) for row in rows]
+
+    def quotes(self):
+        started = time.monotonic()
+        first = next((q.time for q in self.ticks if q.time is not None), None)
+        for quote in self.ticks:
+            if self.speed and quote.time is not None:
+                wait_for = (quote.time - first) / self.speed - (time.monotonic() - started)
+                if wait_for > 0:
+                    time.sleep(wait_for)
+            yield quote
+
+
+class PollingSource(QuoteSource):
+    """Latest 1-minute bar per ticker from yfinance every `interval` seconds
+    (rate-limited by the fetch layer; a failed poll keeps the last prices)"""
+
+    def __init__(self, tickers, interval=15.0, rounds=None, provider=None):
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.rounds = rounds
+        self.provider = provider
+
+    def fetch(self):
+        if self.provider is None:
+            from price_store import YFinanceProvider
+            self.provider = YFinanceProvider()
+        data = self.provider.download(self.tickers, period="1d", interval="1m", group_by="ticker",
+                                      threads=True)
+        quotes = []
+        for ticker in self.tickers:
+            try:
+                bars = data[ticker] if len(self.tickers) > 1 else data
+                bars = bars.dropna(subset=['Close'])
+            except KeyError:
+                continue
+            if len(bars):
+                quotes.append(Quote(ticker, float(bars['Close'].iloc[-1]), float(bars['Volume'].sum()),
+                                    bars.index[-1].timestamp()))
+        return quotes
+
+    def quotes(self):
+        done = 0
+        while self.rounds is None or done < self.rounds:
+            started = time.monotonic()
+            try:
+                yield from self.fetch()
+            except Exception as e:
+                print(f"quote poll failed: {e}", file=sys.stderr)
+            yield None
+            done += 1
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class IntradayBook:
+    """Live next-close predictions for many tickers"""
+
+    def __init__(self, features=None):
+        from app import FEATURES
+        self.features = list(features or FEATURES)
+        self.order = resolve(self.features)
+        self.lookback = max((total_lookback(n) for n in self.order), default=0)
+        self.tickers = []
+        self.slots = {}
+        self.session = None
+        # Daily history: {base column: (lookback, n)}
+        self.history = {c: np.empty((self.lookback, 0)) for c in BASE_COLUMNS}
+        self.sentiment = np.empty(0)
+        self.coef = np.empty((0, len(self.features)))
+        self.intercept = np.empty(0)
+        self.daily_prediction = np.empty(0)
+        # Live row for the session: {column: (n,)}
+        self.live = {c: np.empty(0) for c in LIVE_COLUMNS}
+        self.live_time = np.empty(0)
+        self.prediction = np.empty(0)
+        self._dirty = np.empty(0, dtype=bool)
+        self.ticks = 0
+        self.unknown = 0
+        self.flushes = 0
+        self.evaluated = 0
+
+    def track(self, tickers, session=None, store=None, news=None, registry=None, start=None,
+              train_cutoff=None):
+        """Load history and models for `tickers` and add them to the book.
+
+        `session` (a date or YYYY-MM-DD, default today in IST) is the trading
+        day the quotes belong to; history is the daily bars before it.
+        Returns {ticker: error message} for tickers that could not be added.
+        """
+        from app import (SHARED_RSS_URLS, START_DATE, TRAIN_CUTOFF, _prefit, news_window, normalize_ticker,
+                         ticker_rss_url)
+        from features import get_default_pipeline
+        from news import get_default_news_service
+        from price_store import get_default_store
+
+        session = date.fromisoformat(str(session)) if session else datetime.now(NSE_TZ).date()
+        if self.session is not None and session != self.session:
+            raise ValueError(f"book is tracking session {self.session}, not {session}")
+        self.session = session
+        start = start or START_DATE
+        train_cutoff = train_cutoff or TRAIN_CUTOFF
+        symbols = [t for t in dict.fromkeys(normalize_ticker(t) for t in tickers) if t not in self.slots]
+        if not symbols:
+            return {}
+        store = store or get_default_store()
+        news = news or get_default_news_service()
+        end = session.isoformat()
+
+        errors = {}
+        inputs = {}
+        news.refresh([ticker_rss_url(t) for t in symbols] + SHARED_RSS_URLS)
+        for TICKER, price in store.get_many(symbols, start, end).items():
+            if isinstance(price, Exception):
+                errors[TICKER] = f"Failed to download data: {price}"
+            elif price is None or len(price) <= self.lookback:
+                errors[TICKER] = "not enough history"
+            else:
+                news_daily = news.daily_sentiment([ticker_rss_url(TICKER)] + SHARED_RSS_URLS,
+                                                  *news_window(start, end))
+                inputs[TICKER] = (price, news_daily)
+        feature_sets = {t: get_default_pipeline().build(t, price, nd) for t, (price, nd) in inputs.items()}
+        models = _prefit(feature_sets, train_cutoff, registry)
+
+        added = []
+        for TICKER, (price, news_daily) in inputs.items():
+            model = models.get(TICKER)
+            if model is None or not len(feature_sets[TICKER]):
+                errors[TICKER] = "no training rows"
+                continue
+            dates, cols = base_columns(price, news_daily)
+            # Today's headlines so far; like base_columns, no headlines means 0
+            sentiment = float(np.nan_to_num(news_daily.on(session)))
+            daily = float(model.predict(feature_sets[TICKER].matrix(self.features)[-1:])[0])
+            added.append((TICKER, {c: cols[c][-self.lookback:] if self.lookback else cols[c][:0]
+                                   for c in BASE_COLUMNS}, sentiment, model, daily))
+        self._add(added)
+        return errors
+
+    def _add(self, added):
+        if not added:
+            return
+        n = len(added)
+        for TICKER, *_ in added:
+            self.slots[TICKER] = len(self.tickers)
+            self.tickers.append(TICKER)
+        self.history = {c: np.concatenate([self.history[c], np.column_stack([a[1][c] for a in added])], axis=1)
+                        for c in BASE_COLUMNS}
+        self.sentiment = np.concatenate([self.sentiment, [a[2] for a in added]])
+        self.coef = np.concatenate([self.coef, np.stack([a[3].coef_ for a in added])])
+        self.intercept = np.concatenate([self.intercept, [a[3].intercept_ for a in added]])
+        self.daily_prediction = np.concatenate([self.daily_prediction, [a[4] for a in added]])
+        for c in LIVE_COLUMNS:
+            self.live[c] = np.concatenate([self.live[c], np.full(n, np.nan)])
+        self.live_time = np.concatenate([self.live_time, np.full(n, np.nan)])
+        self.prediction = np.concatenate([self.prediction, np.full(n, np.nan)])
+        self._dirty = np.concatenate([self._dirty, np.zeros(n, dtype=bool)])
+
+    def update(self, ticker, price, volume=None, when=None):
+        """Record one tick; returns False for tickers the book does not track"""
+        i = self.slots.get(ticker)
+        if i is None:
+            self.unknown += 1
+            return False
+        self.ticks += 1
+        live = self.live
+        if live['Open'][i] != live['Open'][i]:
+            # First tick of the session (Open is still NaN)
+            live['Open'][i] = live['High'][i] = live['Low'][i] = price
+        elif price > live['High'][i]:
+            live['High'][i] = price
+        elif price < live['Low'][i]:
+            live['Low'][i] = price
+        live['Close'][i] = price
+        if volume is not None:
+            live['Volume'][i] = volume
+        elif live['Volume'][i] != live['Volume'][i]:
+            live['Volume'][i] = 0.0
+        self.live_time[i] = time.time() if when is None else when
+        self._dirty[i] = True
+        return True
+
+    def _evaluate(self, idx):
+        cols = {c: np.vstack([self.history[c][:, idx], self.live[c][idx]]) for c in LIVE_COLUMNS}
+        cols['Sentiment'] = np.vstack([self.history['Sentiment'][:, idx], self.sentiment[idx]])
+        for name in self.order:
+            cols[name] = TRANSFORMS[name][0](cols)
+        x = np.stack([cols[f][-1] for f in self.features], axis=1)
+        self.prediction[idx] = np.einsum('kp,kp->k', x, self.coef[idx]) + self.intercept[idx]
+        self.evaluated += len(idx)
+
+    def flush(self):
+        """Recompute the prediction of every ticker ticked since the last
+        flush; returns {ticker: predicted next close} for those"""
+        idx = np.flatnonzero(self._dirty)
+        if not len(idx):
+            return {}
+        self._dirty[idx] = False
+        self._evaluate(idx)
+        self.flushes += 1
+        return dict(zip([self.tickers[i] for i in idx], self.prediction[idx].tolist()))
+
+    def tick(self, ticker, price, volume=None, when=None):
+        """update() and evaluate that one ticker immediately"""
+        if not self.update(ticker, price, volume, when):
+            return None
+        i = self.slots[ticker]
+        self._dirty[i] = False
+        self._evaluate(np.array([i]))
+        return float(self.prediction[i])
+
+    def snapshot(self, ticker):
+        """Current state of one ticker in the predict_stock vocabulary"""
+        i = self.slots.get(ticker)
+        if i is None:
+            return {"error": "not tracked"}
+        if self._dirty[i]:
+            self.flush()
+        when = self.live_time[i]
+        live = np.isfinite(self.prediction[i])
+        return {
+            "ticker": ticker,
+            "session": self.session.isoformat(),
+            "current_price": float(self.live['Close'][i]) if live else float(self.history['Close'][-1, i]),
+            "current_time": (datetime.fromtimestamp(when, NSE_TZ).strftime("%Y-%m-%d %H:%M:%S")
+                             if when == when else None),
+            "predicted_next": float(self.prediction[i]) if live else float(self.daily_prediction[i]),
+            "daily_predicted_next": float(self.daily_prediction[i]),
+            "live": bool(live),
+        }
+
+    def stats(self):
+        return {"tickers": len(self.tickers), "ticks": self.ticks, "unknown": self.unknown,
+                "flushes": self.flushes, "evaluated": self.evaluated}
+
+
+def run(book, source, on_flush=None, batch_size=512, max_delay=0.05):
+    """Feed `source` into `book`, flushing every `batch_size` ticks, every
+    `max_delay` seconds and at the end of each burst. on_flush receives the
+    {ticker: prediction} of each flush."""
+    pending = 0
+    last = time.monotonic()
+    update = book.update
+    for quote in source.quotes():
+        if quote is not None:
+            pending += update(quote.ticker, quote.price, quote.volume, quote.time)
+        if pending and (quote is None or pending >= batch_size or time.monotonic() - last >= max_delay):
+            predictions = book.flush()
+            pending = 0
+            last = time.monotonic()
+            if on_flush:
+                on_flush(predictions)
+    if pending:
+        predictions = book.flush()
+        if on_flush:
+            on_flush(predictions)
+    return book.stats()
+
+
+def main(argv=None):
+    from app import normalize_ticker
+    from scan import read_universe
+
+    parser = argparse.ArgumentParser(description="Live next-close predictions from quote ticks")
+    parser.add_argument("watchlist", help="file with one ticker per line")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", help="recorded ticks (CSV time,ticker,price,volume or JSONL)")
+    source.add_argument("--poll", type=float, help="poll yfinance every N seconds")
+    parser.add_argument("--speed", type=float, default=None, help="replay speed (1 = real time)")
+    parser.add_argument("--session", default=None, help="trading day of the quotes (default: today)")
+    args = parser.parse_args(argv)
+
+    tickers = [normalize_ticker(t) for t in read_universe(args.watchlist)]
+    book = IntradayBook()
+    for TICKER, error in book.track(tickers, session=args.session).items():
+        print(f"{TICKER}: {error}", file=sys.stderr)
+    if args.replay:
+        quotes = ReplaySource(args.replay, speed=args.speed)
+    else:
+        quotes = PollingSource(book.tickers, interval=args.poll)
+
+    def emit(predictions):
+        for TICKER in predictions:
+            print(json.dumps(book.snapshot(TICKER)))
+        sys.stdout.flush()
+
+    print(json.dumps(run(book, quotes, emit)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
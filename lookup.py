@@ -0,0 +1,111 @@
+# lookup.py
+"""Request helpers that do not need the data stack.
+
+This module imports only the standard library and the light local modules
+(cache, metrics, scheduler). A cold serverless process can therefore parse
+a request and answer it from the precomputed store or the response cache
+without loading pandas, numpy, yfinance or feedparser. Those are imported
+(through app) only when a prediction actually has to be computed.
+app.py re-exports everything here.
+"""
+import os
+
+from cache import ResultCache, backend_from_env
+from metrics import register_collector
+from scheduler import get_prediction_store
+
+
+def normalize_ticker(user_input):
+    """Map user input to a Yahoo symbol, defaulting to NSE (.NS)"""
+    if "." not in user_input:
+        return user_input.upper() + ".NS"
+    return user_input.upper()
+
+
+_result_cache = None
+
+
+def get_result_cache():
+    """Process-wide response cache used by cached_predict_stock"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(backend_from_env(), ttl=float(os.environ.get('STOCK_RESULT_TTL', 300)))
+    return _result_cache
+
+
+@register_collector
+def _result_cache_stats():
+    if _result_cache is None:
+        return {}
+    return {f"stock_result_cache_{k}": v for k, v in _result_cache.stats().items()}
+
+
+MAX_HORIZONS = 30
+
+
+def model_options(body):
+    """(model, horizons) from a request body; ValueError if invalid"""
+    model = body.get("model", "ols")
+    if model != "ols":
+        # Only non-default models need the model table (and numpy)
+        from models import MODELS
+        if model not in MODELS:
+            raise ValueError(f"model must be one of: {', '.join(MODELS)}")
+    horizons = body.get("horizons")
+    if horizons is not None:
+        if isinstance(horizons, bool) or not isinstance(horizons, int) or not 1 <= horizons <= MAX_HORIZONS:
+            raise ValueError(f"horizons must be an integer from 1 to {MAX_HORIZONS}")
+    return model, horizons
+
+
+def result_cache_key(TICKER, model="ols", horizons=None):
+    """Response cache key; the default model keeps the plain per-ticker key"""
+    key = "predict:" + TICKER
+    if model != "ols" or horizons:
+        key += f":{model}:{horizons or 0}"
+    return key
+
+
+def cached_result(user_input, model="ols", horizons=None, cache=None, predictions=None):
+    """The precomputed or cached response for a request, or None if it
+    has to be computed"""
+    if not user_input or not isinstance(user_input, str):
+        return None
+    key = result_cache_key(normalize_ticker(user_input), model, horizons)
+    result = (predictions or get_prediction_store()).get(key)
+    if result is not None:
+        return result
+    cache = cache or get_result_cache()
+    result = cache.backend.get(key)
+    if result is not None:
+        cache.hits += 1
+    return result
+
+
+# Keys of the partial results streamed before the full response is ready.
+# app._prediction_events builds its "prediction" event from PREDICTION_KEYS
+# (the optional ones only when present) and everything else goes to
+# "backtest", so a replayed response splits exactly like a live one.
+PRICE_KEYS = ["ticker", "current_price", "current_time"]
+PREDICTION_KEYS = PRICE_KEYS + ["predicted_next", "accuracy", "rmse",
+                                "hist_dates", "hist_close", "pred_date", "pred_value",
+                                # Optional: intervals, non-default model, horizons
+                                "pred_lower", "pred_upper", "interval_level", "interval_resamples",
+                                "model", "horizon_dates", "horizon_values"]
+
+
+def prediction_partial(fields):
+    """The "prediction" event of a response (or of the fields computed so far)"""
+    return {k: fields[k] for k in PREDICTION_KEYS if k in fields}
+
+
+def result_events(result):
+    """Split a complete response back into the events predict_stock_events
+    would have produced (used to replay cached responses)"""
+    if "error" in result:
+        return [("failed", result)]
+    return [
+        ("price", {k: result[k] for k in PRICE_KEYS}),
+        ("prediction", prediction_partial(result)),
+        ("backtest", {k: v for k, v in result.items() if k not in PREDICTION_KEYS}),
+    ]
@@ -0,0 +1,172 @@
+# metrics.py
+"""Process-wide counters and stage timers with Prometheus text export.
+
+    with stage("download"):
+        ...
+
+Durations go into the global `stock_stage_seconds` summary and, while a
+request_trace() is active on the current thread, into that trace too so a
+single response can report where its time went.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = {}
+_stage_sum = {}
+_stage_count = {}
+_collectors = []
+_local = threading.local()
+
+
+class RequestTrace:
+    """Timings (seconds) and sizes recorded during one request"""
+
+    def __init__(self):
+        self.timings = {}
+        self.sizes = {}
+
+    def as_dict(self):
+        return {
+            "timings_ms": {k: round(v * 1000.0, 3) for k, v in self.timings.items()},
+            "sizes": dict(self.sizes),
+        }
+
+
+def _label_key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def inc(name, value=1, **labels):
+    """Add to a counter, e.g. inc("stock_requests_total", route="api")"""
+    key = _label_key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def record_size(name, nbytes):
+    """Count bytes for `name` and attach the size to the active trace"""
+    inc("stock_bytes_total", nbytes, kind=name)
+    trace = current_trace()
+    if trace is not None:
+        trace.sizes[name] = trace.sizes.get(name, 0) + nbytes
+
+
+def observe_stage(name, seconds):
+    with _lock:
+        _stage_sum[name] = _stage_sum.get(name, 0.0) + seconds
+        _stage_count[name] = _stage_count.get(name, 0) + 1
+    trace = current_trace()
+    if trace is not None:
+        trace.timings[name] = trace.timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - t0)
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def request_trace():
+    """Collect stage timings for the work done on this thread"""
+    outer = current_trace()
+    trace = RequestTrace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = outer
+
+
+def register_collector(fn):
+    """fn() -> {metric_name: value}; sampled as gauges on every export"""
+    _collectors.append(fn)
+    return fn
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, str(v).replace('"', '\\"')) for k, v in labels) + "}"
+
+
+def prometheus_text():
+    """Current metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        stage_sum = dict(_stage_sum)
+        stage_count = dict(_stage_count)
+    for name in sorted({k[0] for k in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    if stage_sum:
+        lines.append("# TYPE stock_stage_seconds summary")
+        for s in sorted(stage_sum):
+            lines.append(f'stock_stage_seconds_sum{{stage="{s}"}} {stage_sum[s]:.6f}')
+            lines.append(f'stock_stage_seconds_count{{stage="{s}"}} {stage_count[s]}')
+    for fn in _collectors:
+        try:
+            values = fn()
+        except Exception:
+            continue
+        for name, value in sorted(values.items()):
+            if value is None:
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Clear counters and timers (benchmarks)"""
+    with _lock:
+        _counters.clear()
+        _stage_sum.clear()
+        _stage_count.clear()
+
+
+@contextmanager
+def profiled(sink):
+    """Profile the block and store a text report in sink["profile"].
+
+    Uses pyinstrument when installed, otherwise cProfile (top 30 entries by
+    cumulative time).
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            sink["profile"] = profiler.output_text()
+        return
+
+    import cProfile
+    import io
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+        sink["profile"] = out.getvalue()
@@ -0,0 +1,449 @@
+# models.py
+import time
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+# Simple linear regression using numpy (replaces scikit-learn)
+class SimpleLinearRegression:
+    def __init__(self):
+        self.coef_ = None
+        self.intercept_ = None
+    
+    def fit(self, X, y):
+        """Fit linear regression model using least squares"""
+        # Add intercept term
+        X_with_intercept = np.column_stack([np.ones(X.shape[0]), X])
+        
+        # Solve using numpy's least squares
+        try:
+            coefs, residuals, rank, s = np.linalg.lstsq(X_with_intercept, y, rcond=None)
+        except np.linalg.LinAlgError:
+            # Fallback to pseudo-inverse if lstsq fails
+            coefs = np.linalg.pinv(X_with_intercept) @ y
+        
+        # Handle case where coefs might be 1D or 2D
+        if coefs.ndim > 1:
+            coefs = coefs.flatten()
+        
+        self.intercept_ = float(coefs[0])
+        self.coef_ = coefs[1:].astype(float)
+        return self
+    
+    def predict(self, X):
+        """Make predictions"""
+        if self.coef_ is None:
+            raise ValueError("Model must be fitted before prediction")
+        return self.intercept_ + np.dot(X, self.coef_)
+
+
+def mean_squared_error(y_true, y_pred):
+    """Calculate MSE"""
+    return np.mean((y_true - y_pred) ** 2)
+
+
+def r2_score(y_true, y_pred):
+    """Calculate R² score"""
+    ss_res = np.sum((y_true - y_pred) ** 2)
+    ss_tot = np.sum((y_true - np.mean(y_true)) ** 2)
+    if ss_tot == 0:
+        return 0.0
+    return 1 - (ss_res / ss_tot)
+
+
+class IncrementalLinearRegression:
+    """Least squares kept up to date from sufficient statistics.
+
+    Instead of re-solving on the full design matrix, the model accumulates
+    XᵀX and Xᵀy (intercept column included) and re-solves the small
+    (p+1)x(p+1) system when rows arrive. With `window` set, only the most
+    recent `window` rows are kept and older ones are subtracted out again,
+    which gives a rolling-window fit at the same cost.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        self.xtx = None
+        self.xty = None
+        self.n = 0
+        self.coef_ = None
+        self.intercept_ = None
+        self._rows = deque()
+
+    def _augment(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return np.column_stack([np.ones(X.shape[0]), X])
+
+    def _accumulate(self, Xa, y, sign):
+        if self.xtx is None:
+            k = Xa.shape[1]
+            self.xtx = np.zeros((k, k))
+            self.xty = np.zeros(k)
+        self.xtx += sign * (Xa.T @ Xa)
+        self.xty += sign * (Xa.T @ y)
+        self.n += sign * Xa.shape[0]
+
+    def partial_fit(self, X, y):
+        """Add rows (and expire the oldest ones beyond `window`), then re-solve"""
+        Xa = self._augment(X)
+        y = np.asarray(y, dtype=float).ravel()
+        self._accumulate(Xa, y, 1)
+        if self.window is not None:
+            self._rows.extend(zip(Xa, y))
+            expired = []
+            while len(self._rows) > self.window:
+                expired.append(self._rows.popleft())
+            if expired:
+                self._accumulate(np.array([r[0] for r in expired]), np.array([r[1] for r in expired]), -1)
+        return self._solve()
+
+    def remove(self, X, y):
+        """Subtract previously added rows, then re-solve. With `window`, the
+        rows are also dropped from the window; rows that have already
+        expired out of it are not subtracted a second time."""
+        Xa = self._augment(X)
+        y = np.asarray(y, dtype=float).ravel()
+        if self.window is not None:
+            found = []
+            for i, (xa, yi) in enumerate(zip(Xa, y)):
+                for j, (rx, ry) in enumerate(self._rows):
+                    if ry == yi and np.array_equal(rx, xa):
+                        del self._rows[j]
+                        found.append(i)
+                        break
+            Xa, y = Xa[found], y[found]
+        if len(y):
+            self._accumulate(Xa, y, -1)
+        return self._solve()
+
+    def fit(self, X, y):
+        """Reset and fit from scratch"""
+        self.xtx = self.xty = None
+        self.n = 0
+        self._rows.clear()
+        return self.partial_fit(X, y)
+
+    def _solve(self):
+        if self.n <= 0:
+            self.coef_ = self.intercept_ = None
+            return self
+        # Scale columns to unit diagonal first: Volume-sized features would
+        # otherwise make the normal equations badly conditioned.
+        d = np.sqrt(np.diag(self.xtx))
+        d[d == 0] = 1.0
+        A = self.xtx / np.outer(d, d)
+        b = self.xty / d
+        # lstsq rather than solve: collinear columns (e.g. High/Low moving
+        # with Close) must give the minimum-norm answer, not noise
+        z = np.linalg.lstsq(A, b, rcond=None)[0]
+        coefs = z / d
+        self.intercept_ = float(coefs[0])
+        self.coef_ = coefs[1:].astype(float)
+        return self
+
+    def predict(self, X):
+        """Make predictions"""
+        if self.coef_ is None:
+            raise ValueError("Model must be fitted before prediction")
+        return self.intercept_ + np.dot(X, self.coef_)
+
+    def save(self, path):
+        """Persist the statistics (and window rows) to an .npz file"""
+        rows = list(self._rows)
+        np.savez(
+            path,
+            xtx=self.xtx if self.xtx is not None else np.zeros((0, 0)),
+            xty=self.xty if self.xty is not None else np.zeros(0),
+            n=self.n,
+            window=-1 if self.window is None else self.window,
+            row_X=np.array([r[0] for r in rows]) if rows else np.zeros((0, 0)),
+            row_y=np.array([r[1] for r in rows]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            window = int(data['window'])
+            model = cls(window=None if window < 0 else window)
+            if data['xtx'].size:
+                model.xtx = data['xtx'].copy()
+                model.xty = data['xty'].copy()
+                model.n = int(data['n'])
+            model._rows.extend(zip(data['row_X'], data['row_y']))
+        return model._solve()
+
+
+def fit_batched(Xs, ys, tol=1e-10):
+    """Fit one SimpleLinearRegression per (X, y) pair in a single batched solve.
+
+    Histories may have different lengths: they are zero-padded into one
+    (tickers, rows, features + 1) array, and padded rows drop out of XᵀX.
+    The normal equations of every ticker are column-scaled to unit diagonal.
+    One batched Cholesky factorization flags the near-dependent ones: a
+    squared pivot below `tol` means a column is almost a combination of the
+    columns before it. The remaining systems are solved with one batched
+    np.linalg.solve. Flagged tickers fall back to pinv on their own rows, so
+    they get the same minimum-norm answer as SimpleLinearRegression. A
+    column that is zero for a ticker gets a zero coefficient.
+    """
+    if not len(Xs):
+        return []
+    Xs = [np.asarray(X, dtype=float).reshape(len(X), -1) for X in Xs]
+    k = Xs[0].shape[1] + 1
+    lengths = np.array([len(X) for X in Xs])
+    Xa = np.zeros((len(Xs), lengths.max(), k))
+    Y = np.zeros((len(Xs), lengths.max()))
+    Xa[:, :, 0] = np.arange(lengths.max())[None, :] < lengths[:, None]
+    for i, (X, y) in enumerate(zip(Xs, ys)):
+        Xa[i, :len(X), 1:] = X
+        Y[i, :len(X)] = y
+
+    A = Xa.transpose(0, 2, 1) @ Xa
+    b = (Xa.transpose(0, 2, 1) @ Y[:, :, None])[:, :, 0]
+    d = np.sqrt(np.einsum('bkk->bk', A))
+    zero = d == 0
+    d[zero] = 1.0
+    A /= d[:, :, None] * d[:, None, :]
+    b /= d
+    # Zero columns: unit diagonal and zero right-hand side -> coefficient 0
+    batch_idx, col_idx = np.nonzero(zero)
+    A[batch_idx, col_idx, col_idx] = 1.0
+
+    # A tiny shift keeps exactly singular systems from aborting the batch;
+    # it is far below `tol`, so it cannot hide a dependency
+    pivots = np.einsum('bkk->bk', np.linalg.cholesky(A + 1e-13 * np.eye(k))) ** 2
+    ok = pivots.min(axis=1) > tol
+    coefs = np.empty((len(Xs), k))
+    if ok.any():
+        coefs[ok] = np.linalg.solve(A[ok], b[ok][:, :, None])[:, :, 0] / d[ok]
+    for i in np.flatnonzero(~ok):
+        n = lengths[i]
+        coefs[i] = np.linalg.pinv(Xa[i, :n]) @ Y[i, :n]
+
+    models = []
+    for c in coefs:
+        model = SimpleLinearRegression()
+        model.intercept_ = float(c[0])
+        model.coef_ = c[1:].astype(float)
+        models.append(model)
+    return models
+
+
+@lru_cache(maxsize=32)
+def _resample_indices(n, start, size, seed):
+    """(size, n) row indices drawn with replacement for resamples
+    start..start+size-1. Depends only on its arguments, so tickers with the
+    same history length share them."""
+    idx = np.random.default_rng([seed, start]).integers(0, n, (size, n))
+    idx.flags.writeable = False
+    return idx
+
+
+class ResidualBootstrap:
+    """Residual-bootstrap prediction intervals for a fitted least-squares model.
+
+    Each resample refits on y* = Xb + e*, where e* holds n residuals drawn
+    with replacement (e*_i = e[idx_i]). The least-squares refit only moves
+    the coefficients by pinv(X) e*, so a chunk of resamples is one
+    e[idx] @ pinv(X).T product, (chunk, n) @ (n, p+1), instead of a loop
+    of refits, and the index matrices are cached. Chunks are added until
+    `resamples` is reached or `budget` seconds have passed (resamples_
+    says how many were used). A prediction interval adds a freshly drawn
+    residual to every resampled prediction and takes quantiles. `seed`
+    keeps the bands reproducible for unchanged data.
+    """
+
+    def __init__(self, resamples=1000, budget=None, seed=0, chunk=250):
+        self.resamples = int(resamples)
+        self.budget = budget
+        self.seed = seed
+        self.chunk = chunk
+        self.model_ = None
+        self.deltas_ = None
+        self.residuals_ = None
+        self.resamples_ = 0
+
+    def fit(self, model, X, y):
+        """Resample around `model`, already fitted on (X, y)"""
+        t0 = time.perf_counter()
+        X = np.asarray(X, dtype=float).reshape(len(X), -1)
+        y = np.asarray(y, dtype=float).ravel()
+        n, k = len(X), X.shape[1] + 1
+        if n <= k:
+            raise ValueError("Need more rows than coefficients to bootstrap")
+        resid = y - model.predict(X)
+        # Centre, and undo the shrinkage of fitted residuals
+        resid = (resid - resid.mean()) * np.sqrt(n / (n - k))
+        # Column-scaled pseudo-inverse: Volume-sized columns would otherwise
+        # swamp the small singular values
+        Xa = np.column_stack([np.ones(n), X])
+        d = np.sqrt((Xa ** 2).sum(axis=0))
+        d[d == 0] = 1.0
+        pinv_t = (np.linalg.pinv(Xa / d) / d[:, None]).T                 # (n, k)
+        deltas = []
+        done = 0
+        while done < self.resamples:
+            size = min(self.chunk, self.resamples - done)
+            deltas.append(resid[_resample_indices(n, done, size, self.seed)] @ pinv_t)
+            done += size
+            if self.budget is not None and time.perf_counter() - t0 > self.budget:
+                break
+        self.model_ = model
+        self.deltas_ = np.concatenate(deltas)
+        self.residuals_ = resid
+        self.resamples_ = done
+        self._rng = np.random.default_rng(self.seed)
+        return self
+
+    def interval(self, X, level=0.9):
+        """(lower, upper) arrays of `level` prediction intervals for rows X"""
+        if self.deltas_ is None:
+            raise ValueError("Bootstrap must be fitted before computing intervals")
+        X = np.asarray(X, dtype=float).reshape(len(X), -1)
+        Xa = np.column_stack([np.ones(len(X)), X])
+        # Deviations from the point prediction: coefficient noise plus a new residual
+        dev = Xa @ self.deltas_.T                               # (rows, B)
+        dev += self.residuals_[self._rng.integers(0, len(self.residuals_), dev.shape)]
+        lo, hi = np.quantile(dev, [(1 - level) / 2, (1 + level) / 2], axis=1)
+        point = np.asarray(self.model_.predict(X), dtype=float)
+        return point + lo, point + hi
+
+
+# Ridge penalties tried by default (on standardized features)
+DEFAULT_ALPHAS = (0.01, 0.1, 1.0, 10.0, 100.0)
+
+
+def ridge_path(X, Y, alphas):
+    """Ridge solutions for every alpha from a single SVD.
+
+    Features are standardized and the intercept is left unpenalized. Y may
+    hold several targets (one per column); they share the decomposition.
+    Returns (coefs, intercepts, gcv) shaped (a, p, k), (a, k) and (a, k),
+    with coefficients in the original feature units and gcv the
+    generalized cross-validation score of each alpha and target.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y.reshape(-1, 1)
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+    n = X.shape[0]
+    x_mean = X.mean(axis=0)
+    x_std = X.std(axis=0)
+    x_std[x_std == 0] = 1.0
+    y_mean = Y.mean(axis=0)
+    Xs = (X - x_mean) / x_std
+    Yc = Y - y_mean
+
+    U, s, Vt = np.linalg.svd(Xs, full_matrices=False)
+    z = U.T @ Yc                                              # (r, k)
+    keep = s > s.max(initial=0.0) * max(X.shape) * np.finfo(float).eps
+    s2 = s ** 2
+    # d[a, i] = s_i / (s_i^2 + alpha_a); f = shrinkage factors s^2 / (s^2 + alpha)
+    denom = s2[None, :] + alphas[:, None]
+    d = np.where(keep, s[None, :] / np.where(denom > 0, denom, 1.0), 0.0)
+    f = d * s[None, :]
+    coefs = np.einsum('pr,ar,rk->apk', Vt.T, d, z) / x_std[None, :, None]
+    intercepts = y_mean[None, :] - np.einsum('p,apk->ak', x_mean, coefs)
+
+    # GCV: RSS(alpha) / (1 - (df + 1) / n)^2 / n, df = sum of shrinkage factors
+    rss = (Yc ** 2).sum(axis=0)[None, :] - (z ** 2).sum(axis=0)[None, :] \
+        + np.einsum('ar,rk->ak', (1 - f) ** 2, z ** 2)
+    dof = f.sum(axis=1, keepdims=True) + 1
+    gcv = (rss / n) / np.maximum(1 - dof / n, 1e-12) ** 2
+    return coefs, intercepts, gcv
+
+
+class RidgeRegression:
+    """Ridge regression solved in closed form for all `alphas` at once.
+
+    The alpha with the lowest GCV score (summed over targets) is kept as
+    alpha_; gcv_ holds the score of every alpha. y may be 1-D or have one
+    column per target.
+    """
+
+    def __init__(self, alphas=DEFAULT_ALPHAS):
+        self.alphas = tuple(np.atleast_1d(alphas).astype(float))
+        self.alpha_ = None
+        self.gcv_ = None
+        self.coef_ = None
+        self.intercept_ = None
+
+    def fit(self, X, y):
+        coefs, intercepts, gcv = ridge_path(X, y, self.alphas)
+        best = int(np.argmin(gcv.sum(axis=1)))
+        self.alpha_ = self.alphas[best]
+        self.gcv_ = gcv.sum(axis=1)
+        multi = np.ndim(y) > 1
+        self.coef_ = coefs[best] if multi else coefs[best][:, 0]
+        self.intercept_ = intercepts[best] if multi else float(intercepts[best][0])
+        return self
+
+    def predict(self, X):
+        """Make predictions"""
+        if self.coef_ is None:
+            raise ValueError("Model must be fitted before prediction")
+        return self.intercept_ + np.dot(X, self.coef_)
+
+
+def horizon_targets(X, close, horizons):
+    """Rows of X paired with the closes 1..horizons rows ahead.
+
+    Returns (X[:n-h], Y) where Y[i, j] = close[i + j + 1].
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close) - horizons
+    if n <= 0:
+        return X[:0], np.empty((0, horizons))
+    cols = np.lib.stride_tricks.sliding_window_view(close[1:], horizons)[:n]
+    return X[:n], cols
+
+
+class MultiHorizonRegression:
+    """Direct multi-horizon forecaster: one linear model per horizon 1..k,
+    all fitted in a single multi-output solve (least squares, or ridge when
+    `alphas` is given) rather than k separate fits or recursive steps."""
+
+    def __init__(self, horizons=5, alphas=None):
+        self.horizons = int(horizons)
+        self.alphas = alphas
+        self.alpha_ = None
+        self.coef_ = None
+        self.intercept_ = None
+
+    def fit(self, X, close):
+        """Fit on feature rows X and the close series aligned with them"""
+        Xh, Y = horizon_targets(np.asarray(X, dtype=float), close, self.horizons)
+        if len(Y) == 0:
+            raise ValueError("Not enough rows for the requested horizons")
+        if self.alphas is not None:
+            ridge = RidgeRegression(self.alphas).fit(Xh, Y)
+            self.alpha_, self.coef_, self.intercept_ = ridge.alpha_, ridge.coef_, ridge.intercept_
+            return self
+        Xa = np.column_stack([np.ones(len(Xh)), Xh])
+        coefs = np.linalg.lstsq(Xa, Y, rcond=None)[0]
+        self.intercept_ = coefs[0]
+        self.coef_ = coefs[1:]
+        return self
+
+    def predict(self, X):
+        """(rows, horizons) forecasts: column j is j+1 rows ahead"""
+        if self.coef_ is None:
+            raise ValueError("Model must be fitted before prediction")
+        return self.intercept_ + np.dot(X, self.coef_)
+
+
+# Single-horizon models selectable by name (app.predict_stock(model=...))
+MODELS = {
+    "ols": SimpleLinearRegression,
+    "ridge": RidgeRegression,
+}
+
+
+def make_model(name):
+    if name not in MODELS:
+        raise ValueError(f"Unknown model: {name}")
+    return MODELS[name]()
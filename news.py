@@ -0,0 +1,155 @@
+# news.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+from fetch import parse_feed
+from metrics import register_collector
+from news_store import NewsStore, default_path
+from sentiment import get_default_scorer
+
+# Feeds that do not depend on the ticker; shared by every request
+SHARED_RSS_URLS = [
+    "https://www.thehindu.com/business/feeder/default.rss",
+    "https://feeds.feedburner.com/NDTV-Business",
+    "https://www.moneycontrol.com/rss/latestnews.xml"
+]
+
+
+def ticker_rss_url(ticker):
+    return f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=IN&lang=en-IN"
+
+
+def feed_ticker(url):
+    """The ticker a ticker_rss_url() feed belongs to (None for other feeds)"""
+    return parse_qs(urlparse(url).query).get("s", [None])[0]
+
+
+class _FeedEntry:
+    __slots__ = ("fetched_at", "etag", "modified", "lock")
+
+    def __init__(self):
+        self.fetched_at = None
+        self.etag = None
+        self.modified = None
+        self.lock = threading.Lock()
+
+
+class NewsService:
+    """Concurrent, TTL-cached RSS ingestion.
+
+    Each feed is parsed at most once per `ttl` seconds; re-fetches send the
+    stored ETag/Last-Modified so unchanged feeds come back as 304. Parsed
+    headlines go into a news_store.NewsStore, which keeps every headline
+    it has seen, so a failing feed still has its earlier rows.
+    `parse` defaults to fetch.parse_feed: HTTP feeds go through the shared
+    fetch layer (pooled connections, per-host rate limits, retries, circuit
+    breaker) and local file paths straight to feedparser, so the service
+    runs against recorded feeds offline.
+    """
+
+    def __init__(self, ttl=None, max_workers=8, parse=None, store=None):
+        self.ttl = float(ttl if ttl is not None else os.environ.get('STOCK_NEWS_TTL', 900))
+        self.max_workers = max_workers
+        self.parse = parse or parse_feed
+        self.store = store if store is not None else NewsStore()
+        self.fetches = 0
+        self.not_modified = 0
+        self.failures = 0
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, url):
+        with self._lock:
+            entry = self._feeds.get(url)
+            if entry is None:
+                entry = self._feeds[url] = _FeedEntry()
+            return entry
+
+    def _fresh(self, entry, now):
+        return entry.fetched_at is not None and now - entry.fetched_at < self.ttl
+
+    def _fetch(self, url):
+        entry = self._entry(url)
+        # Per-feed lock: concurrent requests wait for one fetch of the same feed
+        with entry.lock:
+            if self._fresh(entry, time.monotonic()):
+                return
+            self.fetches += 1
+            try:
+                rss = self.parse(url, etag=entry.etag, modified=entry.modified)
+            except Exception:
+                self.failures += 1
+                return
+            if getattr(rss, 'status', None) == 304:
+                self.not_modified += 1
+                entry.fetched_at = time.monotonic()
+                return
+            if getattr(rss, 'bozo', False) and not getattr(rss, 'entries', None):
+                # Unreachable or unparseable feed; keep the stale rows
+                self.failures += 1
+                return
+            self.store.add(url, *parse_entries(rss.entries), ticker=feed_ticker(url))
+            entry.etag = getattr(rss, 'etag', None)
+            entry.modified = getattr(rss, 'modified', None)
+            entry.fetched_at = time.monotonic()
+
+    def refresh(self, urls):
+        """Fetch every stale feed in `urls` concurrently"""
+        now = time.monotonic()
+        stale = [u for u in dict.fromkeys(urls) if not self._fresh(self._entry(u), now)]
+        if len(stale) == 1:
+            self._fetch(stale[0])
+        elif stale:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(stale))) as pool:
+                list(pool.map(self._fetch, stale))
+        if stale:
+            self.store.save()
+
+    def expire(self):
+        """Mark every feed stale; the next read revalidates it (ETags are kept)"""
+        with self._lock:
+            for entry in self._feeds.values():
+                entry.fetched_at = None
+
+    def daily_sentiment(self, urls, start_date, end_date):
+        """Mean headline sentiment per calendar day (start and end inclusive)
+        over the given feeds, as a news_store.DailySentiment. A headline
+        carried by several of the feeds counts once."""
+        self.refresh(urls)
+        return self.store.daily(urls, start_date, end_date)
+
+    def stats(self):
+        return {"fetches": self.fetches, "not_modified": self.not_modified, "failures": self.failures}
+
+
+def parse_entries(entries):
+    """Turn feed entries into (dates, titles, sentiment scores)"""
+    dates, titles = [], []
+    for entry in entries:
+        if hasattr(entry, "published_parsed") and entry.published_parsed:
+            try:
+                dt = datetime(*entry.published_parsed[:6])
+                title = entry.title
+            except (ValueError, TypeError, IndexError, AttributeError):
+                continue
+            dates.append(dt.date())
+            titles.append(title)
+    return dates, titles, get_default_scorer().score_many(titles)
+
+
+_default_service = None
+
+
+def get_default_news_service():
+    """Process-wide service used by predict_stock when none is passed in"""
+    global _default_service
+    if _default_service is None:
+        # Headlines persist across restarts in $STOCK_NEWS_STORE
+        _default_service = NewsService(store=NewsStore(default_path()))
+        register_collector(lambda: {f"stock_news_{k}": v for k, v in _default_service.stats().items()})
+        register_collector(lambda: {f"stock_news_store_{k}": v for k, v in _default_service.store.stats().items()})
+    return _default_service
@@ -0,0 +1,267 @@
+# news_store.py
+"""Array-backed headline sentiment store.
+
+Every headline is one row in parallel NumPy arrays, kept sorted by day:
+
+    day     int32    days since 1970-01-01
+    score   float32  headline sentiment
+    source  int32    id of the feed it came from
+    ticker  int32    id of the ticker of that feed (-1 for shared feeds)
+    key     uint64   hash of (day, normalized title)
+
+A feed re-serving a headline it already delivered adds nothing, so the
+store keeps accumulating history as items scroll out of the RSS window.
+daily() selects a date range with two binary searches. It drops a headline
+that several of the requested feeds carry, and averages per day with
+np.bincount. The result is a DailySentiment, which features.base_columns
+joins onto prices without any DataFrame.
+
+Several processes can share one file: save() takes an exclusive lock,
+merges in what the other writers saved since, drops headlines older than
+the retention window and only then replaces the file.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not serialized across processes
+    fcntl = None
+
+_EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+ARRAYS = (("day", np.int32), ("score", np.float32), ("source", np.int32), ("ticker", np.int32),
+          ("key", np.uint64))
+
+
+# Headlines older than this many days are dropped on save (0 keeps all);
+# the default covers the model's training window with room to spare
+RETENTION_DAYS = int(os.environ.get('STOCK_NEWS_RETENTION_DAYS', 730))
+
+
+def default_path():
+    return os.environ.get('STOCK_NEWS_STORE') or os.path.join(tempfile.gettempdir(), 'stock_news.npz')
+
+
+def headline_key(day, title):
+    """64-bit hash of a headline on a given day (case and spacing ignored)"""
+    text = "%d|%s" % (day, " ".join(title.split()).casefold())
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on `path`.lock, held across processes"""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read(path):
+    """(arrays, sources, tickers) saved at `path`"""
+    with np.load(path) as data:
+        arrays = {name: data[name].astype(dtype) for name, dtype in ARRAYS}
+        return arrays, json.loads(str(data["sources"])), json.loads(str(data["tickers"]))
+
+
+class DailySentiment:
+    """Mean headline sentiment per calendar day (days sorted, no gaps filled)"""
+
+    def __init__(self, days, sentiment):
+        self.days = days
+        self.sentiment = sentiment
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getitem__(self, name):
+        # The old DateOnly/Sentiment frame columns
+        if name == 'DateOnly':
+            return self.days.astype(object)
+        if name == 'Sentiment':
+            return self.sentiment
+        raise KeyError(name)
+
+    def on(self, day):
+        """Sentiment of one day (a date), 0.0 if it had no headlines"""
+        day = np.datetime64(day, 'D')
+        pos = int(np.searchsorted(self.days, day))
+        if pos < len(self.days) and self.days[pos] == day:
+            return float(self.sentiment[pos])
+        return 0.0
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({'DateOnly': self['DateOnly'], 'Sentiment': self.sentiment})
+
+
+class NewsStore:
+    """Headline rows for many feeds; persisted to `path` on save() (in
+    memory only when path is None)"""
+
+    def __init__(self, path=None, retention_days=None):
+        self.path = path
+        self.retention_days = RETENTION_DAYS if retention_days is None else retention_days
+        self.sources = []
+        self.tickers = []
+        self._source_ids = {}
+        self._ticker_ids = {}
+        self._arrays = {name: np.empty(0, dtype) for name, dtype in ARRAYS}
+        self._pending = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.added = 0
+        self.duplicates = 0
+        self.queries = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        with self._lock:
+            self._merge()
+            return len(self._arrays["day"])
+
+    def _id(self, ids, names, name):
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(names)
+            names.append(name)
+        return i
+
+    def add(self, source, dates, titles, scores, ticker=None):
+        """Add one feed's headlines, given as parallel sequences of dates,
+        titles and scores; returns how many were new"""
+        days = np.fromiter((d.toordinal() - _EPOCH_ORDINAL for d in dates), np.int64, len(dates))
+        keys = np.fromiter((headline_key(d, t) for d, t in zip(days.tolist(), titles)), np.uint64, len(days))
+        with self._lock:
+            sid = self._id(self._source_ids, self.sources, source)
+            tid = self._id(self._ticker_ids, self.tickers, ticker) if ticker else -1
+            self._merge()
+            a = self._arrays
+            # Keep the first copy of each headline per feed
+            _, first = np.unique(keys, return_index=True)
+            first.sort()
+            new = first[~np.isin(keys[first], a["key"][a["source"] == sid])]
+            self.duplicates += len(days) - len(new)
+            if not len(new):
+                return 0
+            self._pending.append({"day": days[new], "score": np.asarray(scores, dtype=float)[new],
+                                  "source": np.full(len(new), sid), "ticker": np.full(len(new), tid),
+                                  "key": keys[new]})
+            self.added += len(new)
+            self._dirty = True
+            return len(new)
+
+    def _merge(self):
+        """Fold pending rows into the sorted arrays (caller holds the lock)"""
+        if not self._pending:
+            return
+        parts = [self._arrays] + self._pending
+        merged = {name: np.concatenate([p[name] for p in parts]).astype(dtype) for name, dtype in ARRAYS}
+        order = np.argsort(merged["day"], kind="stable")
+        self._arrays = {name: values[order] for name, values in merged.items()}
+        self._pending = []
+
+    def daily(self, sources=None, start=None, end=None, tickers=None, dedup=True):
+        """DailySentiment over start <= day <= end (dates or datetimes) for
+        headlines from any of `sources` or any feed of `tickers`. With
+        dedup, a headline carried by several of those feeds counts once."""
+        with self._lock:
+            self._merge()
+            a = self._arrays
+            source_ids = [self._source_ids[s] for s in sources or () if s in self._source_ids]
+            ticker_ids = [self._ticker_ids[t] for t in tickers or () if t in self._ticker_ids]
+        self.queries += 1
+        lo = int(np.searchsorted(a["day"], start.toordinal() - _EPOCH_ORDINAL)) if start else 0
+        hi = int(np.searchsorted(a["day"], end.toordinal() - _EPOCH_ORDINAL, side="right")) if end else len(a["day"])
+        wanted = np.isin(a["source"][lo:hi], source_ids) | np.isin(a["ticker"][lo:hi], ticker_ids)
+        day = a["day"][lo:hi][wanted]
+        score = a["score"][lo:hi][wanted]
+        if dedup and len(day):
+            _, first = np.unique(a["key"][lo:hi][wanted], return_index=True)
+            first.sort()
+            day, score = day[first], score[first]
+        if not len(day):
+            return DailySentiment(np.empty(0, 'datetime64[D]'), np.empty(0))
+        offset = day - day[0]
+        counts = np.bincount(offset)
+        sums = np.bincount(offset, weights=score)
+        present = np.flatnonzero(counts)
+        return DailySentiment((day[0] + present).astype('datetime64[D]'), sums[present] / counts[present])
+
+    def save(self):
+        """Merge with what other writers saved, apply the retention window
+        and write the store to `path` (atomically) if anything was added"""
+        if not self.path:
+            return
+        if not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with _file_lock(self.path):
+            on_disk = _read(self.path) if os.path.exists(self.path) else None
+            with self._lock:
+                if on_disk is not None:
+                    self._adopt(*on_disk)
+                self._merge()
+                self._retain()
+                buf = io.BytesIO()
+                np.savez(buf, sources=json.dumps(self.sources), tickers=json.dumps(self.tickers), **self._arrays)
+                self._dirty = False
+            tmp = "%s.%d.tmp" % (self.path, os.getpid())
+            with open(tmp, "wb") as f:
+                f.write(buf.getvalue())
+            os.replace(tmp, self.path)
+
+    def _adopt(self, arrays, sources, tickers):
+        """Queue rows saved by another writer, mapped onto this store's
+        source and ticker ids; headlines this store already has are
+        skipped (caller holds the lock)"""
+        self._merge()
+        if not len(arrays["day"]):
+            return
+        source_ids = np.array([self._id(self._source_ids, self.sources, s) for s in sources], np.int64)
+        # The trailing -1 keeps shared feeds (ticker -1) at -1
+        ticker_ids = np.array([self._id(self._ticker_ids, self.tickers, t) for t in tickers] + [-1], np.int64)
+        arrays = dict(arrays, source=source_ids[arrays["source"]], ticker=ticker_ids[arrays["ticker"]])
+        a = self._arrays
+        known = np.isin(arrays["source"].astype(np.uint64) << np.uint64(32) ^ arrays["key"],
+                        a["source"].astype(np.uint64) << np.uint64(32) ^ a["key"])
+        if not known.all():
+            self._pending.append({name: values[~known] for name, values in arrays.items()})
+
+    def _retain(self):
+        """Drop rows older than the retention window (caller holds the lock)"""
+        if not self.retention_days:
+            return
+        cutoff = date.today().toordinal() - _EPOCH_ORDINAL - self.retention_days
+        lo = int(np.searchsorted(self._arrays["day"], cutoff))
+        if lo:
+            self._arrays = {name: values[lo:] for name, values in self._arrays.items()}
+
+    def load(self):
+        arrays, sources, tickers = _read(self.path)
+        with self._lock:
+            self._arrays = arrays
+            self.sources, self.tickers = sources, tickers
+            self._source_ids = {s: i for i, s in enumerate(sources)}
+            self._ticker_ids = {t: i for i, t in enumerate(tickers)}
+            self._pending = []
+
+    def stats(self):
+        return {"items": len(self), "added": self.added, "duplicates": self.duplicates, "queries": self.queries}
+
@@ -2,6 +2,32 @@ import { useState, useEffect } from 'react';
 import Head from 'next/head';
 import Script from 'next/script';
 
+// Call onEvent(event, data) for every {"event", "data"} line of an NDJSON body
+async function readEvents(response, onEvent) {
+  const handleLine = (line) => {
+    if (line.trim()) {
+      const { event, data } = JSON.parse(line);
+      onEvent(event, data);
+    }
+  };
+  if (!response.body || !response.body.getReader) {
+    (await response.text()).split('\n').forEach(handleLine);
+    return;
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffered);
+}
+
 export default function Home() {
   const [stock, setStock] = useState('');
   const [loading, setLoading] = useState(false);
@@ -20,16 +46,30 @@ export default function Home() {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ stock }),
+        body: JSON.stringify({ stock, stream: 'ndjson' }),
       });
 
-      const data = await response.json();
-
-      if (data.error) {
-        setError('No Stock Found! Try a valid stock.');
-      } else {
-        setResult(data);
+      // Validation errors come back as plain JSON
+      if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+        const data = await response.json();
+        if (data.error) {
+          setError('No Stock Found! Try a valid stock.');
+        } else {
+          setResult(data);
+        }
+        return;
       }
+
+      // Merge each streamed partial result as it arrives
+      await readEvents(response, (event, data) => {
+        if (event === 'failed') {
+          setResult(null);
+          setError('No Stock Found! Try a valid stock.');
+        } else if (event !== 'done') {
+          setResult((prev) => ({ ...prev, ...data }));
+          setLoading(false);
+        }
+      });
     } catch (err) {
       setError('An error occurred. Please try again.');
     } finally {
@@ -163,15 +203,21 @@ export default function Home() {
                   </li>
                   <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
                     <span>Predicted Next Price</span>
-                    <span>{result.predicted_next}</span>
+                    <span>{result.predicted_next ?? '…'}</span>
                   </li>
+                  {result.pred_lower != null && (
+                    <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
+                      <span>{Math.round(result.interval_level * 100)}% Range</span>
+                      <span>{result.pred_lower.toFixed(2)} – {result.pred_upper.toFixed(2)}</span>
+                    </li>
+                  )}
                   <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
                     <span>Accuracy</span>
-                    <span>{result.accuracy}%</span>
+                    <span>{result.accuracy != null ? result.accuracy + '%' : '…'}</span>
                   </li>
                   <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
                     <span>RMSE</span>
-                    <span>{result.rmse}</span>
+                    <span>{result.rmse ?? '…'}</span>
                   </li>
                 </ul>
 
@@ -189,15 +235,15 @@ export default function Home() {
                   <ul className="list-group">
                     <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
                       <span>Backtest RMSE (Oct 11 – Nov 09)</span>
-                      <span>{result.comparison_rmse !== null ? result.comparison_rmse.toFixed(4) : 'N/A'}</span>
+                      <span>{result.comparison_rmse != null ? result.comparison_rmse.toFixed(4) : 'N/A'}</span>
                     </li>
                     <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
                       <span>Backtest MAPE (Oct 11 – Nov 09)</span>
-                      <span>{result.comparison_mape !== null ? result.comparison_mape.toFixed(2) + '%' : 'N/A'}</span>
+                      <span>{result.comparison_mape != null ? result.comparison_mape.toFixed(2) + '%' : 'N/A'}</span>
                     </li>
                     <li className="list-group-item d-flex justify-content-between bg-transparent border-light">
                       <span>Directional Accuracy (Up/Down match)</span>
-                      <span>{result.directional_accuracy !== null ? result.directional_accuracy.toFixed(2) + '%' : 'N/A'}</span>
+                      <span>{result.directional_accuracy != null ? result.directional_accuracy.toFixed(2) + '%' : 'N/A'}</span>
                     </li>
                   </ul>
                 </div>
@@ -246,9 +292,20 @@ export default function Home() {
   );
 }
 
+function intervalBars(values, lower, upper) {
+  return {
+    type: 'data',
+    symmetric: false,
+    array: upper.map((u, i) => u - values[i]),
+    arrayminus: lower.map((l, i) => values[i] - l),
+    color: 'rgba(255,209,153,0.6)',
+    thickness: 2
+  };
+}
+
 function ChartComponent({ result }) {
   useEffect(() => {
-    if (typeof window === 'undefined' || !window.Plotly || !result) return;
+    if (typeof window === 'undefined' || !window.Plotly || !result || !result.hist_dates) return;
 
     // Main price chart
     const traceHist = {
@@ -266,6 +323,10 @@ function ChartComponent({ result }) {
       marker: { size: 18, color: '#FF8A00', line: { width: 4, color: '#FFD199' } },
       name: 'Prediction'
     };
+    if (result.pred_lower !== undefined) {
+      // Bootstrap prediction interval
+      tracePred.error_y = intervalBars([result.pred_value], [result.pred_lower], [result.pred_upper]);
+    }
 
     window.Plotly.newPlot('chart', [traceHist, tracePred], {
       title: {
@@ -299,6 +360,9 @@ function ChartComponent({ result }) {
         line: { width: 3, color: '#FFAB40' },
         marker: { size: 6 }
       };
+      if (result.month_pred_lower) {
+        traceCmp.error_y = intervalBars(result.month_pred_values, result.month_pred_lower, result.month_pred_upper);
+      }
 
       window.Plotly.newPlot('comparison_chart', [traceAct, traceCmp], {
         title: {
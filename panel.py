@@ -0,0 +1,268 @@
+# panel.py
+"""Shared, memory-mapped price panel.
+
+    python panel.py universe.txt --dir /srv/panel --every 900
+
+One refresher process reads the universe through the PriceStore and writes
+a date x ticker float64 array per OHLCV field into a single file, next to
+a small JSON header (tickers, dates, version). Web workers started with
+STOCK_PRICE_PANEL=/srv/panel map that file read-only: every worker shares
+the same page-cache pages, and predict_stock reads zero-copy NumPy views
+instead of downloading prices or building DataFrames per request.
+
+Each refresh writes a new version and then atomically replaces
+current.json. Readers notice the new header and remap it. The previous
+version is kept on disk so in-flight readers can finish with it.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from price_store import PRICE_COLUMNS
+
+FIELDS = PRICE_COLUMNS[1:]  # Open, High, Low, Close, Volume
+HEADER = "current.json"
+# The SQLite store's precision: float32 would round prices and volumes
+# above 2**24, so features and registry fingerprints would differ from the
+# store path
+DTYPE = "float64"
+
+
+def default_directory():
+    return os.environ.get('STOCK_PRICE_PANEL') or os.path.join(tempfile.gettempdir(), 'stock_panel')
+
+
+def write_panel(frames, directory=None):
+    """Write {ticker: Date/OHLCV frame} as a new panel version; returns the header"""
+    directory = directory or default_directory()
+    os.makedirs(directory, exist_ok=True)
+    tickers = [t for t, f in frames.items() if f is not None and len(f)]
+    all_dates = [pd.to_datetime(frames[t]['Date']).values.astype('datetime64[ns]') for t in tickers]
+    dates = np.unique(np.concatenate(all_dates)) if all_dates else np.array([], dtype='datetime64[ns]')
+    version = time.time_ns()
+    shape = (len(FIELDS), len(dates), len(tickers))
+
+    data_name = f"panel-{version}.bin"
+    dates_name = f"dates-{version}.npy"
+    tmp = os.path.join(directory, data_name + ".tmp")
+    if all(shape):
+        data = np.memmap(tmp, dtype=DTYPE, mode='w+', shape=shape)
+        data[:] = np.nan
+        for j, (t, frame_dates) in enumerate(zip(tickers, all_dates)):
+            rows = np.searchsorted(dates, frame_dates)
+            data[:, rows, j] = frames[t][FIELDS].values.astype(DTYPE).T
+        data.flush()
+        del data
+    else:
+        open(tmp, 'wb').close()
+    os.replace(tmp, os.path.join(directory, data_name))
+    np.save(os.path.join(directory, dates_name), dates.astype('datetime64[ns]'))
+
+    header = {"version": version, "data": data_name, "dates": dates_name,
+              "shape": list(shape), "dtype": DTYPE, "fields": FIELDS, "tickers": tickers,
+              "written_at": time.time()}
+    tmp = os.path.join(directory, HEADER + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(header, f)
+    previous = _read_header(directory)
+    os.replace(tmp, os.path.join(directory, HEADER))
+    _remove_old_versions(directory, keep={version, previous["version"] if previous else None})
+    return header
+
+
+def _read_header(directory):
+    try:
+        with open(os.path.join(directory, HEADER)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove_old_versions(directory, keep):
+    for name in os.listdir(directory):
+        if name.startswith(("panel-", "dates-")) and not name.endswith(".tmp"):
+            version = name.split("-", 1)[1].split(".", 1)[0]
+            if version.isdigit() and int(version) not in keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+class PanelFrame:
+    """One ticker's Date/OHLCV rows as NumPy arrays (views into the mapped
+    panel where possible). Supports what the prediction path needs from a
+    price frame: len() and column access by name."""
+
+    columns = PRICE_COLUMNS
+
+    def __init__(self, dates, fields):
+        self._columns = dict(fields, Date=dates)
+
+    def __len__(self):
+        return len(self._columns['Date'])
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def to_frame(self):
+        return pd.DataFrame({c: self._columns[c] for c in PRICE_COLUMNS})
+
+
+def _empty_frame():
+    return PanelFrame(np.array([], dtype='datetime64[ns]'), {f: np.array([], DTYPE) for f in FIELDS})
+
+
+class SharedPanel:
+    """Read-only view of the latest panel version in `directory`"""
+
+    def __init__(self, directory=None, check_interval=1.0):
+        self.directory = directory or default_directory()
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._state = None
+        self._checked_at = 0.0
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        now = time.monotonic()
+        if self._state is not None and now - self._checked_at < self.check_interval:
+            return self._state
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(os.path.join(self.directory, HEADER)).st_mtime_ns
+            except OSError:
+                return self._state
+            if mtime != self._mtime:
+                header = _read_header(self.directory)
+                if header is not None:
+                    self._state = self._map(header)
+                    self._mtime = mtime
+                    self.reloads += 1
+        return self._state
+
+    def _map(self, header):
+        shape = tuple(header["shape"])
+        dates = np.load(os.path.join(self.directory, header["dates"]))
+        data = None
+        if all(shape):
+            # Versions written before the dtype was recorded are float32
+            data = np.memmap(os.path.join(self.directory, header["data"]), dtype=header.get("dtype", "float32"),
+                             mode='r', shape=shape)
+        index = {t: j for j, t in enumerate(header["tickers"])}
+        return header, dates, data, index
+
+    @property
+    def version(self):
+        state = self._current()
+        return state[0]["version"] if state else None
+
+    def tickers(self):
+        state = self._current()
+        return list(state[3]) if state else []
+
+    def frame(self, ticker, start, end):
+        """PanelFrame for start <= Date < end, or None if the ticker is not in the panel"""
+        state = self._current()
+        if state is None or ticker not in state[3]:
+            return None
+        _, dates, data, index = state
+        lo, hi = np.searchsorted(dates, [np.datetime64(pd.Timestamp(start)), np.datetime64(pd.Timestamp(end))])
+        block = data[:, lo:hi, index[ticker]]
+        valid = ~np.isnan(block[FIELDS.index('Close')])
+        if valid.all():
+            return PanelFrame(dates[lo:hi], {f: block[i] for i, f in enumerate(FIELDS)})
+        # Days this ticker did not trade (or was not listed) are gaps: copy out the rest
+        return PanelFrame(dates[lo:hi][valid], {f: block[i][valid] for i, f in enumerate(FIELDS)})
+
+
+class PanelStore:
+    """PriceStore-compatible reader backed by a SharedPanel.
+
+    Tickers missing from the panel go to `fallback` (a PriceStore) when one
+    is given, otherwise they come back empty ("no data")."""
+
+    def __init__(self, panel=None, fallback=None):
+        self.panel = panel or SharedPanel()
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ticker, start, end):
+        frame = self.panel.frame(ticker, start, end)
+        if frame is not None:
+            self.hits += 1
+            return frame
+        self.misses += 1
+        if self.fallback is not None:
+            return self.fallback.get(ticker, start, end)
+        return _empty_frame()
+
+    def get_many(self, tickers, start, end):
+        """{ticker: frame}; only tickers missing from the panel reach the fallback"""
+        frames = {t: self.panel.frame(t, start, end) for t in tickers}
+        missing = [t for t, f in frames.items() if f is None]
+        self.hits += len(tickers) - len(missing)
+        self.misses += len(missing)
+        if missing and self.fallback is not None:
+            frames.update(self.fallback.get_many(missing, start, end))
+        elif missing:
+            frames.update((t, _empty_frame()) for t in missing)
+        return frames
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "version": self.panel.version,
+                "reloads": self.panel.reloads}
+
+
+def refresh_panel(tickers, start, end, directory=None, store=None, batch_size=50):
+    """Read the universe through the price store and publish a new panel"""
+    from app import normalize_ticker
+    from price_store import get_default_store
+
+    store = store or get_default_store()
+    if isinstance(store, PanelStore):
+        store = store.fallback
+    symbols = list(dict.fromkeys(normalize_ticker(t) for t in tickers))
+    frames = {}
+    for i in range(0, len(symbols), batch_size):
+        for t, frame in store.get_many(symbols[i:i + batch_size], start, end).items():
+            if isinstance(frame, Exception):
+                print(f"{t}: {frame}", file=sys.stderr)
+            elif len(frame):
+                frames[t] = frame
+    return write_panel(frames, directory)
+
+
+def main(argv=None):
+    from app import FORECAST_END, START_DATE
+    from scan import read_universe
+
+    parser = argparse.ArgumentParser(description="Write the shared price panel")
+    parser.add_argument("universe", help="file with one ticker per line")
+    parser.add_argument("--dir", default=None, help="panel directory (default: $STOCK_PRICE_PANEL or tempdir)")
+    parser.add_argument("--start", default=START_DATE)
+    parser.add_argument("--end", default=FORECAST_END)
+    parser.add_argument("--every", type=float, default=0, help="refresh every N seconds (0 = once)")
+    args = parser.parse_args(argv)
+
+    tickers = read_universe(args.universe)
+    while True:
+        header = refresh_panel(tickers, args.start, args.end, args.dir)
+        print(f"panel {header['version']}: {len(header['tickers'])} tickers x {header['shape'][1]} dates")
+        if not args.every:
+            return 0
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
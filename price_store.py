@@ -0,0 +1,327 @@
+# price_store.py
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from fetch import FetchError, get_default_fetcher
+from metrics import register_collector
+
+PRICE_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+# Bars older than this are final: a gap before it (weekend, holiday) is not
+# worth refetching, a gap after it may still be filled by the provider
+SETTLE_DAYS = 5
+
+
+def normalize_price_frame(price):
+    """Flatten a provider frame to a plain Date/OHLCV frame"""
+    if price is None or len(price) == 0:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    price = price.copy()
+    if isinstance(price.columns, pd.MultiIndex):
+        price.columns = price.columns.droplevel(1)
+    if 'Date' not in price.columns:
+        price = price.reset_index()
+    price['Date'] = pd.to_datetime(price['Date'])
+    return price[PRICE_COLUMNS]
+
+
+class PriceProvider:
+    """Source of daily OHLCV bars. Subclasses implement fetch()."""
+
+    def fetch(self, ticker, start, end):
+        """Return a Date/OHLCV frame for start <= Date < end"""
+        raise NotImplementedError
+
+    def fetch_many(self, tickers, start, end):
+        """Return {ticker: frame}; providers with a bulk endpoint override this"""
+        return {t: self.fetch(t, start, end) for t in tickers}
+
+
+# yfinance logs, rather than raises, per-ticker download errors; these
+# mean Yahoo itself is failing and the call is worth retrying
+TRANSIENT_ERRORS = ("Too Many Requests", "Rate limited", "timed out", "Timeout", "Failed to perform",
+                    "Connection", "Internal Server Error", "Service Unavailable", "Bad Gateway")
+
+
+class _ErrorLog(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class YFinanceProvider(PriceProvider):
+    """Downloads bars from Yahoo Finance through the fetch layer (rate
+    limit, retries, circuit breaker) on one persistent session"""
+
+    HOST = "finance.yahoo.com"
+
+    def __init__(self, fetcher=None):
+        self.fetcher = fetcher or get_default_fetcher()
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _yahoo_session(self):
+        # yf.download opens a new session per call unless given one
+        if self._session is None:
+            try:
+                from curl_cffi import requests as curl_requests
+            except ImportError:
+                return None
+            self._session = curl_requests.Session(impersonate="chrome")
+        return self._session
+
+    def _download(self, tickers, **kwargs):
+        handler = _ErrorLog()
+        logger = logging.getLogger("yfinance")
+        # One download at a time, so the captured errors are this call's
+        with self._lock:
+            logger.addHandler(handler)
+            try:
+                data = yf.download(tickers, progress=False, auto_adjust=False, timeout=self.fetcher.policy(self.HOST).timeout,
+                                   session=self._yahoo_session(), **kwargs)
+            finally:
+                logger.removeHandler(handler)
+        transient = [m for m in handler.messages if any(e in m for e in TRANSIENT_ERRORS)]
+        if transient and (data is None or data.dropna(how='all').empty):
+            raise FetchError(f"{self.HOST}: {transient[0]}")
+        return data
+
+    def download(self, tickers, **kwargs):
+        """yf.download(tickers, **kwargs) under the Yahoo fetch policy"""
+        return self.fetcher.call(self.HOST, self._download, tickers, **kwargs)
+
+    def fetch(self, ticker, start, end):
+        return normalize_price_frame(self.download(ticker, start=start, end=end))
+
+    def fetch_many(self, tickers, start, end):
+        """One grouped download for all symbols"""
+        tickers = list(tickers)
+        data = self.download(tickers, start=start, end=end, group_by='ticker')
+        if data is None or len(data) == 0:
+            return {t: normalize_price_frame(None) for t in tickers}
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {tickers[0]: normalize_price_frame(data)}
+        frames = {}
+        available = set(data.columns.get_level_values(0))
+        for t in tickers:
+            if t not in available:
+                frames[t] = normalize_price_frame(None)
+                continue
+            frames[t] = normalize_price_frame(data[t].dropna(how='all'))
+        return frames
+
+
+class FrameProvider(PriceProvider):
+    """Serves bars from in-memory frames (offline runs and tests)"""
+
+    def __init__(self, frames):
+        self.frames = {t: normalize_price_frame(f) for t, f in frames.items()}
+        self.calls = []
+
+    def fetch(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        frame = self.frames.get(ticker)
+        if frame is None:
+            return pd.DataFrame(columns=PRICE_COLUMNS)
+        mask = (frame['Date'] >= pd.to_datetime(start)) & (frame['Date'] < pd.to_datetime(end))
+        return frame[mask].reset_index(drop=True)
+
+
+class PriceStore:
+    """SQLite-backed OHLCV cache that only asks the provider for missing dates.
+
+    Each ticker keeps the [start, end) range already fetched in a coverage
+    table; requests inside that range are served locally, anything outside
+    it is fetched from the provider and appended.
+    """
+
+    def __init__(self, path=None, provider=None):
+        self.path = path or os.environ.get(
+            'STOCK_PRICE_STORE', os.path.join(tempfile.gettempdir(), 'stock_prices.sqlite'))
+        self.provider = provider or YFinanceProvider()
+        self.hits = 0
+        self.misses = 0
+        self.rows_fetched = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        # Generous timeout: scanner worker processes share one database file
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS prices (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (ticker, date)
+            );
+            CREATE TABLE IF NOT EXISTS coverage (
+                ticker TEXT PRIMARY KEY,
+                start TEXT NOT NULL,
+                end TEXT NOT NULL
+            );
+        """)
+
+    def _coverage(self, ticker):
+        row = self._conn.execute(
+            "SELECT start, end FROM coverage WHERE ticker = ?", (ticker,)).fetchone()
+        return row
+
+    def _missing_ranges(self, ticker, start, end):
+        cov = self._coverage(ticker)
+        if cov is None:
+            return [(start, end)], None
+        ranges = []
+        if start < cov[0]:
+            ranges.append((start, cov[0]))
+        if end > cov[1]:
+            ranges.append((cov[1], end))
+        return ranges, cov
+
+    def _append(self, ticker, frame):
+        rows = [
+            (ticker, d.strftime("%Y-%m-%d"), float(o), float(h), float(l), float(c), float(v))
+            for d, o, h, l, c, v in frame[PRICE_COLUMNS].itertuples(index=False)
+        ]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.rows_fetched += len(rows)
+
+    def _has_rows(self, ticker):
+        return self._conn.execute(
+            "SELECT 1 FROM prices WHERE ticker = ? LIMIT 1", (ticker,)).fetchone() is not None
+
+    def _covered_end(self, ticker, end):
+        """Exclusive end of the range that can count as fetched: never today
+        or later (today's bar is still partial), and not past the last stored
+        bar while that is recent enough to be missing only for now"""
+        last = self._conn.execute("SELECT MAX(date) FROM prices WHERE ticker = ?", (ticker,)).fetchone()[0]
+        today = date.today()
+        settled = (today - timedelta(days=SETTLE_DAYS)).isoformat()
+        after_last = (date.fromisoformat(last) + timedelta(days=1)).isoformat()
+        return min(end, today.isoformat(), max(after_last, settled))
+
+    def _record(self, ticker, start, end, cov):
+        end = self._covered_end(ticker, end)
+        if cov is not None:
+            start, end = min(start, cov[0]), max(end, cov[1])
+        self._conn.execute(
+            "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?)", (ticker, start, end))
+
+    def refresh(self, ticker, start, end):
+        """Fetch whatever part of [start, end) is not stored yet"""
+        with self._lock:
+            ranges, cov = self._missing_ranges(ticker, start, end)
+            if not ranges:
+                self.hits += 1
+                return
+            self.misses += 1
+            fetched = [self.provider.fetch(ticker, s, e) for s, e in ranges]
+            with self._conn:
+                for frame in fetched:
+                    if len(frame):
+                        self._append(ticker, frame)
+                # An empty answer for a ticker we have never seen is most
+                # likely a bad symbol; don't remember it as covered.
+                if self._has_rows(ticker):
+                    self._record(ticker, start, end, cov)
+
+    def refresh_many(self, tickers, start, end):
+        """Batch refresh: tickers missing the same date range share one
+        provider call. Returns {ticker: exception} for failed groups."""
+        errors = {}
+        with self._lock:
+            groups = {}
+            plans = {}
+            for t in tickers:
+                ranges, cov = self._missing_ranges(t, start, end)
+                plans[t] = cov
+                if not ranges:
+                    self.hits += 1
+                    continue
+                self.misses += 1
+                for r in ranges:
+                    groups.setdefault(r, []).append(t)
+            fetched = set()
+            for (s, e), group in groups.items():
+                try:
+                    frames = self.provider.fetch_many(group, s, e)
+                except Exception as exc:
+                    for t in group:
+                        errors[t] = exc
+                    continue
+                with self._conn:
+                    for t in group:
+                        frame = frames.get(t)
+                        if frame is not None and len(frame):
+                            self._append(t, frame)
+                fetched.update(group)
+            with self._conn:
+                for t in fetched:
+                    if t not in errors and self._has_rows(t):
+                        self._record(t, start, end, plans[t])
+        return errors
+
+    def read(self, ticker, start, end):
+        """Return stored bars for start <= Date < end"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, open, high, low, close, volume FROM prices "
+                "WHERE ticker = ? AND date >= ? AND date < ? ORDER BY date",
+                (ticker, start, end)).fetchall()
+        price = pd.DataFrame(rows, columns=PRICE_COLUMNS)
+        price['Date'] = pd.to_datetime(price['Date'])
+        return price
+
+    def _serve_stale(self, ticker):
+        """True if a failed refresh can fall back to the stored rows"""
+        with self._lock:
+            if not self._has_rows(ticker):
+                return False
+            self.stale += 1
+            return True
+
+    def get(self, ticker, start, end):
+        """Read-through access: refresh missing dates, then read from disk.
+        If the provider is down, whatever is stored is served."""
+        try:
+            self.refresh(ticker, start, end)
+        except Exception:
+            if not self._serve_stale(ticker):
+                raise
+        return self.read(ticker, start, end)
+
+    def get_many(self, tickers, start, end):
+        """Batch read-through; failed tickers with no stored rows map to the
+        raised exception"""
+        errors = self.refresh_many(tickers, start, end)
+        return {t: errors[t] if t in errors and not self._serve_stale(t) else self.read(t, start, end)
+                for t in tickers}
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "rows_fetched": self.rows_fetched,
+                "stale": self.stale}
+
+
+_default_store = None
+
+
+def get_default_store():
+    """Process-wide store used by predict_stock when none is passed in"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+        if os.environ.get('STOCK_PRICE_PANEL'):
+            # Serve from the shared panel; only tickers outside it are fetched
+            from panel import PanelStore, SharedPanel
+            _default_store = PanelStore(SharedPanel(os.environ['STOCK_PRICE_PANEL']), fallback=_default_store)
+        register_collector(lambda: {f"stock_price_store_{k}": v for k, v in _default_store.stats().items()})
+    return _default_store
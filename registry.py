@@ -0,0 +1,114 @@
+# registry.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from metrics import register_collector
+from models import SimpleLinearRegression
+
+
+def data_fingerprint(X, y, features, train_cutoff):
+    """Hash of everything a fit depends on; changes whenever prices or news do"""
+    h = hashlib.sha1()
+    h.update(json.dumps([list(features), str(train_cutoff)]).encode())
+    h.update(np.ascontiguousarray(X, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """Fitted coefficients per ticker, kept in memory and as JSON on disk.
+
+    An entry is only returned when its fingerprint matches the training
+    data of the current request, so new prices or headlines invalidate it
+    without any explicit expiry.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get(
+            'STOCK_MODEL_DIR', os.path.join(tempfile.gettempdir(), 'stock_models'))
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker):
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in ticker)
+        return os.path.join(self.directory, safe + ".json")
+
+    def _read(self, ticker):
+        entry = self._memory.get(ticker)
+        if entry is not None:
+            return entry
+        t0 = time.perf_counter()
+        try:
+            with open(self._path(ticker)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        finally:
+            self.load_seconds += time.perf_counter() - t0
+            self.loads += 1
+        self._memory[ticker] = entry
+        return entry
+
+    def load(self, ticker, fingerprint):
+        """Return a fitted model for this data, or None if it must be refit"""
+        with self._lock:
+            entry = self._read(ticker)
+            if entry is None or entry.get("fingerprint") != fingerprint:
+                self.misses += 1
+                return None
+            self.hits += 1
+        model = SimpleLinearRegression()
+        model.intercept_ = float(entry["intercept"])
+        model.coef_ = np.array(entry["coef"], dtype=float)
+        return model
+
+    def save(self, ticker, model, features, train_cutoff, fingerprint):
+        entry = {
+            "ticker": ticker,
+            "intercept": float(model.intercept_),
+            "coef": [float(c) for c in model.coef_],
+            "features": list(features),
+            "train_cutoff": str(train_cutoff),
+            "fingerprint": fingerprint,
+            "fitted_at": time.time(),
+        }
+        path = self._path(ticker)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._memory[ticker] = entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "disk_loads": self.loads,
+            "avg_load_ms": 1000.0 * self.load_seconds / self.loads if self.loads else None,
+        }
+
+
+_default_registry = None
+
+
+def get_default_registry():
+    """Process-wide registry used by predict_stock when none is passed in"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+        register_collector(lambda: {f"stock_model_registry_{k}": v for k, v in _default_registry.stats().items()})
+    return _default_registry
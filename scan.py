@@ -0,0 +1,178 @@
+# scan.py
+"""Overnight universe scanner.
+
+    python scan.py universe.txt -o predictions.jsonl --workers 8 --rate 2
+
+Reads one symbol per line (blank lines and '#' comments ignored; for CSV
+files the first column is used), predicts them in batches on a process
+pool and appends one JSON line per ticker as soon as its batch finishes.
+Re-running with --resume skips tickers already present in the output.
+
+The workers share one set of provider rate limits (fetch.SharedTokenBucket
+files in a directory handed to every worker), so Yahoo sees the same
+2 req/s however many workers there are.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+
+
+class RateLimiter:
+    """Allow at most `rate` acquisitions per second (token bucket, burst 1)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def read_universe(path):
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            symbol = line.split(',', 1)[0].strip().strip('"')
+            if symbol and symbol.lower() not in ('symbol', 'ticker'):
+                tickers.append(symbol)
+    return list(dict.fromkeys(tickers))
+
+
+def completed_tickers(path, retry_errors=False):
+    """Tickers already written to a previous (possibly interrupted) run"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Partial last line from an interrupted run
+                continue
+            if retry_errors and 'error' in row:
+                continue
+            done.add(row.get('input', row.get('ticker')))
+    return done
+
+
+def _predict_batch(batch):
+    from app import normalize_ticker, predict_many
+    results = predict_many(batch)
+    rows = []
+    for symbol in batch:
+        result = results.get(normalize_ticker(symbol), {"error": "missing from batch"})
+        result.pop("traceback", None)
+        rows.append(dict(result, input=symbol))
+    return rows
+
+
+def _share_fetch_limits(directory):
+    """Pool initializer: point the worker's fetcher at the shared buckets"""
+    os.environ['STOCK_FETCH_SHARED_DIR'] = directory
+
+
+def write_parquet(jsonl_path, parquet_path):
+    """Scalar fields of every row as one Parquet table (needs pyarrow)"""
+    import pandas as pd
+    rows = []
+    with open(jsonl_path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            rows.append({k: v for k, v in row.items() if not isinstance(v, (list, dict))})
+    pd.DataFrame(rows).to_parquet(parquet_path, index=False)
+
+
+def scan(tickers, output, workers=None, batch_size=10, rate=None, resume=False,
+         retry_errors=False, log=sys.stderr):
+    """Predict `tickers`, appending JSON lines to `output`. Returns rows written."""
+    if resume:
+        done = completed_tickers(output, retry_errors)
+        tickers = [t for t in tickers if t not in done]
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    limiter = RateLimiter(rate)
+    written = 0
+    t0 = time.monotonic()
+    shared = os.environ.get('STOCK_FETCH_SHARED_DIR')
+
+    with (nullcontext(shared) if shared else tempfile.TemporaryDirectory(prefix="stock-fetch-")) as shared, \
+            open(output, 'a' if resume else 'w') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_share_fetch_limits, initargs=(shared,)) as pool:
+        pending = set()
+        queue = iter(batches)
+        exhausted = False
+        while pending or not exhausted:
+            # Keep a couple of batches per worker queued; each submission is
+            # one provider download, so it goes through the rate limiter.
+            while not exhausted and len(pending) < workers * 2:
+                batch = next(queue, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                limiter.acquire()
+                future = pool.submit(_predict_batch, batch)
+                future.batch = batch
+                pending.add(future)
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    rows = [{"input": t, "error": f"Worker failed: {str(e)}"} for t in future.batch]
+                for row in rows:
+                    out.write(json.dumps(row) + "\n")
+                out.flush()
+                written += len(rows)
+                if log:
+                    elapsed = time.monotonic() - t0
+                    print(f"{written}/{len(tickers)} done ({written / elapsed:.1f}/s)", file=log)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict a universe of tickers in parallel")
+    parser.add_argument("universe", help="file with one ticker per line")
+    parser.add_argument("-o", "--output", default="predictions.jsonl", help="JSONL output path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=10, help="tickers per grouped download")
+    parser.add_argument("--rate", type=float, default=2.0, help="max provider batches per second (0 = unlimited)")
+    parser.add_argument("--resume", action="store_true", help="skip tickers already in the output")
+    parser.add_argument("--retry-errors", action="store_true", help="with --resume, redo tickers that failed")
+    parser.add_argument("--parquet", help="also write scalar fields to this Parquet file at the end")
+    args = parser.parse_args(argv)
+    if args.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--parquet needs pyarrow (pip install pyarrow)")
+
+    tickers = read_universe(args.universe)
+    scan(tickers, args.output, args.workers, args.batch_size, args.rate, args.resume, args.retry_errors)
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# scheduler.py
+"""Precompute predictions after the NSE close.
+
+    python scheduler.py watchlist.txt            # run after every close
+    python scheduler.py watchlist.txt --once     # precompute now and exit
+
+Yesterday's prediction does not change until the next trading day, so
+there is no need to recompute it on every visit. After each close
+(PRECOMPUTE_AT, IST, Monday to Friday) the scheduler refreshes the
+watchlist's prices and news, refits, and writes every result to the
+PredictionStore. cached_predict_stock and stream_predict_stock look there
+first, so web.py, api/predict.py and asgi.py serve watchlist tickers
+without computing anything. Every other ticker is still computed on demand.
+
+Entries expire a little after the next scheduled run, so a scheduler that
+stops running falls back to on-demand computation. Set STOCK_WATCHLIST
+to run the same loop on a daemon thread inside a web worker.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+from cache import FileBackend
+from metrics import register_collector
+
+NSE_TZ = ZoneInfo("Asia/Kolkata")
+# The market closes at 15:30 IST; leave the data providers time to publish
+# the final bars
+PRECOMPUTE_AT = dtime(16, 15)
+# How long an entry outlives the run that should have replaced it
+GRACE = 3 * 3600
+
+
+def next_run(now=None, at=PRECOMPUTE_AT):
+    """First weekday `at` (IST) strictly after `now` (an aware datetime).
+
+    Exchange holidays are not skipped; a run on one recomputes the same
+    predictions.
+    """
+    now = (now or datetime.now(NSE_TZ)).astimezone(NSE_TZ)
+    run = now.replace(hour=at.hour, minute=at.minute, second=0, microsecond=0)
+    if run <= now:
+        run += timedelta(days=1)
+    while run.weekday() >= 5:
+        run += timedelta(days=1)
+    return run
+
+
+def session_date(now=None, at=PRECOMPUTE_AT):
+    """The latest weekday whose `at` (IST) is not after `now`: the session
+    the current precomputed predictions are made from"""
+    now = (now or datetime.now(NSE_TZ)).astimezone(NSE_TZ)
+    day = now.date()
+    if now.time() < at:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+class PredictionStore:
+    """Precomputed responses keyed like the response cache plus the session
+    they were made from, in a directory every worker (and the scheduler
+    process) can see. Readers ask for the current session, so an entry is
+    never served once a newer close has passed."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get(
+            'STOCK_PREDICTION_DIR', os.path.join(tempfile.gettempdir(), 'stock_predictions'))
+        self.backend = FileBackend(self.directory)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, key, session=None):
+        value = self.backend.get(_session_key(key, session))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, result, ttl, session=None):
+        self.backend.set(_session_key(key, session), result, ttl)
+        self.writes += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+
+def _session_key(key, session=None):
+    return f"{key}@{(session or session_date()).isoformat()}"
+
+
+_default_store = None
+
+
+def get_prediction_store():
+    """Process-wide store read by the serving paths"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PredictionStore()
+        register_collector(lambda: {f"stock_precomputed_{k}": v for k, v in _default_store.stats().items()})
+    return _default_store
+
+
+def precompute(tickers, store=None, batch_size=50, now=None, at=PRECOMPUTE_AT, log=sys.stderr):
+    """Refresh, refit and store default-model predictions for `tickers`.
+    The window is predict_stock's default, so a stored entry is exactly what
+    the on-demand path would return. Returns the number of results stored;
+    errors are logged, not stored."""
+    from app import normalize_ticker, predict_many, result_cache_key
+    from news import get_default_news_service
+
+    store = store or get_prediction_store()
+    now = now or datetime.now(NSE_TZ)
+    ttl = (next_run(now, at) - now).total_seconds() + GRACE
+    session = session_date(now, at)
+    # Pick up the day's headlines even if the feeds were read recently
+    get_default_news_service().expire()
+    symbols = list(dict.fromkeys(normalize_ticker(t) for t in tickers if t))
+    stored = 0
+    for i in range(0, len(symbols), batch_size):
+        # predict_many fetches missing bars, refits changed tickers in one
+        # batched solve and predicts the rest from the registry
+        batch = predict_many(symbols[i:i + batch_size])
+        for TICKER, result in batch.items():
+            if "error" in result:
+                if log:
+                    print(f"{TICKER}: {result['error']}", file=log)
+                continue
+            result.pop("traceback", None)
+            store.put(result_cache_key(TICKER), result, ttl, session)
+            stored += 1
+    return stored
+
+
+class Scheduler:
+    """Run precompute() after every close on a daemon thread"""
+
+    def __init__(self, tickers, store=None, at=PRECOMPUTE_AT, log=sys.stderr):
+        self.tickers = list(tickers)
+        self.store = store
+        self.at = at
+        self.log = log
+        self.runs = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        t0 = time.monotonic()
+        stored = precompute(self.tickers, self.store, at=self.at, log=self.log)
+        self.runs += 1
+        self.last_run = datetime.now(NSE_TZ)
+        if self.log:
+            print(f"precomputed {stored}/{len(self.tickers)} tickers in {time.monotonic() - t0:.1f}s",
+                  file=self.log)
+        return stored
+
+    def run_forever(self, run_now=False):
+        if run_now:
+            self._safe_run()
+        while not self._stop.is_set():
+            wait_for = (next_run(at=self.at) - datetime.now(NSE_TZ)).total_seconds()
+            if self._stop.wait(max(wait_for, 0)):
+                return
+            self._safe_run()
+
+    def _safe_run(self):
+        try:
+            self.run_once()
+        except Exception as e:
+            if self.log:
+                print(f"precompute failed: {e}", file=self.log)
+
+    def start(self, run_now=False):
+        self._thread = threading.Thread(target=self.run_forever, args=(run_now,), name="precompute",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_background = None
+
+
+def start_from_env():
+    """Start the in-process scheduler if STOCK_WATCHLIST names a file"""
+    global _background
+    path = os.environ.get('STOCK_WATCHLIST')
+    if _background is None and path:
+        from scan import read_universe
+        # Fill the store right away, then follow the close
+        _background = Scheduler(read_universe(path)).start(run_now=True)
+    return _background
+
+
+def main(argv=None):
+    from scan import read_universe
+
+    parser = argparse.ArgumentParser(description="Precompute watchlist predictions after the NSE close")
+    parser.add_argument("watchlist", help="file with one ticker per line")
+    parser.add_argument("--once", action="store_true", help="precompute now and exit")
+    parser.add_argument("--now", action="store_true", help="also precompute immediately before waiting")
+    parser.add_argument("--at", default=PRECOMPUTE_AT.strftime("%H:%M"), help="run time, IST (HH:MM)")
+    args = parser.parse_args(argv)
+
+    scheduler = Scheduler(read_universe(args.watchlist), at=dtime.fromisoformat(args.at))
+    if args.once:
+        scheduler.run_once()
+        return 0
+    print(f"next run {next_run(at=scheduler.at).isoformat()}", file=sys.stderr)
+    scheduler.run_forever(run_now=args.now)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# sentiment.py
+import functools
+import json
+import os
+import re
+
+import numpy as np
+
+# Positive words
+POSITIVE_WORDS = ['bullish', 'rise', 'up', 'gain', 'profit', 'growth', 'strong',
+                  'buy', 'positive', 'surge', 'rally', 'boom', 'success', 'win',
+                  'beat', 'outperform', 'soar', 'jump', 'climb', 'advance']
+
+# Negative words
+NEGATIVE_WORDS = ['bearish', 'fall', 'down', 'loss', 'decline', 'weak', 'sell',
+                  'negative', 'drop', 'crash', 'bust', 'fail', 'lose', 'miss',
+                  'underperform', 'plunge', 'slide', 'dip', 'retreat', 'worry']
+
+# Inflections accepted after a lexicon word ("gain" -> "gains", "gained", ...)
+_SUFFIXES = ("", "s", "es", "d", "ed", "ing")
+
+# Past forms the suffix rules cannot produce
+_IRREGULAR = {'rise': ('rose', 'risen'), 'win': ('won',), 'buy': ('bought',),
+              'fall': ('fell', 'fallen'), 'sell': ('sold',), 'lose': ('lost',),
+              'beat': ('beaten',), 'slide': ('slid',)}
+
+_VOWELS = set("aeiou")
+
+
+def _inflections(word):
+    """Surface forms of one lexicon word: the plain suffixes plus the
+    spelling rules for e-drop ("rising"), consonant doubling ("dropped")
+    and y -> i ("rallies"), and the irregular past forms"""
+    forms = [word + suffix for suffix in _SUFFIXES]
+    if word.endswith("e"):
+        forms.append(word[:-1] + "ing")
+    elif word.endswith("y") and len(word) > 2 and word[-2] not in _VOWELS:
+        forms += [word[:-1] + "ies", word[:-1] + "ied"]
+    elif (len(word) >= 3 and word[-1] not in _VOWELS and word[-1] not in "wxy"
+          and word[-2] in _VOWELS and word[-3] not in _VOWELS
+          and sum(1 for c in word if c in _VOWELS) == 1):
+        # Single-syllable consonant-vowel-consonant: dip -> dipped, dipping
+        forms += [word + word[-1] + "ed", word + word[-1] + "ing"]
+    forms.extend(_IRREGULAR.get(word, ()))
+    return forms
+
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+# Lightweight sentiment analyzer (replaces NLTK)
+def simple_sentiment(text):
+    """Simple rule-based sentiment analyzer - returns score between -1 and 1"""
+    if not text:
+        return 0.0
+
+    text_lower = text.lower()
+
+    pos_count = sum(1 for word in POSITIVE_WORDS if word in text_lower)
+    neg_count = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+
+    # Normalize to -1 to 1 range
+    total = pos_count + neg_count
+    if total == 0:
+        return 0.0
+    return (pos_count - neg_count) / max(total, 1)
+
+
+def load_lexicon(path=None):
+    """Return {word: weight}. Positive weights are bullish, negative bearish.
+
+    Reads a JSON object from `path` (or $STOCK_SENTIMENT_LEXICON) when given,
+    otherwise the built-in word lists with unit weights.
+    """
+    path = path or os.environ.get('STOCK_SENTIMENT_LEXICON')
+    if path:
+        with open(path) as f:
+            return {str(w).lower(): float(v) for w, v in json.load(f).items()}
+    lexicon = {w: 1.0 for w in POSITIVE_WORDS}
+    lexicon.update({w: -1.0 for w in NEGATIVE_WORDS})
+    return lexicon
+
+
+class SentimentScorer:
+    """Scores headlines with one precompiled tokenizer and a hash lookup.
+
+    Matching is on whole words (plus regular and irregular inflections), so "up" no longer
+    fires inside "update". A headline's score is (pos - neg) / (pos + neg),
+    where pos and neg sum the absolute weights of the distinct lexicon
+    words it contains; with unit weights this is the simple_sentiment
+    formula. Multi-word lexicon entries are matched with a word-boundary
+    regex. Scores are memoized per headline since the shared feeds repeat
+    across tickers.
+    """
+
+    def __init__(self, lexicon=None, cache_size=100000):
+        self.lexicon = dict(lexicon if lexicon is not None else load_lexicon())
+        # Every accepted surface form -> lexicon word
+        self._forms = {}
+        phrases = []
+        for word in sorted(self.lexicon, key=len):
+            if " " in word:
+                phrases.append(word)
+                continue
+            for form in _inflections(word):
+                self._forms.setdefault(form, word)
+        self._phrases = None
+        if phrases:
+            self._phrases = re.compile(
+                r"\b(" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b")
+        self._cached = functools.lru_cache(maxsize=cache_size)(self._score)
+
+    def _score(self, text):
+        text = text.lower()
+        forms = self._forms
+        matched = {forms[t] for t in _TOKEN.findall(text) if t in forms}
+        if self._phrases is not None:
+            matched.update(self._phrases.findall(text))
+        if not matched:
+            return 0.0
+        pos = sum(self.lexicon[w] for w in matched if self.lexicon[w] > 0)
+        neg = -sum(self.lexicon[w] for w in matched if self.lexicon[w] < 0)
+        total = pos + neg
+        if total == 0:
+            return 0.0
+        return (pos - neg) / total
+
+    def score(self, text):
+        """Score one headline in [-1, 1]"""
+        if not text:
+            return 0.0
+        return self._cached(text)
+
+    def score_many(self, texts):
+        """Score a sequence of headlines; returns a float64 array"""
+        texts = list(texts)
+        unique = {}
+        for t in texts:
+            if t and t not in unique:
+                unique[t] = self._cached(t)
+        return np.fromiter((unique[t] if t else 0.0 for t in texts), dtype=float, count=len(texts))
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+
+_default_scorer = None
+
+
+def get_default_scorer():
+    """Process-wide scorer built from the default lexicon"""
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = SentimentScorer()
+    return _default_scorer
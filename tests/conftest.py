@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the process-wide stores away from the real ones
+_scratch = tempfile.mkdtemp(prefix="stock-tests-")
+for name, leaf in [("STOCK_PRICE_STORE", "prices.sqlite"), ("STOCK_NEWS_STORE", "news.npz"),
+                   ("STOCK_PREDICTION_DIR", "predictions"), ("STOCK_MODEL_DIR", "models")]:
+    os.environ[name] = os.path.join(_scratch, leaf)
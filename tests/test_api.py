@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import app
+import lookup
+from api.predict import handler
+from cache import MemoryBackend, ResultCache
+from scheduler import PredictionStore
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    cache = ResultCache(CountingBackend())
+    predictions = PredictionStore(str(tmp_path))
+    monkeypatch.setattr(lookup, "_result_cache", cache)
+    monkeypatch.setattr(lookup, "get_prediction_store", lambda: predictions)
+    monkeypatch.setattr(app, "get_prediction_store", lambda: predictions)
+    computed = []
+
+    def predict_stock_events(ticker, model="ols", horizons=None, **kwargs):
+        computed.append(ticker)
+        yield "price", {"ticker": ticker, "current_price": 1.0, "current_time": "2025-11-07 00:00:00"}
+        yield "prediction", dict.fromkeys(lookup.PREDICTION_KEYS[len(lookup.PRICE_KEYS):], 1.0)
+        yield "backtest", {"comparison_rmse": 1.0}
+
+    def predict_stock(ticker, model="ols", horizons=None, **kwargs):
+        result = {}
+        for _, partial in predict_stock_events(ticker):
+            result.update(partial)
+        return result
+
+    monkeypatch.setattr(app, "predict_stock", predict_stock)
+    monkeypatch.setattr(app, "predict_stock_events", predict_stock_events)
+    return cache, predictions, computed
+
+
+def post(body):
+    return handler({"method": "POST", "body": json.dumps(body), "headers": {}})
+
+
+@pytest.mark.parametrize("body", [{"stock": "TCS"}, {"stock": "TCS", "stream": "ndjson"}])
+def test_miss_reads_each_store_once(stores, body):
+    cache, predictions, computed = stores
+    assert post(body)["statusCode"] == 200
+    assert computed == ["TCS.NS"]
+    assert predictions.misses == 1
+    assert cache.backend.reads == 1
+    assert cache.misses == 1 and cache.hits == 0
+
+    # The computed response was cached: the next request is a hit
+    assert post(body)["statusCode"] == 200
+    assert computed == ["TCS.NS"]
+    assert cache.hits == 1
+
+
+def test_stored_answer_does_not_load_the_data_stack(tmp_path):
+    # A fresh interpreter: this one has pandas loaded already
+    script = textwrap.dedent("""
+        import json, sys
+        from scheduler import get_prediction_store
+        get_prediction_store().put("predict:TCS.NS", {"ticker": "TCS.NS", "predicted_next": 1.0}, 60)
+        from api.predict import handler
+        response = handler({"method": "POST", "body": json.dumps({"stock": "TCS"}), "headers": {}})
+        heavy = [m for m in ("app", "pandas", "numpy", "yfinance", "feedparser") if m in sys.modules]
+        print(json.dumps([response["statusCode"], json.loads(response["body"]), heavy]))
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, STOCK_PREDICTION_DIR=str(tmp_path), PYTHONPATH=root)
+    out = subprocess.run([sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True,
+                         check=True).stdout
+    status, body, heavy = json.loads(out)
+    assert status == 200
+    assert body == {"ticker": "TCS.NS", "predicted_next": 1.0}
+    assert heavy == []
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi
+from asgi import PredictApp
+from cache import MemoryBackend, ResultCache
+from scheduler import PredictionStore
+
+
+@pytest.fixture
+def computed(tmp_path, monkeypatch):
+    """Fake predict_stock_async that blocks until `release` is set"""
+    state = {"calls": [], "release": None}
+    predictions = PredictionStore(str(tmp_path))
+    monkeypatch.setattr(asgi, "get_prediction_store", lambda: predictions)
+
+    async def predict_stock_async(stock, executor=None, model="ols", horizons=None):
+        state["calls"].append(stock)
+        await state["release"].wait()
+        return {"ticker": stock, "predicted_next": 1.0}
+
+    monkeypatch.setattr(asgi, "predict_stock_async", predict_stock_async)
+    return state
+
+
+async def request(server, body):
+    """POST `body` through the ASGI interface; returns (status, headers, json)"""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode()}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/predict", "headers": []}
+    await server(scope, receive, send)
+    start, body = sent[0], b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], dict(start["headers"]), json.loads(body)
+
+
+async def settle(server, active):
+    while server.active < active:
+        await asyncio.sleep(0)
+
+
+def test_full_queue_answers_503_with_retry_after(computed):
+    async def scenario():
+        computed["release"] = asyncio.Event()
+        server = PredictApp(max_concurrency=1, max_queue=1, retry_after=7, cache=ResultCache(MemoryBackend()))
+        # One running, one waiting for the semaphore
+        running = [asyncio.ensure_future(request(server, {"stock": s})) for s in ("TCS", "INFY")]
+        await settle(server, 2)
+        status, headers, payload = await request(server, {"stock": "WIPRO"})
+        assert status == 503
+        assert headers[b"retry-after"] == b"7"
+        assert "error" in payload
+        assert server.rejected == 1
+        computed["release"].set()
+        return await asyncio.gather(*running), server
+
+    done, server = asyncio.run(scenario())
+    assert [status for status, _, _ in done] == [200, 200]
+    assert computed["calls"] == ["TCS", "INFY"]
+    assert server.active == 0
+
+
+def test_identical_requests_in_flight_share_one_prediction(computed):
+    async def scenario():
+        computed["release"] = asyncio.Event()
+        cache = ResultCache(MemoryBackend())
+        server = PredictApp(max_concurrency=4, max_queue=0, cache=cache)
+        pending = [asyncio.ensure_future(request(server, {"stock": "tcs"})) for _ in range(3)]
+        await settle(server, 3)
+        while cache.coalesced < 2:
+            await asyncio.sleep(0)
+        computed["release"].set()
+        done = await asyncio.gather(*pending)
+        # Later requests are answered from the cache
+        done.append(await request(server, {"stock": "TCS"}))
+        return done, cache
+
+    done, cache = asyncio.run(scenario())
+    assert computed["calls"] == ["TCS"]
+    assert [status for status, _, _ in done] == [200] * 4
+    assert all(payload == {"ticker": "TCS", "predicted_next": 1.0} for _, _, payload in done)
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 2, 1)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import fold_metrics, make_cutoffs, run_backtest
+from models import SimpleLinearRegression
+
+
+def synthetic(n=160, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2024-01-01", periods=n).values.astype("datetime64[D]")
+    X = rng.normal(size=(n, 3)) + np.linspace(0, 2, n)[:, None]
+    y = 100 + X @ np.array([3.0, -1.5, 0.5]) + rng.normal(scale=0.5, size=n)
+    return X, y, dates
+
+
+def naive_folds(X, y, dates, cutoffs, horizon_days, window=None):
+    """Refit from scratch at every cutoff"""
+    folds = []
+    for cutoff in cutoffs:
+        cutoff = np.datetime64(pd.Timestamp(cutoff), "D")
+        upto = int(np.sum(dates <= cutoff))
+        test = (dates > cutoff) & (dates <= cutoff + np.timedelta64(horizon_days, "D"))
+        train = slice(max(0, upto - window) if window else 0, upto)
+        metrics = (None, None, None)
+        if upto and test.any():
+            model = SimpleLinearRegression().fit(X[train], y[train])
+            metrics = fold_metrics(model.predict(X[test]), y[test])
+        folds.append((str(cutoff), upto - train.start, int(test.sum()), metrics))
+    return folds
+
+
+def assert_folds(folds, expected):
+    assert len(folds) == len(expected)
+    for fold, (cutoff, train_rows, test_rows, metrics) in zip(folds, expected):
+        assert (fold["cutoff"], fold["train_rows"], fold["test_rows"]) == (cutoff, train_rows, test_rows)
+        got = (fold["rmse"], fold["mape"], fold["directional_accuracy"])
+        for value, want in zip(got, metrics):
+            if want is None:
+                assert value is None
+            else:
+                assert value == pytest.approx(want, rel=1e-6, abs=1e-9)
+
+
+# One chunk, or several (run on a process pool) per ticker
+@pytest.mark.parametrize("workers", [1, 5])
+@pytest.mark.parametrize("mode,window", [("expanding", None), ("sliding", 40)])
+def test_run_backtest_matches_refit_at_every_cutoff(workers, mode, window):
+    matrices = {"A.NS": synthetic(seed=1), "B.NS": synthetic(n=120, seed=2)}
+    # The first cutoff precedes every row and the last leaves no test block.
+    # Every other fold has more rows than coefficients: an underdetermined
+    # fit has no unique answer to compare.
+    cutoffs = make_cutoffs("2023-12-20", "2024-08-30", step_days=21)
+    results = run_backtest(matrices, cutoffs, horizon_days=20, mode=mode, window=window, workers=workers)
+    assert list(results) == ["A.NS", "B.NS"]
+    for ticker, (X, y, dates) in matrices.items():
+        assert_folds(results[ticker], naive_folds(X, y, dates, cutoffs, 20, window))
+    assert results["A.NS"][0]["rmse"] is None and results["A.NS"][-1]["test_rows"] == 0
+
+
+def test_run_backtest_rejects_unknown_modes():
+    matrices = {"A.NS": synthetic()}
+    with pytest.raises(ValueError):
+        run_backtest(matrices, ["2024-03-01"], mode="anchored", workers=1)
+    with pytest.raises(ValueError):
+        run_backtest(matrices, ["2024-03-01"], mode="sliding", workers=1)
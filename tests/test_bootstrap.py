@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from app import FEATURES, TRAIN_CUTOFF
+from benchmarks.offline import load_prices
+from features import FeaturePipeline
+from models import ResidualBootstrap, SimpleLinearRegression
+
+
+def training_data(ticker="TCS.NS"):
+    price = load_prices()[ticker]
+    news = price[["Date"]].assign(DateOnly=price["Date"].dt.date, Sentiment=np.sin(np.arange(len(price))))
+    fs = FeaturePipeline(FEATURES).build(None, price, news[["DateOnly", "Sentiment"]])
+    X, close = fs.matrix(FEATURES), fs["Close"]
+    train = fs.dates[:-1] <= np.datetime64(TRAIN_CUTOFF)
+    return X[:-1][train], close[1:][train], X[-30:]
+
+
+def refit_loop(model, X, y, rows, resamples, chunk, seed, level):
+    """Explicit residual bootstrap: one SimpleLinearRegression refit per
+    resample, with the same random draws as ResidualBootstrap"""
+    n, k = len(X), X.shape[1] + 1
+    fitted = model.predict(X)
+    resid = y - fitted
+    resid = (resid - resid.mean()) * np.sqrt(n / (n - k))
+    idx = np.concatenate([np.random.default_rng([seed, s]).integers(0, n, (min(chunk, resamples - s), n))
+                          for s in range(0, resamples, chunk)])
+    preds = np.array([SimpleLinearRegression().fit(X, fitted + resid[i]).predict(rows) for i in idx])  # (B, rows)
+    preds += resid[np.random.default_rng(seed).integers(0, n, (len(rows), resamples))].T
+    return np.quantile(preds, [(1 - level) / 2, (1 + level) / 2], axis=0)
+
+
+@pytest.mark.parametrize("ticker", ["TCS.NS", "RELIANCE.NS"])
+def test_bands_match_refit_loop(ticker):
+    X, y, rows = training_data(ticker)
+    model = SimpleLinearRegression().fit(X, y)
+    boot = ResidualBootstrap(resamples=600, seed=3, chunk=250).fit(model, X, y)
+    assert boot.resamples_ == 600
+    lower, upper = boot.interval(rows, level=0.9)
+    ref_lower, ref_upper = refit_loop(model, X, y, rows, 600, 250, 3, 0.9)
+    np.testing.assert_allclose(lower, ref_lower, rtol=1e-6)
+    np.testing.assert_allclose(upper, ref_upper, rtol=1e-6)
+    point = model.predict(rows)
+    assert (lower < point).all() and (point < upper).all()
+
+
+def test_bands_cover_fresh_draws():
+    # Homoskedastic linear data: the 90% band should hold about 90% of new outcomes
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 3))
+    beta = np.array([1.5, -2.0, 0.5])
+    y = 10 + X @ beta + rng.normal(scale=2.0, size=400)
+    model = SimpleLinearRegression().fit(X, y)
+    boot = ResidualBootstrap(resamples=2000, seed=1).fit(model, X, y)
+    rows = rng.normal(size=(2000, 3))
+    lower, upper = boot.interval(rows, level=0.9)
+    outcome = 10 + rows @ beta + rng.normal(scale=2.0, size=2000)
+    assert 0.87 < np.mean((lower <= outcome) & (outcome <= upper)) < 0.93
+
+
+def test_same_seed_same_bands():
+    X, y, rows = training_data()
+    model = SimpleLinearRegression().fit(X, y)
+    first = ResidualBootstrap(300, seed=5).fit(model, X, y).interval(rows)
+    second = ResidualBootstrap(300, seed=5).fit(model, X, y).interval(rows)
+    np.testing.assert_array_equal(first, second)
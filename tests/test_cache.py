@@ -0,0 +1,120 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import FileBackend, MemoryBackend, ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: now.t))
+    return now
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_callers(n, call):
+    results = [None] * n
+    errors = [None] * n
+
+    def caller(i):
+        try:
+            results[i] = call()
+        except Exception as e:
+            errors[i] = e
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_misses_share_one_computation():
+    results_cache = ResultCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    n = 8
+    threads, results, errors = run_callers(n, lambda: results_cache.get_or_compute("k", compute))
+    # Everyone but the leader is waiting on its flight
+    wait_for(lambda: results_cache.coalesced == n - 1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * n
+    assert errors == [None] * n
+    assert results_cache.stats() == {"hits": 0, "misses": 1, "coalesced": n - 1}
+    assert results_cache.get_or_compute("k", compute) == {"value": 42}
+    assert results_cache.hits == 1
+
+
+def test_errors_reach_waiters_but_are_not_cached():
+    results_cache = ResultCache()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    threads, results, errors = run_callers(4, lambda: results_cache.get_or_compute("k", fail))
+    wait_for(lambda: results_cache.coalesced == 3)
+    release.set()
+    for t in threads:
+        t.join()
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert results_cache.backend.get("k") is None
+
+    # Error results are returned, not stored, so the next call recomputes
+    assert results_cache.get_or_compute("k", lambda: {"error": "no data"}) == {"error": "no data"}
+    assert results_cache.backend.get("k") is None
+    assert results_cache.get_or_compute("k", lambda: {"value": 1}) == {"value": 1}
+    assert results_cache.backend.get("k") == {"value": 1}
+
+
+def test_memory_backend_expiry_and_lru(clock):
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=10)
+    backend.set("b", 2, ttl=10)
+    assert backend.get("a") == 1          # a is now the most recently used
+    backend.set("c", 3, ttl=10)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+    clock.t += 10
+    assert backend.get("a") is None
+    assert backend.get("c") is None
+
+
+def test_result_cache_recomputes_after_ttl(clock):
+    results_cache = ResultCache(MemoryBackend(), ttl=60)
+    assert results_cache.get_or_compute("k", lambda: 1) == 1
+    clock.t += 59
+    assert results_cache.get_or_compute("k", lambda: 2) == 1
+    clock.t += 1
+    assert results_cache.get_or_compute("k", lambda: 2) == 2
+
+
+def test_file_backend_expiry_across_instances(tmp_path, clock):
+    writer = FileBackend(str(tmp_path))
+    reader = FileBackend(str(tmp_path))
+    writer.set("predict:TCS.NS", {"value": 1}, ttl=30)
+    assert reader.get("predict:TCS.NS") == {"value": 1}
+    clock.t += 30
+    assert reader.get("predict:TCS.NS") is None
+    # The expired file is removed for every instance
+    assert list(tmp_path.iterdir()) == []
+    assert writer.get("predict:TCS.NS") is None
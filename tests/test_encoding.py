@@ -0,0 +1,103 @@
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+import encoding
+from encoding import decode_columnar, encode_columnar, encode_response, negotiate
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # negotiate only checks whether brotli could be imported
+    monkeypatch.setattr(encoding, "brotli", object())
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, "identity"),
+    ("", "identity"),
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0, *", "identity"),
+    ("gzip;q=0", "identity"),
+    ("*;q=0", "identity"),
+    ("identity", "identity"),
+    ("GZIP;Q=0.5", "gzip"),
+    ("gzip;q=abc", "identity"),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("br, gzip", "br"),
+    ("gzip, br", "br"),
+    ("br;q=0.1, gzip;q=1", "gzip"),
+    ("br;q=1, gzip;q=0.5", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0, *", "gzip"),
+    ("gzip;q=0, *", "br"),
+    ("*;q=0.5, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip;q=0", "identity"),
+])
+def test_negotiate_with_brotli(with_brotli, header, expected):
+    assert negotiate(header) == expected
+
+
+def test_br_ignored_without_brotli(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", None)
+    assert negotiate("br") == "identity"
+    assert negotiate("br;q=1, gzip;q=0.1") == "gzip"
+
+
+def sample_result():
+    dates = ["2025-10-31", "2025-11-03", "2025-11-04", "2025-11-07"]
+    return {
+        "ticker": "TCS.NS",
+        "predicted_next": 3021.5,
+        "hist_dates": [d + " 00:00:00" for d in dates],
+        "hist_close": [3010.25, 3015.5, 2999.75, 3020.0],
+        "month_pred_dates": dates,
+        "backtest_dates": dates,
+        "month_pred_values": [3011.1, None, 3001.9, 3018.4],
+        "backtest_actuals": [3010.25, 3015.5, 2999.75, 3020.0],
+    }
+
+
+@pytest.mark.parametrize("delta", [False, True])
+def test_columnar_round_trip(delta):
+    result = sample_result()
+    payload = json.loads(json.dumps(encode_columnar(result, delta)))
+    assert payload["format"] == "columnar-v1"
+    key = "deltas" if delta else "offsets"
+    assert payload["month_pred_dates"] == {"base": "2025-10-31", key: [0, 3, 1, 3] if delta else [0, 3, 4, 7]}
+    # Repeated columns are sent once
+    assert payload["backtest_dates"] == {"ref": "month_pred_dates"}
+    assert payload["backtest_actuals"] == {"ref": "hist_close"}
+
+    decoded = decode_columnar(payload)
+    assert decoded["month_pred_dates"] == decoded["backtest_dates"] == result["month_pred_dates"]
+    assert decoded["hist_dates"] == result["month_pred_dates"]
+    assert decoded["month_pred_values"][1] is None
+    for field in ["hist_close", "month_pred_values", "backtest_actuals"]:
+        expected = [np.nan if v is None else v for v in result[field]]
+        got = [np.nan if v is None else v for v in decoded[field]]
+        np.testing.assert_allclose(got, np.float32(expected), rtol=0)
+    assert decoded["predicted_next"] == 3021.5
+
+
+def test_columnar_passes_errors_and_empty_series():
+    assert encode_columnar({"error": "no data"}) == {"error": "no data"}
+    decoded = decode_columnar(encode_columnar({"hist_dates": [], "hist_close": []}))
+    assert decoded == {"hist_dates": [], "hist_close": []}
+
+
+def test_encode_response_compresses_large_bodies():
+    result = sample_result()
+    body, coding = encode_response(result, accept_encoding="gzip")
+    assert coding == "identity" and json.loads(body) == result
+    result["hist_close"] = result["hist_close"] * 200
+    body, coding = encode_response(result, accept_encoding="gzip")
+    assert coding == "gzip" and json.loads(gzip.decompress(body)) == result
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app import FEATURES
+from benchmarks.offline import load_prices
+from features import FeaturePipeline
+
+ROLLING = FEATURES + ["MA5", "MA20", "Volatility20"]
+
+
+def inputs(ticker="TCS.NS"):
+    price = load_prices()[ticker].iloc[-200:].reset_index(drop=True)
+    price["Volume"] = price["Volume"].astype(float)
+    news = price[["Date"]].assign(DateOnly=price["Date"].dt.date, Sentiment=np.sin(np.arange(len(price))))
+    return price, news[["DateOnly", "Sentiment"]]
+
+
+def assert_same(fs, expected):
+    np.testing.assert_array_equal(fs.dates, expected.dates)
+    assert set(fs.columns) == set(expected.columns)
+    for name in expected.columns:
+        np.testing.assert_array_equal(fs[name], expected[name], err_msg=name)
+
+
+def full_build(price, news):
+    return FeaturePipeline(ROLLING).build("TCS.NS", price, news)
+
+
+@pytest.mark.parametrize("new_days", [1, 5, 30])
+def test_appended_days_match_full_rebuild(new_days):
+    price, news = inputs()
+    pipeline = FeaturePipeline(ROLLING)
+    pipeline.build("TCS.NS", price.iloc[:-new_days], news)
+    before = pipeline.stats()["rows_computed"]
+    fs = pipeline.build("TCS.NS", price, news)
+    assert pipeline.stats()["appends"] == 1
+    # Only the new rows and the lookback before them were computed
+    assert pipeline.stats()["rows_computed"] - before == new_days + pipeline.lookback
+    assert_same(fs, full_build(price, news))
+
+
+def test_revised_last_day_matches_full_rebuild():
+    price, news = inputs()
+    pipeline = FeaturePipeline(ROLLING)
+    pipeline.build("TCS.NS", price, news)
+    revised = price.copy()
+    revised.loc[len(revised) - 1, ["Close", "High", "Volume"]] *= [1.03, 1.03, 1.5]
+    fs = pipeline.build("TCS.NS", revised, news)
+    assert pipeline.stats()["appends"] == 1
+    assert_same(fs, full_build(revised, news))
+
+    # Fresh headlines for the last day only change the sentiment column
+    later = news.copy()
+    later.loc[len(later) - 1, "Sentiment"] = 0.75
+    fs = pipeline.build("TCS.NS", revised, later)
+    assert pipeline.stats()["appends"] == 2
+    assert_same(fs, full_build(revised, later))
+
+
+def test_revised_history_and_identical_input():
+    price, news = inputs()
+    pipeline = FeaturePipeline(ROLLING)
+    first = pipeline.build("TCS.NS", price, news)
+    assert pipeline.build("TCS.NS", price.copy(), news) is first
+    assert pipeline.stats()["hits"] == 1
+
+    # A revision (and a missing value) well inside the history
+    revised = price.copy()
+    revised.loc[150, "Close"] *= 0.9
+    revised.loc[170, "Volume"] = np.nan
+    fs = pipeline.build("TCS.NS", revised, news)
+    assert_same(fs, full_build(revised, news))
+    assert len(fs) == len(first) - 1
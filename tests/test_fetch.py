@@ -0,0 +1,198 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+
+import pandas as pd
+import pytest
+
+from benchmarks.offline import FeedServer
+from fetch import CircuitOpenError, FetchError, Fetcher, HostPolicy, SharedTokenBucket, parse_feed
+from news import NewsService
+from news_store import NewsStore
+from price_store import FrameProvider, PriceStore
+
+
+@pytest.fixture(scope="module")
+def shared_server():
+    server = FeedServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def server(shared_server):
+    shared_server.down = False
+    shared_server.fail_every, shared_server.fail_status, shared_server.retry_after = 0, 503, "0"
+    shared_server.requests = 0
+    return shared_server
+
+
+def fetcher(**policy):
+    # Record the backoff delays instead of sleeping through them
+    delays = []
+    f = Fetcher(policies={}, default=HostPolicy(rate=1000.0, burst=1000, **policy), sleep=delays.append)
+    return f, delays
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_transient_statuses(server, status):
+    server.down = True
+    server.fail_status = status
+    f, delays = fetcher(retries=2, failure_threshold=10)
+    with pytest.raises(FetchError):
+        f.get(server.url + "/yahoo.xml")
+    assert server.requests == 3
+    assert f.counts["requests"] == 3 and f.counts["retries"] == 2 and f.counts["failures"] == 1
+    assert len(delays) == 2
+
+
+def test_recovers_after_a_failed_attempt(server):
+    f, _ = fetcher(retries=3)
+    server.fail_every = 2   # the 2nd request fails, the 3rd succeeds
+    f.get(server.url + "/yahoo.xml")
+    assert f.get(server.url + "/yahoo.xml").status_code == 200
+    assert server.requests == 3 and f.counts["retries"] == 1
+
+
+def test_client_errors_are_not_retried(server):
+    f, _ = fetcher(retries=3)
+    assert f.get(server.url + "/missing.xml").status_code == 404
+    assert server.requests == 1 and f.counts["retries"] == 0
+
+
+def test_retry_after_is_honoured(server):
+    server.down = True
+    server.fail_status = 429
+    server.retry_after = "3"
+    f, delays = fetcher(retries=2, backoff=0.01, max_backoff=8.0)
+    with pytest.raises(FetchError):
+        f.get(server.url + "/yahoo.xml")
+    assert delays == [3.0, 3.0]
+
+
+def test_retry_after_is_capped_by_max_backoff(server):
+    server.down = True
+    server.retry_after = "120"
+    f, delays = fetcher(retries=1, backoff=0.01, max_backoff=2.0)
+    with pytest.raises(FetchError):
+        f.get(server.url + "/yahoo.xml")
+    assert delays == [2.0]
+
+
+def test_breaker_opens_rejects_and_recovers(server):
+    url = server.url + "/yahoo.xml"
+    host = url.split("/")[2]
+    f, _ = fetcher(retries=0, failure_threshold=2, reset_timeout=0.2)
+    server.down = True
+    for _ in range(2):
+        with pytest.raises(FetchError):
+            f.get(url)
+    assert f.breaker_states() == {host: "open"} and f.counts["breaker_opened"] == 1
+
+    # Open: rejected without reaching the server
+    with pytest.raises(CircuitOpenError):
+        f.get(url)
+    assert server.requests == 2 and f.counts["rejected"] == 1
+
+    # Half-open: a failed trial reopens it
+    time.sleep(0.25)
+    with pytest.raises(FetchError):
+        f.get(url)
+    assert server.requests == 3 and f.breaker_states() == {host: "open"}
+
+    # Half-open again: a successful trial closes it
+    time.sleep(0.25)
+    server.down = False
+    assert f.get(url).status_code == 200
+    assert f.breaker_states() == {host: "closed"}
+    assert f.get(url).status_code == 200
+
+
+def test_half_open_allows_a_single_trial():
+    f, _ = fetcher(failure_threshold=1, reset_timeout=0.0)
+    breaker = f._host("example.com").breaker
+    breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+def test_news_service_serves_stored_headlines_when_down(server):
+    f, _ = fetcher(retries=1, failure_threshold=2, reset_timeout=60)
+    news = NewsService(ttl=0, parse=partial(parse_feed, fetcher=f), store=NewsStore())
+    urls = server.feed_urls()
+    news.refresh(urls)
+    stored = len(news.store)
+    assert stored and news.failures == 0
+    before = news.store.daily(urls)
+
+    server.down = True
+    after = news.daily_sentiment(urls, None, None)
+    assert news.failures == len(urls)
+    assert len(news.store) == stored
+    assert after.days.tolist() == before.days.tolist()
+
+    # The breaker is open now: the next refresh does not reach the server
+    requests = server.requests
+    news.daily_sentiment(urls, None, None)
+    assert server.requests == requests
+    assert f.counts["rejected"] == len(urls)
+
+
+class HTTPProvider(FrameProvider):
+    """Frames behind a request to the feed server, so an outage surfaces as
+    a FetchError from the fetch layer"""
+
+    def __init__(self, frames, url, fetcher):
+        super().__init__(frames)
+        self.url = url
+        self.fetcher = fetcher
+
+    def fetch(self, ticker, start, end):
+        self.fetcher.get(self.url)
+        return super().fetch(ticker, start, end)
+
+
+def test_price_store_serves_stored_bars_when_down(server, tmp_path):
+    today = date.today()
+    dates = pd.bdate_range(today - timedelta(days=40), today - timedelta(days=1))
+    frame = pd.DataFrame({"Date": dates, "Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Volume": 1.0})
+    f, _ = fetcher(retries=1)
+    store = PriceStore(str(tmp_path / "p.sqlite"), HTTPProvider({"X.NS": frame}, server.url + "/yahoo.xml", f))
+    start, end = (today - timedelta(days=30)).isoformat(), (today + timedelta(days=1)).isoformat()
+    fresh = store.get("X.NS", start, end)
+    assert len(fresh)
+
+    server.down = True
+    stale = store.get("X.NS", start, end)
+    assert store.stale == 1
+    pd.testing.assert_frame_equal(stale, fresh)
+
+    # A ticker with nothing stored has nothing to fall back to
+    with pytest.raises(FetchError):
+        store.get("Y.NS", start, end)
+
+
+def test_shared_buckets_draw_from_one_budget(tmp_path):
+    # Two instances on one file behave like two processes
+    path = str(tmp_path / "host.bucket")
+    first, second = SharedTokenBucket(path, rate=10.0, burst=2), SharedTokenBucket(path, rate=10.0, burst=2)
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    assert second.acquire() == pytest.approx(0.1, abs=0.03)
+    # The other instance sees that token as taken too
+    assert first.acquire() == pytest.approx(0.1, abs=0.03)
+
+
+def _timed_calls(shared_dir, calls):
+    f = Fetcher(policies={"example.test": HostPolicy(rate=20.0, burst=1)}, shared_dir=shared_dir)
+    return [f.call("example.test", time.time) for _ in range(calls)]
+
+
+def test_rate_limit_is_shared_across_processes(tmp_path):
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        stamps = sorted(t for times in pool.map(_timed_calls, [str(tmp_path)] * 3, [3] * 3) for t in times)
+    # 9 calls at 20/s with a burst of 1: at least 8 intervals of 50 ms
+    assert stamps[-1] - stamps[0] >= 8 / 20 * 0.9
+    assert Fetcher(shared_dir=str(tmp_path)).shared_dir == str(tmp_path)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+
+from app import predict_stock
+from benchmarks.offline import load_prices, offline_news, offline_provider
+from intraday import IntradayBook, Quote, ReplaySource, run
+from price_store import PriceStore
+from registry import ModelRegistry
+from scheduler import NSE_TZ
+
+SESSION = "2025-11-07"
+
+
+def session_ticks(bar, ticker):
+    """Open, high, low, close of a recorded daily bar as quote ticks with
+    cumulative volume"""
+    day = datetime.fromisoformat(SESSION)
+    at = [day.replace(hour=h, minute=m, tzinfo=NSE_TZ).timestamp() for h, m in
+          [(9, 15), (11, 0), (13, 30), (15, 29)]]
+    prices = [bar["Open"], bar["High"], bar["Low"], bar["Close"]]
+    volumes = [bar["Volume"] * f for f in (0.1, 0.4, 0.7, 1.0)]
+    return [Quote(ticker, float(p), float(v), t) for p, v, t in zip(prices, volumes, at)]
+
+
+def test_replayed_session_matches_daily_prediction(tmp_path):
+    frames = load_prices()
+    store = PriceStore(str(tmp_path / "prices.sqlite"), offline_provider(frames))
+    news = offline_news()
+    registry = ModelRegistry(str(tmp_path / "models"))
+
+    book = IntradayBook()
+    assert book.track(["TCS"], session=SESSION, store=store, news=news, registry=registry) == {}
+    frame = frames["TCS.NS"]
+    bar = frame[frame["Date"] == SESSION].iloc[0]
+    stats = run(book, ReplaySource(session_ticks(bar, "TCS.NS")))
+    assert stats["ticks"] == 4
+
+    i = book.slots["TCS.NS"]
+    for column in ["Open", "High", "Low", "Close", "Volume"]:
+        assert book.live[column][i] == pytest.approx(bar[column])
+
+    # The daily path with the session's bar in the data
+    daily = predict_stock("TCS", store=store, news=news, registry=registry, forecast_end="2025-11-08")
+    assert daily["current_price"] == pytest.approx(bar["Close"])
+    snapshot = book.snapshot("TCS.NS")
+    assert snapshot["live"]
+    assert snapshot["predicted_next"] == pytest.approx(daily["predicted_next"], rel=1e-9)
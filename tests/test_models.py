@@ -0,0 +1,192 @@
+import numpy as np
+import pytest
+
+from models import (IncrementalLinearRegression, MultiHorizonRegression, RidgeRegression, SimpleLinearRegression,
+                    fit_batched, horizon_targets, ridge_path)
+
+
+def design(n, p=3, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, p))
+    y = X @ rng.normal(size=p) + 2.0 + rng.normal(scale=0.1, size=n)
+    return X, y
+
+
+def lstsq(X, y):
+    coefs = np.linalg.lstsq(np.column_stack([np.ones(len(X)), X]), y, rcond=None)[0]
+    return coefs[0], coefs[1:]
+
+
+def assert_fit(model, X, y):
+    intercept, coef = lstsq(X, y)
+    assert model.n == len(X)
+    assert model.intercept_ == pytest.approx(intercept, abs=1e-9)
+    np.testing.assert_allclose(model.coef_, coef, atol=1e-9)
+
+
+def test_incremental_add_and_remove():
+    X, y = design(40)
+    model = IncrementalLinearRegression()
+    model.partial_fit(X[:25], y[:25])
+    assert_fit(model, X[:25], y[:25])
+    model.partial_fit(X[25:], y[25:])
+    assert_fit(model, X, y)
+    model.remove(X[:10], y[:10])
+    assert_fit(model, X[10:], y[10:])
+
+
+def test_incremental_window_evicts_oldest():
+    X, y = design(30)
+    model = IncrementalLinearRegression(window=12)
+    for i in range(0, 30, 4):
+        model.partial_fit(X[i:i + 4], y[i:i + 4])
+    assert_fit(model, X[-12:], y[-12:])
+
+
+def test_incremental_window_remove_then_add():
+    X, y = design(9)
+    model = IncrementalLinearRegression(window=5)
+    model.partial_fit(X[:5], y[:5])
+    model.remove(X[2:3], y[2:3])
+    assert_fit(model, np.delete(X[:5], 2, axis=0), np.delete(y[:5], 2))
+    model.partial_fit(X[5:8], y[5:8])
+    # Rows 0, 1, 3, 4, 5, 6, 7 minus the two oldest still in the window
+    assert_fit(model, X[[3, 4, 5, 6, 7]], y[[3, 4, 5, 6, 7]])
+    # Row 0 has already expired; removing it again changes nothing
+    model.remove(X[:1], y[:1])
+    assert_fit(model, X[[3, 4, 5, 6, 7]], y[[3, 4, 5, 6, 7]])
+
+
+@pytest.mark.parametrize("window", [None, 10])
+def test_incremental_save_load_round_trip(tmp_path, window):
+    X, y = design(25)
+    model = IncrementalLinearRegression(window=window).fit(X[:20], y[:20])
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = IncrementalLinearRegression.load(path)
+    assert loaded.window == window
+    assert loaded.n == model.n
+    np.testing.assert_array_equal(loaded.coef_, model.coef_)
+    # And keeps updating like the original
+    model.partial_fit(X[20:], y[20:])
+    loaded.partial_fit(X[20:], y[20:])
+    np.testing.assert_allclose(loaded.coef_, model.coef_, atol=1e-12)
+    assert loaded.n == model.n
+
+
+def assert_same_models(batched, Xs, ys):
+    for model, X, y in zip(batched, Xs, ys):
+        expected = SimpleLinearRegression().fit(X, y)
+        assert model.intercept_ == pytest.approx(expected.intercept_, abs=1e-8)
+        np.testing.assert_allclose(model.coef_, expected.coef_, atol=1e-8)
+
+
+def test_fit_batched_ragged_histories():
+    Xs, ys = zip(*[design(n, seed=n) for n in (8, 30, 120, 5)])
+    assert_same_models(fit_batched(Xs, ys), Xs, ys)
+
+
+def test_fit_batched_rank_deficient_falls_back_to_pinv():
+    X, y = design(40)
+    # A fourth column duplicating the first: minimum-norm answer, like lstsq
+    dup = np.column_stack([X, X[:, 0]])
+    # Fewer rows than unknowns
+    few, few_y = design(3, p=4, seed=1)
+    good, good_y = design(50, p=4, seed=2)
+    Xs, ys = [dup, few, good], [y, few_y, good_y]
+    assert_same_models(fit_batched(Xs, ys), Xs, ys)
+    coef = fit_batched([dup], [y])[0].coef_
+    assert coef[0] == pytest.approx(coef[3])
+
+
+def test_fit_batched_zero_columns():
+    X, y = design(30)
+    zeroed = X.copy()
+    zeroed[:, 1] = 0.0
+    Xs, ys = [X, zeroed], [y, y]
+    batched = fit_batched(Xs, ys)
+    assert_same_models(batched, Xs, ys)
+    assert batched[1].coef_[1] == 0.0
+    # No feature columns at all: the intercept is the mean
+    empty = [np.zeros((6, 0)), np.zeros((4, 0))]
+    targets = [np.arange(6.0), np.ones(4)]
+    batched = fit_batched(empty, targets)
+    assert_same_models(batched, empty, targets)
+    assert [m.intercept_ for m in batched] == pytest.approx([2.5, 1.0])
+    assert fit_batched([], []) == []
+
+
+def explicit_ridge(X, y, alpha):
+    """(XᵀX + αI)⁻¹Xᵀy on standardized features and a centred target, the
+    intercept unpenalized; returns (coef, intercept, gcv)"""
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    Xs = (X - mean) / std
+    yc = y - y.mean()
+    inverse = np.linalg.inv(Xs.T @ Xs + alpha * np.eye(X.shape[1]))
+    beta = inverse @ Xs.T @ yc
+    hat = Xs @ inverse @ Xs.T
+    n = len(y)
+    gcv = np.mean((yc - hat @ yc) ** 2) / (1 - (np.trace(hat) + 1) / n) ** 2
+    coef = beta / std
+    return coef, y.mean() - mean @ coef, gcv
+
+
+ALPHAS = (0.01, 0.3, 5.0, 200.0)
+
+
+def test_ridge_path_matches_explicit_solve():
+    X, y = design(60, p=4)
+    X[:, 3] *= 1e5                      # Volume-sized column
+    Y = np.column_stack([y, y[::-1]])
+    coefs, intercepts, gcv = ridge_path(X, Y, ALPHAS)
+    assert coefs.shape == (len(ALPHAS), 4, 2)
+    for a, alpha in enumerate(ALPHAS):
+        for k in range(2):
+            coef, intercept, score = explicit_ridge(X, Y[:, k], alpha)
+            np.testing.assert_allclose(coefs[a, :, k], coef, rtol=1e-8, atol=1e-14)
+            assert intercepts[a, k] == pytest.approx(intercept, rel=1e-8)
+            assert gcv[a, k] == pytest.approx(score, rel=1e-8)
+
+
+def test_ridge_regression_picks_lowest_gcv():
+    X, y = design(40, p=3, seed=3)
+    model = RidgeRegression(ALPHAS).fit(X, y)
+    scores = [explicit_ridge(X, y, alpha)[2] for alpha in ALPHAS]
+    np.testing.assert_allclose(model.gcv_, scores, rtol=1e-8)
+    assert model.alpha_ == ALPHAS[int(np.argmin(scores))]
+    coef, intercept, _ = explicit_ridge(X, y, model.alpha_)
+    np.testing.assert_allclose(model.coef_, coef, rtol=1e-8)
+    assert model.intercept_ == pytest.approx(intercept, rel=1e-8)
+    np.testing.assert_allclose(model.predict(X), intercept + X @ coef, rtol=1e-8)
+
+
+def test_horizon_targets_alignment():
+    X = np.arange(20.0).reshape(10, 2)
+    close = np.arange(10.0) * 10
+    Xh, Y = horizon_targets(X, close, 3)
+    # The last 3 rows have no complete target and are dropped
+    np.testing.assert_array_equal(Xh, X[:7])
+    # Row i is paired with the closes strictly after it: no look-ahead
+    for i in range(7):
+        np.testing.assert_array_equal(Y[i], close[i + 1:i + 4])
+    Xh, Y = horizon_targets(X, close, 10)
+    assert Xh.shape == (0, 2) and Y.shape == (0, 10)
+
+
+def test_multi_horizon_matches_one_fit_per_horizon():
+    X, close = design(50, p=3, seed=4)
+    Xh, Y = horizon_targets(X, close, 4)
+    multi = MultiHorizonRegression(4).fit(X, close)
+    for j in range(4):
+        single = SimpleLinearRegression().fit(Xh, Y[:, j])
+        np.testing.assert_allclose(multi.coef_[:, j], single.coef_, atol=1e-10)
+        assert multi.intercept_[j] == pytest.approx(single.intercept_)
+
+    ridge = MultiHorizonRegression(4, alphas=ALPHAS).fit(X, close)
+    totals = np.sum([[explicit_ridge(Xh, Y[:, j], alpha)[2] for j in range(4)] for alpha in ALPHAS], axis=1)
+    assert ridge.alpha_ == ALPHAS[int(np.argmin(totals))]
+    for j in range(4):
+        coef, intercept, _ = explicit_ridge(Xh, Y[:, j], ridge.alpha_)
+        np.testing.assert_allclose(ridge.coef_[:, j], coef, rtol=1e-8)
+        assert ridge.intercept_[j] == pytest.approx(intercept, rel=1e-8)
+    assert ridge.predict(X[-1:]).shape == (1, 4)
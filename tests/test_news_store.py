@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from news_store import NewsStore
+
+
+def add(store, source, titles, day=None, ticker=None):
+    day = day or date.today()
+    return store.add(source, [day] * len(titles), titles, np.linspace(-1, 1, len(titles)), ticker=ticker)
+
+
+def test_concurrent_writers_keep_each_others_rows(tmp_path):
+    path = str(tmp_path / "news.npz")
+    first, second = NewsStore(path), NewsStore(path)
+    add(first, "feed-a", ["Alpha one", "Alpha two"], ticker="TCS.NS")
+    add(second, "feed-b", ["Beta one"])
+    add(second, "feed-a", ["Alpha two", "Alpha three"], ticker="TCS.NS")
+    first.save()
+    second.save()
+
+    merged = NewsStore(path)
+    assert len(merged) == 4
+    assert sorted(merged.sources) == ["feed-a", "feed-b"]
+    today = date.today()
+    assert len(merged.daily(["feed-a"], today, today, dedup=False).days) == 1
+    assert merged.daily(tickers=["TCS.NS"], start=today, end=today).days.tolist() == [np.datetime64(today, 'D')]
+    # The last writer also holds the merged rows in memory
+    assert len(second) == 4
+
+
+def test_retention_drops_old_headlines(tmp_path):
+    path = str(tmp_path / "news.npz")
+    store = NewsStore(path, retention_days=30)
+    add(store, "feed", ["Old news"], day=date.today() - timedelta(days=31))
+    add(store, "feed", ["Recent news"], day=date.today() - timedelta(days=29))
+    store.save()
+    assert len(NewsStore(path)) == 1
+    assert len(store) == 1
+
+
+def test_retention_zero_keeps_everything(tmp_path):
+    path = str(tmp_path / "news.npz")
+    store = NewsStore(path, retention_days=0)
+    add(store, "feed", ["Ancient news"], day=date(2001, 1, 1))
+    store.save()
+    assert len(NewsStore(path, retention_days=0)) == 1
@@ -0,0 +1,42 @@
+import numpy as np
+
+from app import FORECAST_END, START_DATE, predict_stock
+from benchmarks.offline import load_prices, offline_news, offline_provider
+from panel import PanelStore, SharedPanel, write_panel
+from price_store import PriceStore
+from registry import ModelRegistry
+
+
+def large_volume_frames():
+    # Volumes past 2**24 are where float32 starts rounding
+    frames = load_prices()
+    for frame in frames.values():
+        frame["Volume"] = frame["Volume"] * 10 + 7
+    return frames
+
+
+def test_panel_round_trips_store_values(tmp_path):
+    frames = large_volume_frames()
+    write_panel(frames, str(tmp_path / "panel"))
+    frame = PanelStore(SharedPanel(str(tmp_path / "panel"))).get("TCS.NS", START_DATE, FORECAST_END)
+    source = frames["TCS.NS"]
+    source = source[(source["Date"] >= START_DATE) & (source["Date"] < FORECAST_END)]
+    for field in ["Open", "High", "Low", "Close", "Volume"]:
+        np.testing.assert_array_equal(frame[field], source[field].to_numpy(float))
+
+
+def test_panel_prediction_matches_store_path(tmp_path):
+    frames = large_volume_frames()
+    write_panel(frames, str(tmp_path / "panel"))
+    registry = ModelRegistry(str(tmp_path / "models"))
+    news = offline_news()
+    store = PriceStore(str(tmp_path / "prices.sqlite"), offline_provider(frames))
+    from_store = predict_stock("TCS", store=store, news=news, registry=registry)
+    assert registry.misses == 1
+
+    panel = PanelStore(SharedPanel(str(tmp_path / "panel")))
+    from_panel = predict_stock("TCS", store=panel, news=news, registry=registry)
+    assert panel.hits == 1
+    # Same training data, so the fitted model is reused rather than refit
+    assert registry.hits == 1 and registry.misses == 1
+    assert from_panel == from_store
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from price_store import FrameProvider, PriceStore
+
+
+def bars(first, last):
+    dates = pd.bdate_range(first, last)
+    close = [100.0 + i for i in range(len(dates))]
+    return pd.DataFrame({"Date": dates, "Open": close, "High": close, "Low": close, "Close": close,
+                         "Volume": 1000.0})
+
+
+def coverage(store, ticker):
+    return store._conn.execute("SELECT start, end FROM coverage WHERE ticker = ?", (ticker,)).fetchone()
+
+
+def test_recent_tail_is_refetched(tmp_path):
+    today = date.today()
+    provider = FrameProvider({"X.NS": bars(today - timedelta(days=60), today - timedelta(days=3))})
+    store = PriceStore(str(tmp_path / "p.sqlite"), provider)
+    start, end = (today - timedelta(days=40)).isoformat(), (today + timedelta(days=3)).isoformat()
+    first = store.get("X.NS", start, end)
+    # Coverage stops after the last bar, not at the (future) requested end
+    assert coverage(store, "X.NS")[1] <= today.isoformat()
+    assert coverage(store, "X.NS")[1] <= (first["Date"].max() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # The provider publishes the missing bars; the next read picks them up
+    provider.frames["X.NS"] = FrameProvider({"X.NS": bars(today - timedelta(days=60), today)}).frames["X.NS"]
+    calls = len(provider.calls)
+    second = store.get("X.NS", start, end)
+    assert len(provider.calls) > calls
+    assert second["Date"].max() >= first["Date"].max()
+    assert len(second) >= len(first)
+
+
+def test_settled_weekend_gap_is_covered(tmp_path):
+    # Bars end on a Friday; the request ends on the Sunday after, long ago
+    provider = FrameProvider({"X.NS": bars("2025-03-03", "2025-11-07")})
+    store = PriceStore(str(tmp_path / "p.sqlite"), provider)
+    store.get("X.NS", "2025-03-01", "2025-11-09")
+    assert coverage(store, "X.NS") == ("2025-03-01", "2025-11-09")
+    calls = len(provider.calls)
+    store.get("X.NS", "2025-03-01", "2025-11-09")
+    assert len(provider.calls) == calls
+    assert store.hits == 1
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+import pytest
+
+import app
+import news
+from benchmarks.offline import offline_news, offline_provider
+from price_store import PriceStore
+from registry import ModelRegistry
+from scheduler import NSE_TZ, PredictionStore, precompute, session_date
+
+
+def ist(*args):
+    return datetime(*args, tzinfo=NSE_TZ)
+
+
+@pytest.mark.parametrize("now,expected", [
+    (ist(2025, 11, 5, 16, 15), date(2025, 11, 5)),   # Wednesday, at the run time
+    (ist(2025, 11, 5, 10, 0), date(2025, 11, 4)),    # before the close: Tuesday's session
+    (ist(2025, 11, 3, 9, 0), date(2025, 10, 31)),    # Monday morning: Friday's session
+    (ist(2025, 11, 8, 20, 0), date(2025, 11, 7)),    # Saturday
+])
+def test_session_date(now, expected):
+    assert session_date(now) == expected
+
+
+def test_precompute_uses_and_keys_by_session(tmp_path, monkeypatch):
+    calls = []
+
+    def predict_many(tickers, **kwargs):
+        calls.append(kwargs)
+        return {t: {"ticker": t, "predicted_next": 1.0} for t in tickers}
+
+    monkeypatch.setattr(app, "predict_many", predict_many)
+    store = PredictionStore(str(tmp_path))
+    now = ist(2026, 10, 16, 16, 20)
+    assert precompute(["TCS", "INFY"], store, now=now, log=None) == 2
+    # The on-demand default window, not one of its own
+    assert calls == [{}]
+
+    assert store.get("predict:TCS.NS", date(2026, 10, 16))["ticker"] == "TCS.NS"
+    # Monday's readers want Monday's session, not Friday's entry
+    assert store.get("predict:TCS.NS", date(2026, 10, 19)) is None
+
+
+def test_precomputed_matches_on_demand(tmp_path, monkeypatch):
+    prices = PriceStore(str(tmp_path / "prices.sqlite"), offline_provider())
+    feeds = offline_news()
+    registry = ModelRegistry(str(tmp_path / "models"))
+    monkeypatch.setattr(app, "get_default_store", lambda: prices)
+    monkeypatch.setattr(app, "get_default_news_service", lambda: feeds)
+    monkeypatch.setattr(news, "get_default_news_service", lambda: feeds)
+    monkeypatch.setattr(app, "get_default_registry", lambda: registry)
+
+    store = PredictionStore(str(tmp_path / "predictions"))
+    now = ist(2026, 10, 16, 16, 20)
+    assert precompute(["TCS"], store, now=now, log=None) == 1
+    precomputed = store.get("predict:TCS.NS", session_date(now))
+    assert precomputed == app.predict_stock("TCS")
@@ -0,0 +1,35 @@
+import pytest
+
+from sentiment import SentimentScorer
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return SentimentScorer()
+
+
+@pytest.mark.parametrize("headline,expected", [
+    ("Shares dropped sharply", -1.0),
+    ("Stocks dipped", -1.0),
+    ("Infosys winning deal", 1.0),
+    ("Markets rising on earnings", 1.0),
+    ("Banks surging", 1.0),
+    ("Metal stocks plunging", -1.0),
+    ("Exports declining", -1.0),
+    ("Rupee sliding", -1.0),
+    ("Nifty rallies", 1.0),
+    ("Investors worried", -1.0),
+    ("Sensex fell", -1.0),
+    ("Gains, gained, gaining", 1.0),
+])
+def test_inflections(scorer, headline, expected):
+    assert scorer.score(headline) == expected
+
+
+def test_whole_words_only(scorer):
+    # "up" inside "update", "win" inside "window"
+    assert scorer.score("Quarterly update on window sizes") == 0.0
+
+
+def test_mixed_headline(scorer):
+    assert scorer.score("Profits surged but shares dropped") == pytest.approx(1 / 3)
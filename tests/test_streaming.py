@@ -0,0 +1,31 @@
+import pytest
+
+from app import _prediction_events, predict_stock_events
+from benchmarks.offline import load_prices
+from lookup import result_events
+from registry import ModelRegistry
+
+
+def test_failure_event_is_not_named_error():
+    # EventSource dispatches its own "error" for connection problems
+    assert list(predict_stock_events("")) == [("failed", {"error": "Invalid input"})]
+    assert result_events({"error": "no data"}) == [("failed", {"error": "no data"})]
+
+
+@pytest.mark.parametrize("model,horizons", [("ols", None), ("ols", 5), ("ridge", None), ("ridge", 3)])
+def test_replay_splits_like_the_live_stream(model, horizons, tmp_path):
+    price = load_prices()["INFY.NS"]
+    news = price[["Date"]].assign(DateOnly=price["Date"].dt.date, Sentiment=0.2)[["DateOnly", "Sentiment"]]
+    live = list(_prediction_events("INFY.NS", price, news, registry=ModelRegistry(str(tmp_path)),
+                                   model=model, horizons=horizons))
+    result = {}
+    for _, partial in live:
+        result.update(partial)
+    replay = result_events(result)
+    assert [event for event, _ in replay] == ["price"] + [event for event, _ in live]
+    for (event, partial), (_, replayed) in zip(live, replay[1:]):
+        assert set(replayed) == set(partial), event
+    if model == "ols":
+        assert "pred_lower" in replay[1][1]
+    if horizons:
+        assert "horizon_values" in replay[1][1]
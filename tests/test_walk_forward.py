@@ -0,0 +1,106 @@
+"""walk_forward against the per-date loop it replaced"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import FEATURES, FORECAST_END, START_DATE, TRAIN_CUTOFF, _predict_from_prices, build_features, walk_forward
+from benchmarks.offline import load_prices
+from features import FeaturePipeline
+from models import SimpleLinearRegression
+from registry import ModelRegistry
+
+
+def loop_walk_forward(df, model, features, train_cutoff_str, forecast_end_str):
+    """The original implementation: one mask lookup and predict per target date"""
+    forecast_start = pd.to_datetime(train_cutoff_str) + pd.Timedelta(days=1)
+    forecast_end = pd.to_datetime(forecast_end_str)
+    available_dates = df['Date']
+    target_dates = available_dates[(available_dates >= forecast_start) & (available_dates <= forecast_end)].sort_values()
+
+    pred_series_dates, pred_series_values, actual_series_values, directional_flags = [], [], [], []
+    for target_date in target_dates:
+        prev_day_mask = df['Date'] == (target_date - pd.Timedelta(days=1))
+        if not prev_day_mask.any():
+            continue
+        prev_features = df.loc[prev_day_mask, features].values
+        pred_series_dates.append(target_date.strftime("%Y-%m-%d"))
+        pred_series_values.append(float(model.predict(prev_features)[0]))
+        act_mask = df['Date'] == target_date
+        actual_series_values.append(float(df.loc[act_mask, 'Close'].values[0]) if act_mask.any() else None)
+
+    for i in range(len(pred_series_values)):
+        if i == 0:
+            directional_flags.append(None)
+            continue
+        pred_dir = np.sign(pred_series_values[i] - pred_series_values[i - 1])
+        act_dir = np.sign(actual_series_values[i] - actual_series_values[i - 1])
+        if pred_dir == 0 and act_dir == 0:
+            directional_flags.append(True)
+        elif pred_dir == 0 or act_dir == 0:
+            directional_flags.append(False)
+        else:
+            directional_flags.append(bool(pred_dir == act_dir))
+
+    comp_df = pd.DataFrame({'pred': pred_series_values, 'act': actual_series_values,
+                            'dir_ok': directional_flags}).dropna()
+    metrics = (None, None, None)
+    if not comp_df.empty:
+        metrics = (float(np.sqrt(np.mean((comp_df['pred'] - comp_df['act']) ** 2))),
+                   float(np.mean(np.abs((comp_df['act'] - comp_df['pred']) / comp_df['act'])) * 100.0),
+                   float(100.0 * np.mean([f for f in directional_flags if f is not None])))
+    return pred_series_dates, pred_series_values, actual_series_values, directional_flags, metrics
+
+
+def fixture_inputs(ticker, drop=()):
+    price = load_prices()[ticker]
+    price = price[(price['Date'] >= START_DATE) & (price['Date'] < FORECAST_END)]
+    # Drop a few days inside the backtest window, like exchange holidays
+    price = price[~price['Date'].isin(pd.to_datetime(list(drop)))].reset_index(drop=True)
+    days = price['Date'].dt.date
+    rng = np.random.default_rng(0)
+    news_daily = pd.DataFrame({'DateOnly': days[::3].values, 'Sentiment': rng.normal(0, 0.3, len(days[::3]))})
+    return price, news_daily
+
+
+def reference_model(df):
+    X = df[FEATURES].iloc[:-1]
+    y = df['Close'].shift(-1).dropna()
+    train_idx = df['Date'].iloc[:-1] <= pd.to_datetime(TRAIN_CUTOFF)
+    return SimpleLinearRegression().fit(X[train_idx].values, y[train_idx.values].values)
+
+
+CASES = [("TCS.NS", ()), ("INFY.NS", ("2025-10-21", "2025-10-22")), ("RELIANCE.NS", ("2025-10-14", "2025-11-05"))]
+
+
+@pytest.mark.parametrize("ticker,drop", CASES)
+def test_walk_forward_matches_loop(ticker, drop):
+    price, news_daily = fixture_inputs(ticker, drop)
+    df = build_features(price, news_daily)
+    model = reference_model(df)
+    fs = FeaturePipeline(FEATURES).build(ticker, price, news_daily)
+
+    dates, preds, actuals, dir_ok = walk_forward(fs, model, FEATURES, TRAIN_CUTOFF, FORECAST_END)
+    ref_dates, ref_preds, ref_actuals, ref_flags, _ = loop_walk_forward(df, model, FEATURES, TRAIN_CUTOFF,
+                                                                        FORECAST_END)
+    assert len(ref_dates) > 5
+    assert [d.strftime("%Y-%m-%d") for d in dates] == ref_dates
+    np.testing.assert_allclose(preds, ref_preds, rtol=1e-12)
+    np.testing.assert_array_equal(actuals, ref_actuals)
+    assert [None] + dir_ok.tolist() == ref_flags
+
+
+@pytest.mark.parametrize("ticker,drop", CASES)
+def test_backtest_response_matches_loop(ticker, drop, tmp_path):
+    price, news_daily = fixture_inputs(ticker, drop)
+    df = build_features(price, news_daily)
+    ref_dates, ref_preds, ref_actuals, ref_flags, (rmse, mape, dir_acc) = loop_walk_forward(
+        df, reference_model(df), FEATURES, TRAIN_CUTOFF, FORECAST_END)
+
+    result = _predict_from_prices(ticker, price, news_daily, registry=ModelRegistry(str(tmp_path)))
+    assert result["month_pred_dates"] == ref_dates
+    np.testing.assert_allclose(result["month_pred_values"], ref_preds, rtol=1e-9)
+    assert result["backtest_actuals"] == ref_actuals
+    assert result["directional_flags"] == ref_flags
+    assert result["comparison_rmse"] == pytest.approx(rmse, rel=1e-9)
+    assert result["comparison_mape"] == pytest.approx(mape, rel=1e-9)
+    assert result["directional_accuracy"] == pytest.approx(dir_acc, rel=1e-12)
@@ -1,7 +1,12 @@
-from flask import Flask, request, render_template_string
-from app import predict_stock
+from flask import Flask, Response, request, render_template_string
+from app import cached_predict_stock, stream_predict_stock
+from encoding import sse_event
+from metrics import inc, prometheus_text
+from scheduler import start_from_env
 
 app = Flask(__name__)
+# STOCK_WATCHLIST=watchlist.txt precomputes those tickers after every close
+start_from_env()
 
 HTML = r"""
 <!DOCTYPE html>
@@ -76,6 +81,7 @@ HTML = r"""
       <polyline points="0,90 25,70 45,75 65,55 90,60 115,35 140,45 165,20 180,5" class="trendline"/>
     </svg>
   </div>
+  <div id="progress" class="ms-4 fs-5" style="color:#dff;"></div>
 </div>
 
 <div class="container" style="max-width:650px;">
@@ -99,7 +105,7 @@ HTML = r"""
     </div>
     {% endif %}
 
-    <form method="POST" class="d-flex gap-2" onsubmit="showLoader()">
+    <form method="POST" class="d-flex gap-2" onsubmit="return showLoader(this)">
       <input type="text" name="stock" placeholder="Enter Stock Symbol (ex: TCS)" required class="form-control">
       <button class="btn btn-success px-3">Predict</button>
     </form>
@@ -258,7 +264,35 @@ HTML = r"""
 </div>
 
 <script>
-function showLoader(){ document.getElementById("loading").style.display="flex"; }
+// Show partial results from /stream while the prediction runs; the form is
+// posted once the stream ends, by which time the response is cached.
+function showLoader(form){
+  document.getElementById("loading").style.display="flex";
+  if (!window.EventSource || form.dataset.streamed) return true;
+  var progress = document.getElementById("progress");
+  var source = new EventSource("/stream?stock=" + encodeURIComponent(form.stock.value));
+  function finish(){
+    if (form.dataset.streamed) return;
+    source.close(); form.dataset.streamed = "1"; form.submit();
+  }
+  source.addEventListener("price", function(e){
+    var d = JSON.parse(e.data);
+    progress.textContent = d.ticker + ": " + d.current_price.toFixed(2) + " (" + d.current_time.slice(0, 10) + ")";
+  });
+  source.addEventListener("prediction", function(e){
+    var d = JSON.parse(e.data);
+    progress.textContent += " \u2192 next " + d.predicted_next.toFixed(2);
+  });
+  source.addEventListener("done", finish);
+  source.addEventListener("failed", function(e){
+    progress.textContent = JSON.parse(e.data).error;
+    finish();
+  });
+  // Connection errors: stop EventSource from reconnecting (and re-running
+  // the prediction) and fall back to the plain form post
+  source.onerror = finish;
+  return false;
+}
 </script>
 
 </body>
@@ -271,8 +305,9 @@ def index():
     error=None
 
     if request.method=="POST":
+        inc("stock_requests_total", route="web")
         stock = request.form["stock"].upper()
-        result_data = predict_stock(stock)
+        result_data = cached_predict_stock(stock)
 
         if "error" in result_data:
             error = "No Stock Found! Try a valid stock."
@@ -284,5 +319,21 @@ def index():
         result=r
     return render_template_string(HTML, result=result, error=error)
 
+@app.route("/stream")
+def stream():
+    """Server-Sent Events: price, prediction, backtest (or failed), then done"""
+    inc("stock_requests_total", route="stream")
+    stock = request.args.get("stock", "").upper()
+
+    def generate():
+        for event, data in stream_predict_stock(stock):
+            yield sse_event(event, data)
+        yield sse_event("done", {})
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route("/metrics")
+def metrics():
+    return Response(prometheus_text(), mimetype="text/plain; version=0.0.4")
+
 if __name__=="__main__":
     app.run(debug=True)